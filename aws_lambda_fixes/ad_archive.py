@@ -0,0 +1,194 @@
+"""
+Columnar Ad Archive on S3
+
+Writes ad history to date-partitioned, compressed files that analysts query
+(Athena, DuckDB, Spark) instead of scanning BusinessAds:
+
+    s3://{ARCHIVE_BUCKET}/{ARCHIVE_PREFIX}{dataset}/dt=YYYY-MM-DD/part-{time}-{id}.parquet
+
+Datasets:
+    expired   ads removed by TTL (sync_tombstones_lambda, from the stream)
+    deleted   ads removed by a hard delete (sync_tombstones_lambda)
+    live      incremental export of changed live ads (archive_export_lambda)
+
+Rows share one fixed schema (ARCHIVE_COLUMNS) plus `archivedAt` and
+`archiveReason`. ArchiveWriter buffers rows and writes a file once it holds
+ARCHIVE_BATCH_ROWS rows or about ARCHIVE_BATCH_BYTES of row data, so bulk
+jobs produce a few large files rather than many small ones while the
+buffer stays well inside a Lambda's memory.
+
+pyarrow is optional: with it, files are Parquet with zstd compression;
+without it, the same rows are written as gzip-compressed JSON lines so
+archiving never blocks a delete. Those go to a separate `{dataset}-jsonl`
+dataset, since a table over `{dataset}/` expects only Parquet files:
+
+    s3://{ARCHIVE_BUCKET}/{ARCHIVE_PREFIX}{dataset}-jsonl/dt=YYYY-MM-DD/part-{time}-{id}.jsonl.gz
+
+Environment variables:
+    ARCHIVE_BUCKET       Destination bucket (default business-ad-archive)
+    ARCHIVE_PREFIX       Key prefix (default archive/)
+    ARCHIVE_BATCH_ROWS   Most rows per file (default 20000)
+    ARCHIVE_BATCH_BYTES  Most buffered row data per file, as JSON (default 33554432, 32 MiB)
+"""
+
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import aws_clients
+from ad_logger import get_logger
+
+ARCHIVE_BUCKET = os.environ.get('ARCHIVE_BUCKET', 'business-ad-archive')
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archive/')
+ARCHIVE_BATCH_ROWS = int(os.environ.get('ARCHIVE_BATCH_ROWS', 20000))
+ARCHIVE_BATCH_BYTES = int(os.environ.get('ARCHIVE_BATCH_BYTES', 32 * 1024 * 1024))
+FALLBACK_DATASET_SUFFIX = '-jsonl'  # Dataset for JSON lines written without pyarrow
+
+# column -> type ('string', 'bool', 'int', 'list')
+ARCHIVE_COLUMNS = {
+    'id': 'string',
+    'title': 'string',
+    'description': 'string',
+    'userName': 'string',
+    'userId': 'string',
+    'businessName': 'string',
+    'contactInfo': 'string',
+    'location': 'string',
+    'category': 'string',
+    'status': 'string',
+    'featured': 'bool',
+    'imageCount': 'int',
+    'imageUrls': 'list',
+    'likes': 'int',
+    'viewCount': 'int',
+    'commentCount': 'int',
+    'createdAt': 'string',
+    'updatedAt': 'string',
+    'expiresAt': 'string',
+    'ttl': 'int',
+    'archivedAt': 'string',
+    'archiveReason': 'string'
+}
+
+logger = get_logger('adArchive')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _coerce(value, kind):
+    if value is None:
+        return None
+    if kind == 'int':
+        return int(value) if isinstance(value, (int, float, Decimal)) else None
+    if kind == 'bool':
+        return bool(value)
+    if kind == 'list':
+        return [str(entry) for entry in value] if isinstance(value, (list, tuple, set)) else [str(value)]
+    return str(value)
+
+
+def archive_row(item, reason, archived_at):
+    """Flatten a BusinessAds item into one archive row."""
+    row = {column: _coerce(item.get(column), kind) for column, kind in ARCHIVE_COLUMNS.items()}
+    row['archivedAt'] = archived_at
+    row['archiveReason'] = reason
+    return row
+
+
+def _parquet_bytes(pa, rows):
+    types = {'string': pa.string(), 'bool': pa.bool_(), 'int': pa.int64(), 'list': pa.list_(pa.string())}
+    schema = pa.schema([(column, types[kind]) for column, kind in ARCHIVE_COLUMNS.items()])
+    table = pa.Table.from_pylist(rows, schema=schema)
+    buffer = io.BytesIO()
+    pa.parquet.write_table(table, buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+def _jsonl_gz_bytes(rows):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as handle:
+        for row in rows:
+            handle.write(json.dumps(row, separators=(',', ':')).encode())
+            handle.write(b'\n')
+    return buffer.getvalue()
+
+
+class ArchiveWriter:
+    """
+    Buffers archive rows for one dataset and writes a file every
+    `batch_rows` rows or `batch_bytes` of row data, whichever comes first;
+    use as a context manager or call flush() at the end.
+    """
+
+    def __init__(self, dataset, batch_rows=None, batch_bytes=None):
+        self.dataset = dataset
+        self.batch_rows = batch_rows or ARCHIVE_BATCH_ROWS
+        self.batch_bytes = batch_bytes or ARCHIVE_BATCH_BYTES
+        self.rows = []
+        self.buffered_bytes = 0
+        self.keys = []
+        self.rows_written = 0
+        self._archived_at = datetime.utcnow().isoformat()
+
+    def add(self, item, reason):
+        """Buffer one row; returns the key of the file written if this row filled a batch."""
+        row = archive_row(item, reason, self._archived_at)
+        self.rows.append(row)
+        self.buffered_bytes += len(json.dumps(row, separators=(',', ':')))
+        if len(self.rows) >= self.batch_rows or self.buffered_bytes >= self.batch_bytes:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Write the buffered rows as one file. Raises if the upload fails."""
+        import uuid
+
+        if not self.rows:
+            return None
+
+        pa = _pyarrow()
+        if pa is not None:
+            dataset = self.dataset
+            body, extension, content_type = _parquet_bytes(pa, self.rows), 'parquet', 'application/vnd.apache.parquet'
+        else:
+            dataset = self.dataset + FALLBACK_DATASET_SUFFIX
+            logger.warning('pyarrow not installed, archiving as JSON lines', dataset=dataset)
+            body, extension, content_type = _jsonl_gz_bytes(self.rows), 'jsonl.gz', 'application/x-ndjson'
+
+        now = datetime.utcnow()
+        key = (f"{ARCHIVE_PREFIX}{dataset}/dt={now:%Y-%m-%d}/"
+               f"part-{now:%H%M%S}-{uuid.uuid4().hex[:8]}.{extension}")
+        aws_clients.get_s3().put_object(Bucket=ARCHIVE_BUCKET, Key=key, Body=body, ContentType=content_type)
+
+        logger.info('Archive file written', dataset=self.dataset, key=key, rows=len(self.rows), bytes=len(body))
+        self.keys.append(key)
+        self.rows_written += len(self.rows)
+        self.rows = []
+        self.buffered_bytes = 0
+        return key
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def archive_items(dataset, items, reason):
+    """Archive a finished list of items; returns the keys written."""
+    with ArchiveWriter(dataset) as writer:
+        for item in items:
+            writer.add(item, reason)
+    return writer.keys
@@ -0,0 +1,82 @@
+"""
+Per-Container Read-Through Ad Cache
+
+A small thread-safe LRU of formatted ads keyed by id. It lives for the life
+of the Lambda container, so with the routed entry point every route shares
+it. Handlers that change an ad call invalidate() so this container never
+serves its own stale writes; entries also expire after a TTL, which bounds
+how long another container's update or delete can go unseen.
+
+Environment variables:
+    AD_CACHE_MAX_ENTRIES   Most ads kept per container (default 2000)
+    AD_CACHE_TTL_SECONDS   Entry lifetime in seconds (default 30)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class AdCache:
+    """LRU mapping of ad id -> formatted ad with per-entry expiry."""
+
+    def __init__(self, max_entries=2000, ttl_seconds=30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ad_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(ad_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[ad_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(ad_id)
+            self.hits += 1
+            return entry[1]
+
+    def get_many(self, ad_ids):
+        """Split ids into (found {id: ad}, missing [ids]) in request order."""
+        found = {}
+        missing = []
+        for ad_id in ad_ids:
+            ad = self.get(ad_id)
+            if ad is None:
+                missing.append(ad_id)
+            else:
+                found[ad_id] = ad
+        return found, missing
+
+    def put(self, ad_id, ad):
+        with self._lock:
+            self._entries[ad_id] = (time.monotonic() + self.ttl_seconds, ad)
+            self._entries.move_to_end(ad_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ad_id):
+        with self._lock:
+            self._entries.pop(ad_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every handler imported into the same container
+ads_cache = AdCache(
+    max_entries=int(os.environ.get('AD_CACHE_MAX_ENTRIES', 2000)),
+    ttl_seconds=float(os.environ.get('AD_CACHE_TTL_SECONDS', 30))
+)
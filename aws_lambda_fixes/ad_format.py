@@ -0,0 +1,35 @@
+"""
+Client-facing Ad Formatting
+
+Turns a raw BusinessAds item into the JSON-safe shape the app expects, so
+every endpoint that returns ads (feed, get-by-id) formats them the same way.
+"""
+
+import json
+from decimal import Decimal
+
+
+def decimal_to_float(obj):
+    """json.dumps default hook: DynamoDB numbers arrive as Decimal."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return obj
+
+
+def format_ad(item):
+    """Return a JSON-safe copy of an ad item with social/status defaults filled in."""
+    # Convert Decimals to floats
+    processed_item = json.loads(json.dumps(item, default=decimal_to_float))
+
+    # Ensure social media fields have defaults
+    processed_item.setdefault('likes', 0)
+    processed_item.setdefault('viewCount', 0)
+    # Comments are paged via GET /comments; only the count ships with
+    # the ad. Legacy embedded lists are dropped from the response.
+    legacy_comments = processed_item.pop('comments', None) or []
+    processed_item.setdefault('commentCount', len(legacy_comments))
+    processed_item['comments'] = []
+    processed_item.setdefault('featured', False)
+    processed_item.setdefault('status', 'active')
+
+    return processed_item
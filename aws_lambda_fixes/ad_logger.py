@@ -0,0 +1,176 @@
+"""
+Structured Logger for Business Ad Lambda Functions
+
+Emits one JSON object per line so CloudWatch Logs Insights can filter on
+fields instead of parsing emoji prints. Records below the configured level
+are dropped before any formatting happens, and field values passed as
+callables are only evaluated when the record is actually written, so a
+disabled debug payload costs a level comparison and nothing else.
+
+Environment variables:
+    LOG_LEVEL               DEBUG, INFO, WARNING or ERROR (default INFO)
+    LOG_DEBUG_SAMPLE_RATE   Fraction of invocations that emit debug-level
+                            payload logs when LOG_LEVEL=DEBUG (default 1.0)
+    LOG_MAX_FIELD_CHARS     Longest string kept per field (default 512)
+    LOG_MAX_FIELD_ITEMS     Longest list/dict kept per field (default 20)
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LEVEL_NAMES = {
+    DEBUG: 'DEBUG',
+    INFO: 'INFO',
+    WARNING: 'WARNING',
+    ERROR: 'ERROR'
+}
+_LEVELS_BY_NAME = {name: level for level, name in _LEVEL_NAMES.items()}
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def truncate(value, max_chars, max_items, depth=0):
+    """
+    Shrink a value for logging: long strings are cut, long collections are
+    clipped and anything nested deeper than three levels is summarised.
+    """
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}...(+{len(value) - max_chars} chars)"
+        return value
+
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+
+    if depth >= 3:
+        return f"<{type(value).__name__}>"
+
+    if isinstance(value, dict):
+        clipped = {}
+        for index, (key, item) in enumerate(value.items()):
+            if index >= max_items:
+                clipped['...'] = f"+{len(value) - max_items} keys"
+                break
+            clipped[str(key)] = truncate(item, max_chars, max_items, depth + 1)
+        return clipped
+
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        clipped = [truncate(item, max_chars, max_items, depth + 1) for item in items[:max_items]]
+        if len(items) > max_items:
+            clipped.append(f"...(+{len(items) - max_items} items)")
+        return clipped
+
+    return truncate(str(value), max_chars, max_items, depth)
+
+
+class AdLogger:
+    """
+    Level-gated JSON logger with per-invocation request correlation.
+
+    Usage:
+        logger = get_logger('submitAd')
+        logger.bind(event, context)
+        logger.info('Ad created', adId=ad_id)
+        logger.debug_payload('Submit request', body=lambda: body)
+    """
+
+    def __init__(self, name, stream=None):
+        self.name = name
+        self.stream = stream
+        self.level = _LEVELS_BY_NAME.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), INFO)
+        self.sample_rate = _env_float('LOG_DEBUG_SAMPLE_RATE', 1.0)
+        self.max_chars = _env_int('LOG_MAX_FIELD_CHARS', 512)
+        self.max_items = _env_int('LOG_MAX_FIELD_ITEMS', 20)
+        self.request_id = None
+        self.sampled = False
+
+    def bind(self, event=None, context=None):
+        """
+        Attach the current invocation's request id and roll the debug
+        sampling decision once, so a sampled request logs all of its payloads.
+        """
+        request_id = getattr(context, 'aws_request_id', None)
+        if not request_id and isinstance(event, dict):
+            request_id = (event.get('requestContext') or {}).get('requestId')
+        self.request_id = request_id
+        self.sampled = self.level <= DEBUG and random.random() < self.sample_rate
+        return self
+
+    def is_enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, **fields):
+        if level < self.level:
+            return
+
+        record = {
+            'level': _LEVEL_NAMES.get(level, str(level)),
+            'logger': self.name,
+            'message': message,
+            'timestamp': round(time.time(), 3)
+        }
+        if self.request_id:
+            record['requestId'] = self.request_id
+
+        for key, value in fields.items():
+            if callable(value):
+                value = value()
+            record[key] = truncate(value, self.max_chars, self.max_items)
+
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        stream = self.stream or sys.stdout
+        stream.write(line + '\n')
+
+    def debug(self, message, **fields):
+        self.log(DEBUG, message, **fields)
+
+    def debug_payload(self, message, **fields):
+        """
+        Debug record for request/response bodies. Only emitted on sampled
+        invocations; pass payloads as lambdas to defer their serialization.
+        """
+        if self.sampled:
+            self.log(DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        self.log(INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(ERROR, message, **fields)
+
+
+_loggers = {}
+
+
+def get_logger(name):
+    """Return the shared logger for a function, creating it on first use."""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = AdLogger(name)
+        _loggers[name] = logger
+    return logger
@@ -0,0 +1,165 @@
+"""
+Delta Sync - Changes and Deletions Since a Watermark
+
+Lets clients refresh with `GET /ads?since=<watermark>` and pay for the
+number of changes instead of the whole feed.
+
+Changes come from a sparse GSI on BusinessAds (SYNC_INDEX): partition
+`syncDay` (YYYY-MM-DD of updatedAt), sort `updatedAt`. Every write that
+changes what a client shows sets both through sync_fields(). A sync
+queries one partition per day since the watermark, oldest first, so the
+cost is one Query per day plus the changed items.
+
+Removals that leave no item behind (hard deletes, TTL cleanup, native
+DynamoDB TTL expiry) become tombstones in SYNC_TOMBSTONE_TABLE, keyed the
+same way (`syncDay`, sort `deletedKey` = `deletedAt#id`). They are written
+by sync_tombstones_lambda from the table's stream REMOVE records, so every
+removal is covered whoever made it. Tombstones expire after SYNC_MAX_DAYS,
+and a watermark older than that returns `resync` so the client reloads the
+full feed.
+
+Changed ads and tombstones are merged in time order and together capped at
+SYNC_MAX_CHANGES per response. When a response is cut short, `hasMore` is
+set and the watermark is the time of its last change: passing it back as
+`since` is the continuation token for the next page.
+
+Watermarks lag the server clock by SYNC_LAG_SECONDS to cover GSI
+propagation, and ranges are inclusive at both ends, so a change can be
+delivered twice; clients apply changes by id, which makes repeats harmless.
+
+Environment variables:
+    SYNC_INDEX               GSI name (default syncDay-updatedAt-index)
+    SYNC_TOMBSTONE_TABLE     Tombstone table (default BusinessAdTombstones)
+    SYNC_MAX_DAYS            Oldest usable watermark in days (default 30)
+    SYNC_MAX_CHANGES         Changes per response before paging (default 500)
+    SYNC_LAG_SECONDS         Watermark safety lag (default 5)
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import aws_clients
+from ad_format import format_ad
+
+SYNC_INDEX = os.environ.get('SYNC_INDEX', 'syncDay-updatedAt-index')
+TOMBSTONE_TABLE = os.environ.get('SYNC_TOMBSTONE_TABLE', 'BusinessAdTombstones')
+SYNC_MAX_DAYS = int(os.environ.get('SYNC_MAX_DAYS', 30))
+SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', 500))
+SYNC_LAG_SECONDS = float(os.environ.get('SYNC_LAG_SECONDS', 5))
+
+
+def sync_day(timestamp_iso):
+    return timestamp_iso[:10]
+
+
+def sync_fields(timestamp_iso):
+    """Attributes that put a changed ad into the sync index."""
+    return {'updatedAt': timestamp_iso, 'syncDay': sync_day(timestamp_iso)}
+
+
+def parse_watermark(value):
+    """Normalize a client watermark to naive UTC isoformat; raises ValueError."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def record_tombstones(ad_ids, reason):
+    """
+    Remember removed ad ids so syncing clients drop them. Stamped with the
+    time they are written (not when the item went away), so a tombstone
+    never lands behind a watermark already handed out; ids in one call are
+    a microsecond apart so a page boundary can always fall between them.
+    """
+    deleted_at = datetime.utcnow()
+    expires = int((deleted_at + timedelta(days=SYNC_MAX_DAYS + 1)).timestamp())
+    with aws_clients.get_table(TOMBSTONE_TABLE).batch_writer() as writer:
+        for index, ad_id in enumerate(ad_ids):
+            deleted_iso = (deleted_at + timedelta(microseconds=index)).isoformat()
+            writer.put_item(Item={
+                'syncDay': sync_day(deleted_iso),
+                'deletedKey': f"{deleted_iso}#{ad_id}",
+                'adId': ad_id,
+                'deletedAt': deleted_iso,
+                'reason': reason,
+                'ttl': expires
+            })
+
+
+def sync_days(since, until):
+    """The syncDay partitions covering `since` to `until`, oldest first."""
+    day = datetime.fromisoformat(sync_day(since))
+    last = datetime.fromisoformat(sync_day(until))
+    while day <= last:
+        yield day.strftime('%Y-%m-%d')
+        day += timedelta(days=1)
+
+
+def _query_day(table, params, limit):
+    items = []
+    while True:
+        response = table.query(**params, Limit=limit - len(items))
+        items.extend(response.get('Items', []))
+        if len(items) >= limit or not response.get('LastEvaluatedKey'):
+            return items
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _query_days(table, since, upper, day_params, limit):
+    """Items from one Query per day since `since`, oldest first, stopping at `limit`."""
+    items = []
+    for day in sync_days(since, upper):
+        items.extend(_query_day(table, day_params(day), limit - len(items)))
+        if len(items) >= limit:
+            break
+    return items
+
+
+def changes_since(since, max_changes=SYNC_MAX_CHANGES):
+    """
+    Return {ads, deletedIds, watermark, hasMore, resync} for changes after
+    `since` (a watermark normalized by parse_watermark).
+    """
+    now = datetime.utcnow()
+    if datetime.fromisoformat(since) < now - timedelta(days=SYNC_MAX_DAYS):
+        return {'ads': [], 'deletedIds': [], 'watermark': None, 'hasMore': False, 'resync': True}
+
+    upper = (now - timedelta(seconds=SYNC_LAG_SECONDS)).isoformat()
+    if since >= upper:
+        return {'ads': [], 'deletedIds': [], 'watermark': since, 'hasMore': False, 'resync': False}
+
+    # Each source is read up to max_changes + 1 entries, so the first
+    # max_changes of the merged list are exactly the oldest changes overall.
+    changed = _query_days(aws_clients.get_table(), since, upper, lambda day: {
+        'IndexName': SYNC_INDEX,
+        'KeyConditionExpression': 'syncDay = :day AND updatedAt BETWEEN :since AND :upper',
+        'ExpressionAttributeValues': {':day': day, ':since': since, ':upper': upper}
+    }, max_changes + 1)
+    if len(changed) > max_changes:
+        upper = changed[max_changes]['updatedAt']  # Nothing past here can make the page
+
+    removed = _query_days(aws_clients.get_table(TOMBSTONE_TABLE), since, upper, lambda day: {
+        'KeyConditionExpression': 'syncDay = :day AND deletedKey BETWEEN :since AND :upper',
+        'ExpressionAttributeValues': {':day': day, ':since': since + '#', ':upper': upper + '#\uffff'}
+    }, max_changes + 1)
+
+    entries = sorted([(item['updatedAt'], item, None) for item in changed]
+                     + [(tombstone['deletedAt'], None, tombstone['adId']) for tombstone in removed],
+                     key=lambda entry: entry[0])
+    has_more = len(entries) > max_changes
+    if has_more:
+        entries = entries[:max_changes]
+        upper = entries[-1][0]
+
+    ads = []
+    deleted_ids = []
+    for _, item, removed_id in entries:
+        if removed_id is not None:
+            deleted_ids.append(removed_id)
+        elif item.get('status', 'active') == 'active':
+            ads.append(format_ad(item))
+        else:
+            deleted_ids.append(item['id'])
+
+    return {'ads': ads, 'deletedIds': deleted_ids, 'watermark': upper, 'hasMore': has_more, 'resync': False}
@@ -0,0 +1,230 @@
+"""
+Incremental Live Ad Export to the Columnar Archive
+
+Scheduled job that copies ads created or updated since the last run into
+the `live` dataset of the archive (see ad_archive.py), so analysts see
+current ads without scanning BusinessAds. Progress is stored next to the
+archive as `{ARCHIVE_PREFIX}_state/live_export.json`.
+
+Incremental runs read only what changed: one Query per day since the
+watermark on the delta-sync index (ad_sync.SYNC_INDEX, partition `syncDay`,
+sort `updatedAt`), oldest first. A full export (`--full`) scans the table.
+Either way the state is saved every time an archive file is written: the
+`updatedAt` of its last row becomes the watermark, and a full export keeps
+the key of its last row as the scan's resume point. A run that is stopped
+(ARCHIVE_EXPORT_MARGIN_SECONDS before the Lambda timeout), fails or times
+out therefore continues from its last file instead of starting over; a
+pending full export is resumed by the next run. Rows read after the last
+file are exported again on resume, so an ad can appear more than once;
+take the row with the latest `updatedAt` per `id`. Counters that do not
+touch `updatedAt` (viewCount) are as of the ad's last update.
+
+Reads are paced: each page reports its ConsumedCapacity, and the job sleeps
+as needed to stay under ARCHIVE_EXPORT_READ_UNITS read units per second,
+leaving the rest of the table's capacity to production reads.
+
+Environment variables:
+    ARCHIVE_EXPORT_READ_UNITS       Read capacity units per second the export may use, 0 for unpaced (default 200)
+    ARCHIVE_EXPORT_MARGIN_SECONDS   Time left before the Lambda timeout when a run stops (default 60)
+
+Usage:
+    python aws_lambda_fixes/archive_export_lambda.py            # since the stored watermark
+    python aws_lambda_fixes/archive_export_lambda.py --full     # every ad
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from botocore.exceptions import ClientError
+
+import ad_archive
+import aws_clients
+from ad_logger import get_logger
+from ad_sync import SYNC_INDEX, SYNC_LAG_SECONDS, sync_days
+
+STATE_KEY = f"{ad_archive.ARCHIVE_PREFIX}_state/live_export.json"
+SCAN_PAGE_SIZE = 500  # Items per Scan/Query call; keeps each read burst small
+READ_UNITS_PER_SECOND = float(os.environ.get('ARCHIVE_EXPORT_READ_UNITS', 200))
+MARGIN_SECONDS = float(os.environ.get('ARCHIVE_EXPORT_MARGIN_SECONDS', 60))
+EPOCH = '1970-01-01T00:00:00'
+
+logger = get_logger('archiveExport')
+aws_clients.warm(s3=True)
+
+
+def load_state():
+    try:
+        response = aws_clients.get_s3().get_object(Bucket=ad_archive.ARCHIVE_BUCKET, Key=STATE_KEY)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {'watermark': EPOCH}
+        raise
+    return json.loads(response['Body'].read())
+
+
+def save_state(state):
+    aws_clients.get_s3().put_object(
+        Bucket=ad_archive.ARCHIVE_BUCKET,
+        Key=STATE_KEY,
+        Body=json.dumps(state).encode(),
+        ContentType='application/json'
+    )
+
+
+def consumed_read_units(response):
+    """Read units a page used; estimated at 0.5 per item (eventually consistent, under 4KB) if unreported."""
+    capacity = (response.get('ConsumedCapacity') or {}).get('CapacityUnits')
+    if capacity is not None:
+        return float(capacity)
+    return response.get('ScannedCount', 0) * 0.5
+
+
+def _scan_pages(table, start_key):
+    params = {'Limit': SCAN_PAGE_SIZE, 'ReturnConsumedCapacity': 'TOTAL'}
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+    while True:
+        response = table.scan(**params)
+        yield response
+        if not response.get('LastEvaluatedKey'):
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _changed_pages(table, since, upper):
+    for day in sync_days(since, upper):
+        params = {
+            'IndexName': SYNC_INDEX,
+            'KeyConditionExpression': 'syncDay = :day AND updatedAt BETWEEN :since AND :upper',
+            'ExpressionAttributeValues': {':day': day, ':since': since, ':upper': upper},
+            'Limit': SCAN_PAGE_SIZE,
+            'ReturnConsumedCapacity': 'TOTAL'
+        }
+        while True:
+            response = table.query(**params)
+            yield response
+            if not response.get('LastEvaluatedKey'):
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def export_live(full=False, context=None):
+    started_at = datetime.utcnow()
+    state = load_state()
+    pending = state.get('fullExport')
+    if full and not pending:
+        pending = state['fullExport'] = {'startedAt': started_at.isoformat(), 'lastKey': None}
+        save_state(state)
+    # Changes newer than `upper` may not be in the index yet; the next run picks them up
+    upper = (started_at - timedelta(seconds=SYNC_LAG_SECONDS)).isoformat()
+    since = EPOCH if pending else state.get('watermark', EPOCH)
+
+    table = aws_clients.get_table()
+    pages = _scan_pages(table, pending['lastKey']) if pending else _changed_pages(table, since, upper)
+    ads_read = 0
+    read_units = 0.0
+    paused_seconds = 0.0
+    complete = True
+    read_started = time.monotonic()
+
+    def checkpoint(item):
+        # Everything up to `item` is in a written file
+        if pending:
+            pending['lastKey'] = {'id': item['id']}
+        else:
+            state['watermark'] = item['updatedAt']
+        save_state(state)
+
+    writer = ad_archive.ArchiveWriter('live')
+    last_item = None
+    for response in pages:
+        ads_read += response.get('ScannedCount', 0)
+        read_units += consumed_read_units(response)
+        for item in response.get('Items', []):
+            last_item = item
+            if writer.add(item, 'incremental-export'):
+                checkpoint(item)
+
+        if context is not None and context.get_remaining_time_in_millis() < MARGIN_SECONDS * 1000:
+            complete = False
+            break
+        # Hold the average rate at READ_UNITS_PER_SECOND before the next page
+        if READ_UNITS_PER_SECOND > 0 and response.get('LastEvaluatedKey'):
+            pause = read_units / READ_UNITS_PER_SECOND - (time.monotonic() - read_started)
+            if pause > 0:
+                time.sleep(pause)
+                paused_seconds += pause
+    if writer.flush():
+        checkpoint(last_item)
+
+    stats = {
+        'since': since,
+        'full': bool(pending),
+        'complete': complete,
+        'adsRead': ads_read,
+        'adsExported': writer.rows_written,
+        'readUnits': round(read_units, 1),
+        'pausedSeconds': round(paused_seconds, 3),
+        'files': writer.keys,
+        'startedAt': started_at.isoformat()
+    }
+    if complete:
+        if pending:
+            # The scan covered everything changed before the full export began
+            pending_upper = (datetime.fromisoformat(pending['startedAt'])
+                             - timedelta(seconds=SYNC_LAG_SECONDS)).isoformat()
+            state['watermark'] = max(state.get('watermark', EPOCH), pending_upper)
+            del state['fullExport']
+        else:
+            state['watermark'] = upper
+    state['lastRun'] = stats
+    save_state(state)
+    logger.info('Live export completed' if complete else 'Live export stopped before the timeout',
+                since=since, full=stats['full'], adsRead=ads_read, adsExported=writer.rows_written,
+                fileCount=len(writer.keys), readUnits=stats['readUnits'], pausedSeconds=stats['pausedSeconds'])
+    return stats
+
+
+def lambda_handler(event, context):
+    """
+    archiveExport Lambda Function
+    Exports ads changed since the last run to the `live` archive dataset,
+    stopping ARCHIVE_EXPORT_MARGIN_SECONDS before the timeout. Pass
+    {"full": true} to export every ad.
+    """
+    logger.bind(event, context)
+
+    try:
+        stats = export_live(full=bool((event or {}).get('full')), context=context)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'success': True, **stats, 'timestamp': datetime.utcnow().isoformat()})
+        }
+    except Exception as e:
+        logger.error('Live export failed', error=str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'success': False,
+                'error': f'Live export failed: {str(e)}',
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export changed live ads to the columnar archive')
+    parser.add_argument('--full', action='store_true', help='Ignore the watermark and export every ad')
+    args = parser.parse_args(argv)
+
+    stats = export_live(full=args.full)
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Shared AWS Clients for Business Ad Lambda Functions
+
+Creates the DynamoDB resource and S3 client once per container instead of
+once per request. Each handler calls warm() at module level with the clients
+it needs; inside Lambda (or with PRIME_CLIENTS=1) those clients are built
+and credentials resolved at import time, so the work lands in the init phase
+- which runs with boosted CPU and is captured by SnapStart snapshots - rather
+than on the first user request. Elsewhere the clients are created lazily on
+first use, which keeps local imports and tests cheap.
+
+Environment variables:
+    PRIME_CLIENTS   1 to build clients at import, 0 to defer to first use
+                    (default: 1 inside Lambda, 0 elsewhere)
+    ADS_TABLE       DynamoDB table holding the ads (default BusinessAds)
+"""
+
+import os
+import random
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+ADS_TABLE = os.environ.get('ADS_TABLE', 'BusinessAds')
+
+# Standard retry mode backs off on throttling; keep-alive lets warm
+# containers reuse TLS connections between invocations.
+CLIENT_CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=5,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+    max_pool_connections=32,
+    tcp_keepalive=True
+)
+
+_lock = threading.Lock()
+_dynamodb = None
+_s3 = None
+_tables = {}
+
+
+def get_dynamodb():
+    """Return the container-wide DynamoDB resource."""
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                _dynamodb = boto3.resource('dynamodb', config=CLIENT_CONFIG)
+    return _dynamodb
+
+
+def get_table(name=ADS_TABLE):
+    """Return a cached Table resource (defaults to the ads table)."""
+    table = _tables.get(name)
+    if table is None:
+        table = get_dynamodb().Table(name)
+        _tables[name] = table
+    return table
+
+
+def get_s3():
+    """Return the container-wide S3 client."""
+    global _s3
+    if _s3 is None:
+        with _lock:
+            if _s3 is None:
+                _s3 = boto3.client('s3', config=CLIENT_CONFIG)
+    return _s3
+
+
+def batch_get(table_name, keys, projection=None, names=None, max_attempts=6):
+    """
+    BatchGetItem for up to 100 keys, retrying UnprocessedKeys with
+    exponential backoff. Returns the found items (order not guaranteed).
+    """
+    request = {table_name: {'Keys': list(keys)}}
+    if projection:
+        request[table_name]['ProjectionExpression'] = projection
+    if names:
+        request[table_name]['ExpressionAttributeNames'] = names
+
+    items = []
+    attempt = 0
+    while request:
+        response = get_dynamodb().batch_get_item(RequestItems=request)
+        items.extend(response.get('Responses', {}).get(table_name, []))
+        request = response.get('UnprocessedKeys') or {}
+        if request:
+            attempt += 1
+            if attempt >= max_attempts:
+                raise RuntimeError(f"BatchGetItem left keys unprocessed after {attempt} attempts")
+            time.sleep(min(0.05 * (2 ** attempt), 1.0))
+    return items
+
+
+def prime(tables=(ADS_TABLE,), s3=False):
+    """
+    Build the given clients and resolve credentials up front.
+    Safe to call repeatedly; only the first call does any work.
+    """
+    for name in tables:
+        get_table(name)
+    if s3:
+        get_s3()
+    session = getattr(boto3, 'DEFAULT_SESSION', None)
+    if session is not None:
+        session.get_credentials()
+
+
+def reset():
+    """Drop cached clients so the next call builds fresh ones (local tooling)."""
+    global _dynamodb, _s3
+    with _lock:
+        _dynamodb = None
+        _s3 = None
+        _tables.clear()
+
+
+def _after_restore():
+    # Restored SnapStart containers share the snapshot's PRNG state; reseed
+    # so log sampling and any random jitter differ between containers.
+    random.seed()
+
+
+def _should_prime():
+    setting = os.environ.get('PRIME_CLIENTS')
+    if setting is not None:
+        return setting == '1'
+    return 'AWS_LAMBDA_FUNCTION_NAME' in os.environ
+
+
+def warm(tables=(ADS_TABLE,), s3=False):
+    """
+    Init-phase hook, called at handler module level. Primes only the clients
+    that handler uses, and only when priming is enabled.
+    """
+    if _should_prime():
+        prime(tables, s3)
+
+
+try:
+    from snapshot_restore_py import register_after_restore
+    register_after_restore(_after_restore)
+except ImportError:
+    pass
@@ -0,0 +1,81 @@
+"""
+Delta Sync Backfill - Add syncDay to Existing Ads
+
+The delta-sync index (ad_sync.SYNC_INDEX) is sparse: only ads with a
+`syncDay` attribute appear in it. New writes set it; this one-off script
+sets it on ads written before delta sync shipped, derived from their
+`updatedAt`, so their next change is not the first time a client sees them.
+
+The update is conditional on `updatedAt` still holding the value that was
+read, so an ad updated mid-run (which sets its own syncDay) is left alone.
+
+Usage:
+    python aws_lambda_fixes/backfill_sync_day.py --dry-run
+    python aws_lambda_fixes/backfill_sync_day.py
+"""
+
+import argparse
+import json
+import sys
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_logger import get_logger
+from ad_sync import sync_day
+
+logger = get_logger('backfillSyncDay')
+
+
+def backfill(dry_run=False):
+    table = aws_clients.get_table()
+    scan_params = {
+        'FilterExpression': 'attribute_not_exists(syncDay) AND attribute_exists(updatedAt)',
+        'ProjectionExpression': 'id, updatedAt'
+    }
+    stats = {'adsScanned': 0, 'adsUpdated': 0, 'adsSkipped': 0}
+
+    while True:
+        response = table.scan(**scan_params)
+        items = response.get('Items', [])
+        stats['adsScanned'] += len(items)
+
+        for item in items:
+            if dry_run:
+                stats['adsUpdated'] += 1
+                continue
+            try:
+                table.update_item(
+                    Key={'id': item['id']},
+                    UpdateExpression='SET syncDay = :sync_day',
+                    ConditionExpression='updatedAt = :updated_at',
+                    ExpressionAttributeValues={':sync_day': sync_day(item['updatedAt']),
+                                               ':updated_at': item['updatedAt']}
+                )
+                stats['adsUpdated'] += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                stats['adsSkipped'] += 1
+                logger.warning('Ad changed during backfill, skipped', adId=item['id'])
+
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    logger.info('syncDay backfill finished', dryRun=dry_run, **stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Set syncDay on ads written before delta sync')
+    parser.add_argument('--dry-run', action='store_true', help='Count ads that would be updated without writing')
+    args = parser.parse_args(argv)
+
+    stats = backfill(dry_run=args.dry_run)
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
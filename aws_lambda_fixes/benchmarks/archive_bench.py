@@ -0,0 +1,127 @@
+"""
+Columnar Archive Benchmark
+
+Seeds the in-memory fakes with synthetic ads and measures the archive
+paths end to end:
+
+    - full        archive_export_lambda --full: rows/s, files, bytes
+    - incremental the same export after touching a fraction of ads; only
+                  those should be read and exported
+    - ttlCleanup  expired ads removed, then archived in one batch by the
+                  stream consumer (sync_tombstones_lambda)
+
+Archive size is compared with the same rows as plain JSON to show the
+columnar compression ratio. When pyarrow is installed, the Parquet files are
+read back to check row counts. The export runs unpaced
+(ARCHIVE_EXPORT_READ_UNITS=0) so the figures show raw throughput.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/archive_bench.py
+    python aws_lambda_fixes/benchmarks/archive_bench.py --ads 200000 --touched 0.02
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('ARCHIVE_EXPORT_READ_UNITS', '0')
+os.environ.setdefault('SYNC_LAG_SECONDS', '0')  # Touched ads are exported straight away
+
+from fake_aws import FakeAWS  # noqa: E402
+from run_benchmarks import scheduled_event, seed_table  # noqa: E402
+
+
+def archive_files(aws, dataset):
+    import ad_archive
+
+    # Parquet files, or the JSON lines fallback dataset without pyarrow
+    prefixes = (f"{ad_archive.ARCHIVE_PREFIX}{dataset}/",
+                f"{ad_archive.ARCHIVE_PREFIX}{dataset}{ad_archive.FALLBACK_DATASET_SUFFIX}/")
+    return {key: obj for (bucket, key), obj in aws.s3.objects.items()
+            if bucket == ad_archive.ARCHIVE_BUCKET and key.startswith(prefixes)}
+
+
+def rows_in(files):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    return sum(pq.read_metadata(io.BytesIO(obj['Body'])).num_rows
+               for key, obj in files.items() if key.endswith('.parquet'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Columnar archive benchmark')
+    parser.add_argument('--ads', type=int, default=100000)
+    parser.add_argument('--touched', type=float, default=0.01, help='Fraction of ads updated before the incremental run')
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import archive_export_lambda
+    import sync_tombstones_lambda
+    from ad_sync import sync_fields
+    import ttl_cleanup_lambda
+
+    results = {'ads': args.ads}
+    with FakeAWS() as aws:
+        table = seed_table(aws, args.ads, args.seed)
+
+        started = time.perf_counter()
+        full = archive_export_lambda.export_live(full=True)
+        seconds = time.perf_counter() - started
+        files = archive_files(aws, 'live')
+        archive_bytes = sum(len(obj['Body']) for obj in files.values())
+        json_bytes = sum(len(json.dumps(item, default=str)) for item in table._items.values())
+        results['full'] = {
+            'rowsExported': full['adsExported'],
+            'rowsReadBack': rows_in(files),
+            'files': len(files),
+            'seconds': round(seconds, 3),
+            'rowsPerSecond': round(full['adsExported'] / seconds) if seconds else None,
+            'archiveBytes': archive_bytes,
+            'jsonBytes': json_bytes,
+            'compressionRatio': round(json_bytes / archive_bytes, 1) if archive_bytes else None
+        }
+
+        rnd = random.Random(args.seed)
+        now = datetime.utcnow().isoformat()
+        touched = rnd.sample(sorted(table._items), int(args.ads * args.touched))
+        for key in touched:
+            table._items[key].update(sync_fields(now))
+
+        started = time.perf_counter()
+        incremental = archive_export_lambda.export_live()
+        results['incremental'] = {
+            'touched': len(touched),
+            'rowsRead': incremental['adsRead'],
+            'rowsExported': incremental['adsExported'],
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+        table.enable_stream()
+        started = time.perf_counter()
+        cleanup = json.loads(ttl_cleanup_lambda.lambda_handler(scheduled_event(), None)['body'])
+        removals = json.loads(sync_tombstones_lambda.lambda_handler(table.drain_stream(), None)['body'])
+        expired_files = archive_files(aws, 'expired')
+        results['ttlCleanup'] = {
+            'adsDeleted': cleanup.get('ads_deleted'),
+            'adsArchived': removals['tombstones'].get('ttl-expired', 0),
+            'rowsReadBack': rows_in(expired_files),
+            'files': len(expired_files),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
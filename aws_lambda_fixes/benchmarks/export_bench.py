@@ -0,0 +1,161 @@
+"""
+Bulk Export vs Paged getAds Benchmark
+
+Seeds the in-memory fakes with synthetic ads and compares two ways for a
+partner to mirror every active ad:
+
+    paged   getAds calls of 100 ads (featured=false, so every page is a
+            live scan), timed over --pages pages and extrapolated to the
+            whole table
+    export  exportAds_lambda writing the whole table as NDJSON on S3,
+            with and without a field projection
+
+For each mode it reports ads/s, DynamoDB and S3 calls, and bytes per ad.
+The export's working memory is measured in a separate run that discards
+uploaded part bodies (the fake would otherwise hold the whole file in
+memory), at the full size and a quarter of it. The fake scan's own
+bookkeeping grows with the table, so a bare scan of the same table is
+measured too; the export's overhead above it should stay flat.
+
+getAds has no page cursor, so the paged baseline repeats first pages: the
+same per-page cost (a 100-item scan, view-count writes and the envelope)
+a partner would pay on every page.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/export_bench.py
+    python aws_lambda_fixes/benchmarks/export_bench.py --ads 1000000 --pages 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from fake_aws import FakeAWS  # noqa: E402
+from run_benchmarks import api_event, seed_table  # noqa: E402
+
+PROJECTION = 'title,businessName,location,category,imageUrls,createdAt,updatedAt'
+
+
+def calls(aws, before):
+    after = aws.counter.snapshot()
+    return {operation: after[operation] - before.get(operation, 0)
+            for operation in after if after[operation] != before.get(operation, 0)}
+
+
+def run_paged(aws, pages, active_ads):
+    import getAds_lambda
+
+    before = aws.counter.snapshot()
+    ads = body_bytes = 0
+    started = time.perf_counter()
+    for _ in range(pages):
+        response = getAds_lambda.lambda_handler(api_event('GET', '/ads', {'featured': 'false', 'limit': '100'}), None)
+        body_bytes += len(response['body'])
+        ads += len(json.loads(response['body'])['ads'])
+    seconds = time.perf_counter() - started
+    used = calls(aws, before)
+    rate = ads / seconds if seconds else 0
+    return {
+        'pages': pages,
+        'ads': ads,
+        'adsPerSecond': round(rate),
+        'bytesPerAd': round(body_bytes / ads) if ads else None,
+        'ddbCallsPer1000Ads': round(sum(v for k, v in used.items() if k.startswith('dynamodb.')) * 1000 / ads, 1),
+        'extrapolatedSecondsForTable': round(active_ads / rate, 1) if rate else None,
+        'calls': used
+    }
+
+
+def run_export(aws, fields):
+    import exportAds_lambda
+
+    before = aws.counter.snapshot()
+    started = time.perf_counter()
+    result = exportAds_lambda.export_file(fields=exportAds_lambda.parse_fields(fields))
+    seconds = time.perf_counter() - started
+    body = aws.s3.objects[(exportAds_lambda.EXPORT_BUCKET, result['key'])]['Body']
+    used = calls(aws, before)
+    return {
+        'fields': fields or 'all',
+        'ads': result['rows'],
+        'linesInFile': body.count(b'\n'),
+        'seconds': round(seconds, 3),
+        'adsPerSecond': round(result['rows'] / seconds) if seconds else None,
+        'bytesPerAd': round(result['bytes'] / result['rows']) if result['rows'] else None,
+        'ddbCallsPer1000Ads': round(sum(v for k, v in used.items() if k.startswith('dynamodb.'))
+                                    * 1000 / result['rows'], 2),
+        'calls': used
+    }
+
+
+def _traced_peak(func):
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def _bare_scan(table):
+    params = {}
+    while True:
+        response = table.scan(**params)
+        if not response.get('LastEvaluatedKey'):
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def export_memory(size, seed):
+    """Peak traced memory of one full export vs a bare scan, with uploaded bodies discarded."""
+    import exportAds_lambda
+
+    with FakeAWS() as aws:
+        table = seed_table(aws, size, seed)
+        upload_part, put_object = aws.s3.upload_part, aws.s3.put_object
+        aws.s3.upload_part = lambda Body=b'', **params: upload_part(Body=b'', **params)
+        aws.s3.put_object = lambda Body=b'', **params: put_object(Body=b'', **params)
+        _, scan_peak = _traced_peak(lambda: _bare_scan(table))
+        result, export_peak = _traced_peak(exportAds_lambda.export_file)
+    return {
+        'ads': size,
+        'exportedBytes': result['bytes'],
+        'bareScanPeakMB': round(scan_peak / 1e6, 1),
+        'exportPeakMB': round(export_peak / 1e6, 1),
+        'exportOverheadMB': round((export_peak - scan_peak) / 1e6, 1)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk NDJSON export vs paged getAds benchmark')
+    parser.add_argument('--ads', type=int, default=200000)
+    parser.add_argument('--pages', type=int, default=200, help='getAds pages timed for the paged baseline')
+    parser.add_argument('--seed', type=int, default=9)
+    parser.add_argument('--skip-memory', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = {'ads': args.ads}
+    with FakeAWS() as aws:
+        table = seed_table(aws, args.ads, args.seed)
+        active = sum(1 for item in table._items.values() if item.get('status') == 'active')
+        results['activeAds'] = active
+        results['export'] = run_export(aws, None)
+        results['exportProjected'] = run_export(aws, PROJECTION)
+        results['paged'] = run_paged(aws, args.pages, active)
+        results['speedup'] = round(results['export']['adsPerSecond'] / results['paged']['adsPerSecond'], 1)
+
+    if not args.skip_memory:
+        results['memory'] = [export_memory(max(args.ads // 4, 1), args.seed), export_memory(args.ads, args.seed)]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
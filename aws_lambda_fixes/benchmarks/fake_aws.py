@@ -0,0 +1,860 @@
+"""
+In-Memory DynamoDB and S3 Stand-ins for Local Benchmarks
+
+Implements the subset of the boto3 resource/client API the ad handlers use,
+backed by plain dicts, so handlers can be driven locally without AWS
+credentials or network calls. Every API call is counted per operation so
+the benchmark can report DynamoDB/S3 calls per request.
+
+Condition expressions support comparisons, AND/OR/NOT, parentheses,
+BETWEEN, IN and the attribute_exists/attribute_not_exists/begins_with/contains/size
+functions; update expressions support SET (including if_not_exists and +/-), ADD
+and REMOVE.
+"""
+
+import bisect
+import io
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+SCAN_PAGE_SIZE = 1000  # Roughly DynamoDB's 1MB page for typical ad items
+
+
+def _client_error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+class CallCounter:
+    """
+    Thread-safe per-operation call counter shared by the fakes. A non-zero
+    latency_ms sleeps on every call to approximate a network round trip.
+    """
+
+    def __init__(self, latency_ms=0):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.latency_seconds = latency_ms / 1000.0
+
+    def hit(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def total(self, prefix=''):
+        with self._lock:
+            return sum(count for op, count in self.calls.items() if op.startswith(prefix))
+
+
+# ---------------------------------------------------------------------------
+# Expression evaluation
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'\s*(<>|<=|>=|[=<>(),]|[#:]?[\w.]+)')
+_FUNCTIONS = ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains', 'size')
+
+
+def _name(token, names):
+    return names.get(token, token) if token.startswith('#') else token
+
+
+@lru_cache(maxsize=256)
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"Unsupported expression in fake: {expression}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tuple(tokens)
+
+
+def _compare(left, operator, right):
+    if left is None:
+        return operator == '<>'
+    if isinstance(left, bool) or isinstance(right, bool):
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        return False
+    try:
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        if operator == '>=':
+            return left >= right
+    except TypeError:
+        return False
+    return False
+
+
+class _ConditionParser:
+    """
+    Recursive-descent evaluator for DynamoDB condition expressions:
+    OR / AND / NOT, parentheses, comparisons, BETWEEN, IN and functions.
+    """
+
+    def __init__(self, item, expression, names, values):
+        self.item = item
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names = names
+        self.values = values
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _expect(self, expected):
+        token = self._next()
+        if token != expected:
+            raise ValueError(f"Expected {expected!r} but found {token!r}")
+
+    def parse(self):
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token {self._peek()!r}")
+        return result
+
+    def _or(self):
+        result = self._and()
+        while self._peek() and self._peek().upper() == 'OR':
+            self._next()
+            right = self._and()
+            result = result or right
+        return result
+
+    def _and(self):
+        result = self._not()
+        while self._peek() and self._peek().upper() == 'AND':
+            self._next()
+            right = self._not()
+            result = result and right
+        return result
+
+    def _not(self):
+        if self._peek() and self._peek().upper() == 'NOT':
+            self._next()
+            return not self._not()
+        return self._primary()
+
+    def _operand(self):
+        token = self._next()
+        if token.startswith(':'):
+            return self.values[token]
+        if token == 'size':
+            self._expect('(')
+            value = self.item.get(_name(self._next(), self.names))
+            self._expect(')')
+            return len(value) if value is not None else None
+        return self.item.get(_name(token, self.names))
+
+    def _primary(self):
+        token = self._peek()
+        if token == '(':
+            self._next()
+            result = self._or()
+            self._expect(')')
+            return result
+
+        if token in _FUNCTIONS and token != 'size':
+            self._next()
+            self._expect('(')
+            attribute = _name(self._next(), self.names)
+            argument = None
+            if self._peek() == ',':
+                self._next()
+                argument = self._operand()
+            self._expect(')')
+            value = self.item.get(attribute)
+            if token == 'attribute_exists':
+                return attribute in self.item
+            if token == 'attribute_not_exists':
+                return attribute not in self.item
+            if token == 'begins_with':
+                return isinstance(value, str) and value.startswith(argument)
+            return value is not None and argument in value
+
+        left = self._operand()
+        operator = self._next()
+        if operator.upper() == 'BETWEEN':
+            low = self._operand()
+            self._expect('AND')
+            high = self._operand()
+            return left is not None and low <= left <= high
+        if operator.upper() == 'IN':
+            self._expect('(')
+            options = [self._operand()]
+            while self._peek() == ',':
+                self._next()
+                options.append(self._operand())
+            self._expect(')')
+            return left in options
+        return _compare(left, operator, self._operand())
+
+
+def evaluate_condition(item, expression, names=None, values=None):
+    """Evaluate a filter/condition/key expression against an item dict."""
+    if not expression:
+        return True
+    return _ConditionParser(item, expression, names or {}, values or {}).parse()
+
+
+def _numeric(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    return value
+
+
+def apply_update(item, expression, names=None, values=None):
+    """Apply a SET/ADD/REMOVE update expression to an item dict in place."""
+    names = names or {}
+    values = values or {}
+    clauses = re.split(r'\b(SET|ADD|REMOVE|DELETE)\b', expression)
+    action = None
+    for chunk in clauses:
+        chunk = chunk.strip()
+        if chunk in ('SET', 'ADD', 'REMOVE', 'DELETE'):
+            action = chunk
+            continue
+        if not chunk:
+            continue
+        for assignment in [part.strip() for part in chunk.split(',') if part.strip()]:
+            if action == 'SET':
+                target, source = [side.strip() for side in assignment.split('=', 1)]
+                attribute = _name(target, names)
+                match = re.match(r'^if_not_exists\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)(?:\s*([+-])\s*(:\w+))?$', source)
+                if match:
+                    base = item.get(_name(match.group(1), names), values[match.group(2)])
+                    if match.group(3):
+                        delta = _numeric(values[match.group(4)])
+                        base = _numeric(base) + delta if match.group(3) == '+' else _numeric(base) - delta
+                    item[attribute] = base
+                    continue
+                match = re.match(r'^([#\w]+)\s*([+-])\s*(:\w+)$', source)
+                if match:
+                    base = _numeric(item.get(_name(match.group(1), names), 0))
+                    delta = _numeric(values[match.group(3)])
+                    item[attribute] = base + delta if match.group(2) == '+' else base - delta
+                    continue
+                item[attribute] = values[source]
+            elif action == 'ADD':
+                target, placeholder = assignment.split()
+                attribute = _name(target, names)
+                if isinstance(values[placeholder], (set, frozenset)):
+                    item[attribute] = set(item.get(attribute, set())) | set(values[placeholder])
+                else:
+                    item[attribute] = _numeric(item.get(attribute, 0)) + _numeric(values[placeholder])
+            elif action == 'DELETE':
+                target, placeholder = assignment.split()
+                attribute = _name(target, names)
+                remaining = set(item.get(attribute, set())) - set(values[placeholder])
+                if remaining:
+                    item[attribute] = remaining
+                else:
+                    item.pop(attribute, None)
+            elif action == 'REMOVE':
+                item.pop(_name(assignment, names), None)
+    return item
+
+
+def _project(item, projection, names):
+    if not projection:
+        return dict(item)
+    attributes = [_name(token.strip(), names) for token in projection.split(',')]
+    return {attribute: item[attribute] for attribute in attributes if attribute in item}
+
+
+def _to_dynamo_numbers(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {key: _to_dynamo_numbers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo_numbers(item) for item in value]
+    return value
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------
+
+class FakeTable:
+    """Dict-backed stand-in for boto3's DynamoDB Table resource."""
+
+    def __init__(self, name, counter, key_schema=('id',), indexes=None, hot_key_wps=None):
+        self.name = name
+        self.counter = counter
+        self.key_schema = tuple(key_schema)
+        self.indexes = indexes or {}  # index name -> (partition attr, sort attr or None)
+        self.hot_key_wps = hot_key_wps  # per-item writes/second before throttling
+        self._items = {}
+        self._lock = threading.RLock()
+        self._scans = {}  # (Segment, TotalSegments) -> (key snapshot, positions)
+        self._write_windows = {}
+        self.stream = None  # list of stream records once enable_stream() is called
+
+    # -- helpers -----------------------------------------------------------
+
+    def _key(self, key):
+        return tuple(key[attribute] for attribute in self.key_schema)
+
+    def _key_dict(self, item):
+        return {attribute: item[attribute] for attribute in self.key_schema}
+
+    def _check_write_rate(self, key, operation):
+        # Approximates DynamoDB's per-partition write limit for a single hot item
+        if not self.hot_key_wps:
+            return
+        second = int(time.time())
+        window_second, count = self._write_windows.get(key, (second, 0))
+        if window_second != second:
+            window_second, count = second, 0
+        if count >= self.hot_key_wps:
+            self.counter.hit('dynamodb.Throttled')
+            raise _client_error('ProvisionedThroughputExceededException',
+                                'Throughput exceeds the current capacity for this item', operation)
+        self._write_windows[key] = (window_second, count + 1)
+
+    # -- stream --------------------------------------------------------------
+
+    def enable_stream(self):
+        """Record REMOVE events (NEW_AND_OLD_IMAGES view) for drain_stream()."""
+        self.stream = []
+        return self
+
+    def _record_remove(self, old_item, identity=None):
+        if self.stream is None or old_item is None:
+            return
+        from boto3.dynamodb.types import TypeSerializer
+
+        serializer = TypeSerializer()
+        image = {name: serializer.serialize(value) for name, value in old_item.items()}
+        record = {
+            'eventName': 'REMOVE',
+            'dynamodb': {
+                'ApproximateCreationDateTime': time.time(),
+                'Keys': {attribute: image[attribute] for attribute in self.key_schema},
+                'OldImage': image,
+            },
+        }
+        if identity:
+            record['userIdentity'] = identity
+        self.stream.append(record)
+
+    def drain_stream(self):
+        """Return the pending stream records as one Lambda event and clear them."""
+        with self._lock:
+            records = self.stream or []
+            if self.stream is not None:
+                self.stream = []
+        return {'Records': records}
+
+    def expire_ttl(self, now=None):
+        """Emulate DynamoDB's native TTL deletes; returns the number removed."""
+        now = time.time() if now is None else now
+        identity = {'type': 'Service', 'principalId': 'dynamodb.amazonaws.com'}
+        with self._lock:
+            expired = [key for key, item in self._items.items()
+                       if isinstance(item.get('ttl'), (int, Decimal)) and item['ttl'] <= now]
+            for key in expired:
+                self._record_remove(self._items.pop(key), identity)
+        return len(expired)
+
+    def seed(self, items):
+        """Bulk load items without counting calls."""
+        with self._lock:
+            for item in items:
+                self._items[self._key(item)] = _to_dynamo_numbers(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def all_items(self):
+        with self._lock:
+            return [dict(item) for item in self._items.values()]
+
+    # -- single item operations ---------------------------------------------
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **_):
+        self.counter.hit('dynamodb.PutItem')
+        with self._lock:
+            key = self._key(Item)
+            self._check_write_rate(key, 'PutItem')
+            if ConditionExpression:
+                existing = self._items.get(key, {})
+                if not evaluate_condition(existing, ConditionExpression,
+                                          ExpressionAttributeNames, ExpressionAttributeValues):
+                    raise _client_error('ConditionalCheckFailedException',
+                                        'The conditional request failed', 'PutItem')
+            self._items[key] = _to_dynamo_numbers(dict(Item))
+        return {}
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **_):
+        self.counter.hit('dynamodb.GetItem')
+        with self._lock:
+            item = self._items.get(self._key(Key))
+            if item is None:
+                return {}
+            return {'Item': _project(item, ProjectionExpression, ExpressionAttributeNames or {})}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ConditionExpression=None,
+                    ReturnValues='NONE', **_):
+        self.counter.hit('dynamodb.UpdateItem')
+        with self._lock:
+            key = self._key(Key)
+            self._check_write_rate(key, 'UpdateItem')
+            existing = self._items.get(key)
+            if ConditionExpression and not evaluate_condition(existing or {}, ConditionExpression,
+                                                              ExpressionAttributeNames,
+                                                              ExpressionAttributeValues):
+                raise _client_error('ConditionalCheckFailedException',
+                                    'The conditional request failed', 'UpdateItem')
+            item = dict(existing) if existing else dict(Key)
+            apply_update(item, UpdateExpression, ExpressionAttributeNames,
+                         _to_dynamo_numbers(ExpressionAttributeValues or {}))
+            self._items[key] = item
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            return {'Attributes': dict(item)}
+        if ReturnValues == 'ALL_OLD' and existing:
+            return {'Attributes': dict(existing)}
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE', **_):
+        self.counter.hit('dynamodb.DeleteItem')
+        with self._lock:
+            key = self._key(Key)
+            self._check_write_rate(key, 'DeleteItem')
+            existing = self._items.get(key)
+            if ConditionExpression and not evaluate_condition(existing or {}, ConditionExpression,
+                                                              ExpressionAttributeNames,
+                                                              ExpressionAttributeValues):
+                raise _client_error('ConditionalCheckFailedException',
+                                    'The conditional request failed', 'DeleteItem')
+            self._record_remove(self._items.pop(key, None))
+        if ReturnValues == 'ALL_OLD' and existing:
+            return {'Attributes': dict(existing)}
+        return {}
+
+    # -- multi item operations ----------------------------------------------
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, FilterExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+             ProjectionExpression=None, Segment=None, TotalSegments=None, **_):
+        self.counter.hit('dynamodb.Scan')
+        names = ExpressionAttributeNames or {}
+        with self._lock:
+            scan_id = (Segment, TotalSegments)
+            if ExclusiveStartKey is None or scan_id not in self._scans:
+                snapshot = list(self._items.keys())
+                if TotalSegments:
+                    snapshot = [key for index, key in enumerate(snapshot) if index % TotalSegments == Segment]
+                self._scans[scan_id] = (snapshot, None)
+            snapshot, positions = self._scans[scan_id]
+            start = 0
+            if ExclusiveStartKey is not None:
+                if positions is None:
+                    positions = {key: index for index, key in enumerate(snapshot)}
+                    self._scans[scan_id] = (snapshot, positions)
+                start = positions.get(self._key(ExclusiveStartKey), -1) + 1
+
+            page_size = min(Limit or SCAN_PAGE_SIZE, SCAN_PAGE_SIZE)
+            keys = snapshot[start:start + page_size]
+            items = []
+            for key in keys:
+                item = self._items.get(key)
+                if item is None:
+                    continue
+                if evaluate_condition(item, FilterExpression, names, ExpressionAttributeValues):
+                    items.append(_project(item, ProjectionExpression, names))
+
+            response = {'Items': items, 'Count': len(items), 'ScannedCount': len(keys)}
+            if start + page_size < len(snapshot):
+                response['LastEvaluatedKey'] = dict(zip(self.key_schema, keys[-1]))
+            return response
+
+    def query(self, KeyConditionExpression, IndexName=None, Limit=None, ExclusiveStartKey=None,
+              ScanIndexForward=True, FilterExpression=None, ExpressionAttributeNames=None,
+              ExpressionAttributeValues=None, ProjectionExpression=None, **_):
+        self.counter.hit('dynamodb.Query')
+        names = ExpressionAttributeNames or {}
+        if IndexName:
+            partition, sort = self.indexes[IndexName]
+        else:
+            partition = self.key_schema[0]
+            sort = self.key_schema[1] if len(self.key_schema) > 1 else None
+
+        # Narrow to the partition before parsing the full key condition per item
+        partition_value = None
+        for name, placeholder in re.findall(r'(#?\w+)\s*=\s*(:\w+)', KeyConditionExpression):
+            if names.get(name, name) == partition:
+                partition_value = (ExpressionAttributeValues or {}).get(placeholder)
+        with self._lock:
+            candidates = [item for item in self._items.values()
+                          if partition in item and (partition_value is None or item[partition] == partition_value)]
+            matches = [item for item in candidates
+                       if (sort is None or sort in item)
+                       and evaluate_condition(item, KeyConditionExpression, names, ExpressionAttributeValues)]
+        if sort:
+            matches.sort(key=lambda item: item[sort], reverse=not ScanIndexForward)
+
+        def position_key(item):
+            key = self._key_dict(item)
+            key[partition] = item[partition]
+            if sort:
+                key[sort] = item[sort]
+            return key
+
+        start = 0
+        if ExclusiveStartKey:
+            for index, item in enumerate(matches):
+                if position_key(item) == ExclusiveStartKey:
+                    start = index + 1
+                    break
+
+        page_size = min(Limit or SCAN_PAGE_SIZE, SCAN_PAGE_SIZE)
+        page = matches[start:start + page_size]
+        items = [_project(item, ProjectionExpression, names) for item in page
+                 if evaluate_condition(item, FilterExpression, names, ExpressionAttributeValues)]
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(page)}
+        if start + page_size < len(matches):
+            response['LastEvaluatedKey'] = position_key(page[-1])
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self)
+
+
+class _FakeBatchWriter:
+    """Buffers writes and flushes them in 25-item BatchWriteItem calls."""
+
+    def __init__(self, table):
+        self.table = table
+        self._buffer = []
+
+    def put_item(self, Item):
+        self._buffer.append(('put', Item))
+        if len(self._buffer) >= 25:
+            self._flush()
+
+    def delete_item(self, Key):
+        self._buffer.append(('delete', Key))
+        if len(self._buffer) >= 25:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        self.table.counter.hit('dynamodb.BatchWriteItem')
+        with self.table._lock:
+            for action, payload in self._buffer:
+                if action == 'put':
+                    self.table._items[self.table._key(payload)] = _to_dynamo_numbers(dict(payload))
+                else:
+                    self.table._record_remove(self.table._items.pop(self.table._key(payload), None))
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._flush()
+        return False
+
+
+class FakeDynamoClient:
+    """Low-level client operations the handlers reach via table.meta.client."""
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    def batch_get_item(self, RequestItems, **_):
+        self.resource.counter.hit('dynamodb.BatchGetItem')
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.resource.Table(table_name)
+            names = request.get('ExpressionAttributeNames') or {}
+            found = []
+            with table._lock:
+                for key in request['Keys']:
+                    item = table._items.get(table._key(key))
+                    if item is not None:
+                        found.append(_project(item, request.get('ProjectionExpression'), names))
+            responses[table_name] = found
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeDynamoResource:
+    """Stand-in for boto3.resource('dynamodb'); tables are created on first use."""
+
+    def __init__(self, counter=None, hot_key_wps=None):
+        self.counter = counter or CallCounter()
+        self.hot_key_wps = hot_key_wps
+        self.tables = {}
+        self.meta = _Meta(FakeDynamoClient(self))
+        self._lock = threading.Lock()
+
+    def batch_get_item(self, **params):
+        return self.meta.client.batch_get_item(**params)
+
+    def create_table(self, name, key_schema=('id',), indexes=None):
+        with self._lock:
+            table = FakeTable(name, self.counter, key_schema, indexes, self.hot_key_wps)
+            table.meta = self.meta
+            self.tables[name] = table
+            return table
+
+    def Table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = self.create_table(name)
+        return table
+
+
+# ---------------------------------------------------------------------------
+# S3
+# ---------------------------------------------------------------------------
+
+class FakeS3Client:
+    """Dict-backed stand-in for boto3.client('s3')."""
+
+    def __init__(self, counter=None):
+        self.counter = counter or CallCounter()
+        self.objects = {}  # (bucket, key) -> object dict
+        self._listings = {}  # (bucket, prefix) -> sorted keys as of the listing's first page
+        self._uploads = {}  # upload id -> in-progress multipart upload
+        self._lock = threading.Lock()
+
+    def seed_object(self, bucket, key, body=b'', content_type='image/jpeg', last_modified=None):
+        self.objects[(bucket, key)] = {
+            'Body': body,
+            'ContentType': content_type,
+            'ContentLength': len(body),
+            'LastModified': last_modified or datetime.utcnow()
+        }
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType='binary/octet-stream', **_):
+        self.counter.hit('s3.PutObject')
+        body = Body.encode() if isinstance(Body, str) else (Body.read() if hasattr(Body, 'read') else Body)
+        with self._lock:
+            self.seed_object(Bucket, Key, body, ContentType)
+        return {}
+
+    def get_object(self, Bucket, Key, Range=None, **_):
+        self.counter.hit('s3.GetObject')
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise _client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject')
+        body = obj['Body']
+        if Range:
+            start, end = Range.replace('bytes=', '').split('-')
+            body = body[int(start):int(end) + 1]
+        return {'Body': io.BytesIO(body), 'ContentType': obj['ContentType'],
+                'ContentLength': len(body), 'LastModified': obj['LastModified']}
+
+    def head_object(self, Bucket, Key, **_):
+        self.counter.hit('s3.HeadObject')
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise _client_error('404', 'Not Found', 'HeadObject')
+        return {'ContentType': obj['ContentType'], 'ContentLength': obj['ContentLength'],
+                'LastModified': obj['LastModified']}
+
+    def delete_object(self, Bucket, Key, **_):
+        self.counter.hit('s3.DeleteObject')
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **_):
+        self.counter.hit('s3.DeleteObjects')
+        deleted = []
+        with self._lock:
+            for entry in Delete['Objects']:
+                self.objects.pop((Bucket, entry['Key']), None)
+                deleted.append({'Key': entry['Key']})
+        return {'Deleted': deleted}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, **_):
+        self.counter.hit('s3.ListObjectsV2')
+        # Sort once per listing and resume after the last returned key, so
+        # paging through a large bucket stays linear and tolerates deletes.
+        if not ContinuationToken or (Bucket, Prefix) not in self._listings:
+            self._listings[(Bucket, Prefix)] = sorted(
+                key for bucket, key in list(self.objects) if bucket == Bucket and key.startswith(Prefix))
+        keys = self._listings[(Bucket, Prefix)]
+        start = bisect.bisect_right(keys, ContinuationToken) if ContinuationToken else 0
+        page = [key for key in keys[start:start + MaxKeys] if (Bucket, key) in self.objects]
+        response = {
+            'Contents': [{'Key': key, 'Size': self.objects[(Bucket, key)]['ContentLength'],
+                          'LastModified': self.objects[(Bucket, key)]['LastModified']} for key in page],
+            'KeyCount': len(page),
+            'IsTruncated': start + MaxKeys < len(keys)
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = keys[start + MaxKeys - 1]
+        return response
+
+    def create_multipart_upload(self, Bucket, Key, ContentType='binary/octet-stream', **_):
+        self.counter.hit('s3.CreateMultipartUpload')
+        upload_id = f"upload-{len(self._uploads) + 1}"
+        with self._lock:
+            self._uploads[upload_id] = {'Bucket': Bucket, 'Key': Key, 'ContentType': ContentType, 'Parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body=b'', **_):
+        self.counter.hit('s3.UploadPart')
+        upload = self._uploads.get(UploadId)
+        if upload is None:
+            raise _client_error('NoSuchUpload', 'The specified upload does not exist.', 'UploadPart')
+        etag = f'"{UploadId}-{PartNumber}"'
+        with self._lock:
+            upload['Parts'][PartNumber] = (etag, bytes(Body))
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **_):
+        self.counter.hit('s3.CompleteMultipartUpload')
+        with self._lock:
+            upload = self._uploads.pop(UploadId, None)
+            if upload is None:
+                raise _client_error('NoSuchUpload', 'The specified upload does not exist.',
+                                    'CompleteMultipartUpload')
+            parts = [upload['Parts'][part['PartNumber']] for part in MultipartUpload['Parts']]
+            if any(etag != part['ETag'] for (etag, _), part in zip(parts, MultipartUpload['Parts'])):
+                raise _client_error('InvalidPart', 'One or more parts could not be found.', 'CompleteMultipartUpload')
+            self.seed_object(Bucket, Key, b''.join(body for _, body in parts), upload['ContentType'])
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **_):
+        self.counter.hit('s3.AbortMultipartUpload')
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **_):
+        self.counter.hit('s3.GeneratePresignedUrl')
+        params = Params or {}
+        return f"https://{params.get('Bucket')}.s3.amazonaws.com/{params.get('Key')}?X-Amz-Expires={ExpiresIn}"
+
+    def get_paginator(self, operation):
+        return _FakePaginator(getattr(self, operation))
+
+
+class _FakePaginator:
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **params):
+        token = None
+        while True:
+            if token:
+                params['ContinuationToken'] = token
+            page = self.method(**params)
+            yield page
+            token = page.get('NextContinuationToken')
+            if not token:
+                break
+
+
+class FakeAWS:
+    """
+    Bundles the fakes and patches boto3.resource/boto3.client while active.
+
+    Usage:
+        with FakeAWS() as aws:
+            aws.dynamodb.Table('BusinessAds').seed(items)
+            handler(event, None)
+    """
+
+    def __init__(self, latency_ms=0, hot_key_wps=None):
+        self.counter = CallCounter(latency_ms)
+        self.dynamodb = FakeDynamoResource(self.counter, hot_key_wps)
+        self.s3 = FakeS3Client(self.counter)
+        self._originals = None
+
+    def resource(self, service_name, *args, **kwargs):
+        if service_name != 'dynamodb':
+            raise ValueError(f"FakeAWS has no resource for {service_name}")
+        return self.dynamodb
+
+    def client(self, service_name, *args, **kwargs):
+        if service_name == 's3':
+            return self.s3
+        if service_name == 'dynamodb':
+            return self.dynamodb.meta.client
+        raise ValueError(f"FakeAWS has no client for {service_name}")
+
+    @staticmethod
+    def _reset_shared_clients():
+        # Handlers cache clients in aws_clients; drop them so they are rebuilt
+        # against whichever boto3 entry points are currently installed.
+        shared = sys.modules.get('aws_clients')
+        if shared is not None:
+            shared.reset()
+        # Cached ads belong to the previous fake tables
+        cache = sys.modules.get('ad_cache')
+        if cache is not None:
+            cache.ads_cache.clear()
+        # Rate limit buckets and cached responses from an earlier run
+        limiter = sys.modules.get('rate_limit')
+        if limiter is not None:
+            limiter.limiter.reset()
+        get_ads = sys.modules.get('getAds_lambda')
+        if get_ads is not None:
+            get_ads.recent_responses.clear()
+        export = sys.modules.get('exportAds_lambda')
+        if export is not None:
+            export.export_limiter.reset()
+
+    def __enter__(self):
+        import boto3
+        self._originals = (boto3.resource, boto3.client)
+        boto3.resource = self.resource
+        boto3.client = self.client
+        self._reset_shared_clients()
+        return self
+
+    def __exit__(self, *exc):
+        import boto3
+        boto3.resource, boto3.client = self._originals
+        self._reset_shared_clients()
+        return False
@@ -0,0 +1,120 @@
+"""
+Like Contention Stress Test
+
+Hammers a single ad with likes from distinct users and compares two
+strategies against the in-memory fakes, with a per-item write limit that
+approximates DynamoDB's partition throughput cap:
+
+    - naive     Conditional like record + `ADD likes :1` on the ad item
+    - sharded   likeAd_lambda: like record + one of LIKE_SHARDS counter shards,
+                with the total merged back onto the ad periodically
+
+Reports throughput, throttled requests and whether the merged total matches
+the number of accepted likes.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/like_stress.py
+    python aws_lambda_fixes/benchmarks/like_stress.py --likes 20000 --concurrency 64 --hot-key-wps 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from fake_aws import FakeAWS  # noqa: E402
+from run_benchmarks import api_event  # noqa: E402
+
+AD_ID = 'viral-ad'
+
+
+def _seed_ad(aws):
+    aws.dynamodb.Table('BusinessAds').seed([{'id': AD_ID, 'title': 'Viral', 'status': 'active', 'likes': 0}])
+
+
+def naive_like(aws, user_id):
+    likes_table = aws.dynamodb.Table('BusinessAdLikes')
+    ads_table = aws.dynamodb.Table('BusinessAds')
+    try:
+        likes_table.put_item(Item={'id': f"{AD_ID}#user#{user_id}", 'adId': AD_ID, 'userId': user_id},
+                             ConditionExpression='attribute_not_exists(id)')
+        ads_table.update_item(Key={'id': AD_ID}, UpdateExpression='ADD likes :one',
+                              ExpressionAttributeValues={':one': 1})
+        return True
+    except ClientError:
+        return False
+
+
+def run_strategy(strategy, likes, concurrency, hot_key_wps, latency_ms):
+    with FakeAWS(latency_ms=latency_ms, hot_key_wps=hot_key_wps) as aws:
+        _seed_ad(aws)
+
+        if strategy == 'naive':
+            def attempt(index):
+                return naive_like(aws, f"user_{index}")
+        else:
+            import likeAd_lambda
+            likeAd_lambda._last_merged.clear()
+            likeAd_lambda._marked_dirty.clear()
+
+            def attempt(index):
+                event = api_event('POST', '/likes', body={'adId': AD_ID, 'userId': f"user_{index}"})
+                return likeAd_lambda.lambda_handler(event, None)['statusCode'] == 200
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(attempt, range(likes)))
+        elapsed = time.perf_counter() - started
+
+        accepted = sum(outcomes)
+        if strategy == 'sharded':
+            likeAd_lambda.merge_likes(AD_ID)
+        total = int(aws.dynamodb.Table('BusinessAds').get_item(Key={'id': AD_ID})['Item'].get('likes', 0))
+
+        return {
+            'strategy': strategy,
+            'likes': likes,
+            'concurrency': concurrency,
+            'accepted': accepted,
+            'throttled': likes - accepted,
+            'acceptedPerSecond': round(accepted / elapsed, 1),
+            'mergedTotal': total,
+            'totalMatches': total == accepted,
+            'throttleEvents': aws.counter.snapshot().get('dynamodb.Throttled', 0),
+            'elapsedSeconds': round(elapsed, 3)
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stress a single ad with concurrent likes')
+    parser.add_argument('--likes', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--hot-key-wps', type=int, default=1000,
+                        help='Writes per second one item accepts before throttling')
+    parser.add_argument('--latency-ms', type=float, default=2,
+                        help='Simulated round-trip time per AWS call')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = [run_strategy(strategy, args.likes, args.concurrency, args.hot_key_wps, args.latency_ms)
+               for strategy in ('naive', 'sharded')]
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
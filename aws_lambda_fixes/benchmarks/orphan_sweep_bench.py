@@ -0,0 +1,120 @@
+"""
+Orphaned Upload Sweeper Benchmark
+
+Seeds the in-memory fakes with ads whose images exist in S3, plus old
+orphaned uploads, fresh (in-grace) uploads and images of long-deleted ads,
+then runs orphan_sweeper_lambda in dry-run and delete modes. Reports
+throughput, peak traced memory and whether the sweep kept every referenced
+image and removed only eligible orphans.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/orphan_sweep_bench.py
+    python aws_lambda_fixes/benchmarks/orphan_sweep_bench.py --ads 500000 --orphans 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from fake_aws import FakeAWS  # noqa: E402
+from run_benchmarks import S3_BUCKET, make_ad  # noqa: E402
+
+
+def seed(aws, ads, orphans, fresh, seed_value):
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    old = now - timedelta(days=10)
+    table = aws.dynamodb.Table('BusinessAds')
+    s3 = aws.s3
+
+    referenced = set()
+    deleted_images = set()
+    batch = []
+    for index in range(ads):
+        ad = make_ad(index, now, rnd)
+        if ad['status'] == 'deleted':
+            ad['updatedAt'] = old.isoformat()  # Deleted well before the grace period
+        for url in ad['imageUrls']:
+            key = url.split('.net/', 1)[1]
+            s3.seed_object(S3_BUCKET, key, b'', 'image/jpeg', old)
+            (deleted_images if ad['status'] == 'deleted' else referenced).add(key)
+        batch.append(ad)
+        if len(batch) == 10000:
+            table.seed(batch)
+            batch = []
+    table.seed(batch)
+
+    for index in range(orphans):
+        s3.seed_object(S3_BUCKET, f"ads/abandoned-{index:07d}.jpg", b'', 'image/jpeg', old)
+    for index in range(fresh):
+        s3.seed_object(S3_BUCKET, f"ads/fresh-{index:07d}.jpg", b'', 'image/jpeg', now)
+
+    return referenced, deleted_images
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def peak_memory(func):
+    """Peak traced allocation in MiB (run separately: tracing slows everything down)."""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Orphaned upload sweeper benchmark')
+    parser.add_argument('--ads', type=int, default=100000)
+    parser.add_argument('--orphans', type=int, default=50000)
+    parser.add_argument('--fresh', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args(argv)
+
+    import orphan_sweeper_lambda as sweeper
+
+    with FakeAWS() as aws:
+        referenced, deleted_images = seed(aws, args.ads, args.orphans, args.fresh, args.seed)
+        eligible = args.orphans + len(deleted_images)
+
+        dry_run, dry_seconds = timed(lambda: sweeper.sweep(dry_run=True))
+        dry_peak = peak_memory(lambda: sweeper.sweep(dry_run=True))
+        stats, seconds = timed(lambda: sweeper.sweep())
+
+        remaining = {key for bucket, key in aws.s3.objects if bucket == S3_BUCKET}
+        results = {
+            'ads': args.ads,
+            'objects': dry_run['objectsListed'],
+            'eligibleOrphans': eligible,
+            'dryRun': {'orphansFound': dry_run['orphansFound'], 'seconds': dry_seconds,
+                       'peakMemoryMiB': dry_peak},
+            'sweep': {'objectsDeleted': stats['objectsDeleted'], 'seconds': seconds,
+                      'objectsPerSecond': round(stats['objectsListed'] / seconds) if seconds else None,
+                      'deleteCalls': aws.counter.snapshot().get('s3.DeleteObjects', 0)},
+            'filterBytes': stats['filterBytes'],
+            'estimatedFalsePositiveRate': stats['estimatedFalsePositiveRate'],
+            'referencedKept': len(referenced & remaining) == len(referenced),
+            'freshKept': sum(1 for key in remaining if key.startswith('ads/fresh-')) == args.fresh,
+            'orphansMissedByFalsePositives': eligible - stats['objectsDeleted']
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
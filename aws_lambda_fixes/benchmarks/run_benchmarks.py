@@ -0,0 +1,399 @@
+"""
+Local Load-Testing and Benchmark Suite for the Business Ad Lambda Handlers
+
+Runs each lambda_handler in-process against the in-memory DynamoDB/S3 fakes
+from fake_aws.py, seeded with synthetic ads, and drives API Gateway proxy
+events at fixed concurrency levels. For every (table size, scenario,
+concurrency) combination it reports:
+
+    - p50/p95/p99/max latency (ms) and throughput (requests/second)
+    - DynamoDB and S3 calls per request, broken down by operation
+    - Peak traced memory of a single invocation (KiB)
+    - Error count (non-2xx responses)
+
+AWS calls complete instantly unless --latency-ms is set, in which case each
+fake call sleeps that long to approximate a network round trip.
+
+Results are written as JSON so runs can be diffed; pass --baseline with a
+previous results file to print per-metric deltas.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/run_benchmarks.py
+    python aws_lambda_fixes/benchmarks/run_benchmarks.py --sizes 1000,100000 \\
+        --concurrency 1,8 --requests 200 --output results.json
+    python aws_lambda_fixes/benchmarks/run_benchmarks.py --baseline old.json
+
+Note: the 1M-row table needs roughly 2GB of RAM for the in-memory fake.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+# Keep handler logging out of the measurements unless explicitly requested
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from fake_aws import FakeAWS  # noqa: E402
+
+TABLE_NAME = 'BusinessAds'
+S3_BUCKET = 'business-ad-images-1'
+CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+USER_POOL = 500
+UPLOAD_POOL = 64  # Pre-uploaded images that submitAd scenarios reference
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def make_ad(index, now, rnd):
+    """Build one synthetic ad item shaped like submitAd's output."""
+    created = now - timedelta(seconds=rnd.randint(0, 40 * 24 * 3600))
+    expires = created + timedelta(days=30)
+    user = rnd.randrange(USER_POOL)
+    image_count = rnd.randint(1, 4)
+    return {
+        'id': f"ad-{index:07d}",
+        'title': f"Synthetic business ad {index}",
+        'description': 'Great local service. ' * rnd.randint(1, 8),
+        'imageUrls': [f"https://{CLOUDFRONT_DOMAIN}/ads/ad-{index:07d}-{n}.jpg" for n in range(image_count)],
+        'userName': f"User {user}",
+        'userId': f"user_{user}",
+        'createdAt': created.isoformat(),
+        'updatedAt': created.isoformat(),
+        'syncDay': created.strftime('%Y-%m-%d'),
+        'expiresAt': expires.isoformat(),
+        'ttl': int(expires.timestamp()),
+        'status': 'deleted' if rnd.random() < 0.1 else 'active',
+        'featured': rnd.random() < 0.3,
+        'imageCount': image_count,
+        'likes': rnd.randint(0, 500),
+        'viewCount': rnd.randint(0, 5000),
+        'commentCount': 0
+    }
+
+
+def seed_table(aws, size, seed=42):
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    aws.dynamodb.create_table('BusinessAdComments', key_schema=('adId', 'commentId'))
+    aws.dynamodb.create_table('BusinessAdLikes', indexes={'adId-index': ('adId', None)})
+    aws.dynamodb.create_table('BusinessAdTombstones', key_schema=('syncDay', 'deletedKey'))
+    table = aws.dynamodb.create_table(TABLE_NAME, indexes={'syncDay-updatedAt-index': ('syncDay', 'updatedAt')})
+    batch = []
+    for index in range(size):
+        batch.append(make_ad(index, now, rnd))
+        if len(batch) == 10000:
+            table.seed(batch)
+            batch = []
+    table.seed(batch)
+    # 1x1 PNG header is enough for HEAD + dimension probe
+    png = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' + (640).to_bytes(4, 'big') + (480).to_bytes(4, 'big')
+    for n in range(UPLOAD_POOL):
+        aws.s3.seed_object(S3_BUCKET, f"ads/bench-upload-{n}.png", png + b'\x00' * 2048, 'image/png')
+    # Materialize the home feed as the scheduled rebuild would in production
+    importlib.import_module('feed_snapshot').rebuild()
+    return table
+
+
+# ---------------------------------------------------------------------------
+# API Gateway events
+# ---------------------------------------------------------------------------
+
+def api_event(method, path, query=None, body=None, source_ip=None):
+    # A fresh client per request by default, so the per-client rate limit
+    # only applies to scenarios that pin an IP
+    source_ip = source_ip or f"198.18.{random.randrange(256)}.{random.randrange(1, 255)}"
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Content-Type': 'application/json'},
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'requestId': str(uuid.uuid4()),
+            'httpMethod': method,
+            'path': f"/prod{path}",
+            'stage': 'prod',
+            'identity': {'sourceIp': source_ip}
+        }
+    }
+
+
+def scheduled_event():
+    return {'source': 'aws.events', 'detail-type': 'Scheduled Event', 'detail': {}}
+
+
+def _random_ad_id(rnd, size):
+    return f"ad-{rnd.randrange(size):07d}"
+
+
+# Soft deletes only touch the upper half of the table and likes/comments only
+# the lower half, so writes never target an ad a previous scenario removed.
+def _deletable_ad_id(rnd, size):
+    return f"ad-{rnd.randrange(size // 2, size):07d}"
+
+
+def _kept_ad_id(rnd, size):
+    return f"ad-{rnd.randrange(max(size // 2, 1)):07d}"
+
+
+def _submit_body(rnd):
+    return {
+        'title': 'Benchmark submission',
+        'description': 'Benchmark description text. ' * rnd.randint(1, 6),
+        'imageUrls': [f"ads/bench-upload-{rnd.randrange(UPLOAD_POOL)}.png" for _ in range(rnd.randint(1, 3))],
+        'userName': f"User {rnd.randrange(USER_POOL)}",
+        'businessName': 'Bench Co'
+    }
+
+
+# name -> (handler module, event factory(rnd, size), repeatable)
+# Non-repeatable scenarios mutate the whole table and run once per size.
+SCENARIOS = {
+    'getAds.default': ('getAds_lambda', lambda rnd, size: api_event('GET', '/ads'), True),
+    # featured=false skips the snapshot but matches the same ads: the live scan-and-sort path
+    'getAds.live': ('getAds_lambda', lambda rnd, size: api_event('GET', '/ads', {'featured': 'false'}), True),
+    'getAds.featured': ('getAds_lambda', lambda rnd, size: api_event('GET', '/ads', {'featured': 'true'}), True),
+    'getAds.byUser': ('getAds_lambda', lambda rnd, size: api_event(
+        'GET', '/ads', {'userId': f"user_{rnd.randrange(USER_POOL)}"}), True),
+    # One client looping on the feed: allowed, then no view writes, then cached, then 429s (counted as errors)
+    'getAds.scraper': ('getAds_lambda', lambda rnd, size: api_event(
+        'GET', '/ads', {'featured': 'false'}, source_ip='203.0.113.66'), True),
+    # Client that last synced an hour ago: one index Query per day, not a scan
+    'getAds.sync': ('getAds_lambda', lambda rnd, size: api_event('GET', '/ads', {
+        'since': (datetime.utcnow() - timedelta(hours=1)).isoformat()}), True),
+    'getAdById': ('getAdById_lambda', lambda rnd, size: api_event(
+        'GET', '/ads/by-id', {'id': _random_ad_id(rnd, size)}), True),
+    'getAdById.batch': ('getAdById_lambda', lambda rnd, size: api_event(
+        'GET', '/ads/by-id', {'ids': ','.join(_random_ad_id(rnd, size) for _ in range(10))}), True),
+    'submitAd': ('submitAd_lambda', lambda rnd, size: api_event('POST', '/', body=_submit_body(rnd)), True),
+    'submitAd.missingImage': ('submitAd_lambda', lambda rnd, size: api_event('POST', '/', body={
+        **_submit_body(rnd), 'imageUrls': [f"ads/never-uploaded-{uuid.uuid4().hex[:8]}.jpg"]}), True),
+    'deleteBusinessAd.soft': ('deleteBusinessAd_lambda', lambda rnd, size: api_event(
+        'DELETE', '/', body={'id': _deletable_ad_id(rnd, size)}), True),
+    'generatePresignedUrl': ('generatePresignedUrl_lambda', lambda rnd, size: api_event(
+        'GET', '/presigned-url', {'filename': 'photo.jpg', 'contentType': 'image/jpeg'}), True),
+    'likeAd': ('likeAd_lambda', lambda rnd, size: api_event('POST', '/likes', body={
+        'adId': _kept_ad_id(rnd, size), 'userId': f"user_{rnd.randrange(USER_POOL)}"}), True),
+    'comments.list': ('comments_lambda', lambda rnd, size: api_event(
+        'GET', '/comments', {'adId': _random_ad_id(rnd, size)}), True),
+    'comments.add': ('comments_lambda', lambda rnd, size: api_event('POST', '/comments', body={
+        'adId': _kept_ad_id(rnd, size), 'text': 'Benchmark comment', 'userName': 'Bench User'}), True),
+    'router.options': ('router_lambda', lambda rnd, size: api_event('OPTIONS', '/ads'), True),
+    'router.getAds': ('router_lambda', lambda rnd, size: api_event('GET', '/ads'), True),
+    'feed.rebuild': ('getAds_lambda', lambda rnd, size: scheduled_event(), False),
+    'ttlCleanup': ('ttl_cleanup_lambda', lambda rnd, size: scheduled_event(), False),
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class _Context:
+    function_name = 'benchmark'
+    memory_limit_in_mb = 512
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def _invoke(handler, event):
+    started = time.perf_counter()
+    response = handler(event, _Context())
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    status = response.get('statusCode', 200) if isinstance(response, dict) else 200
+    return elapsed_ms, status
+
+
+def measure_memory(handler, factory, size, samples, seed):
+    """Peak traced allocation of a single invocation, max over a few samples."""
+    rnd = random.Random(seed)
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            event = factory(rnd, size)
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            handler(event, _Context())
+            _, sample_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, sample_peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def run_scenario(aws, name, size, concurrency, requests, memory_samples, seed):
+    module_name, factory, repeatable = SCENARIOS[name]
+    handler = importlib.import_module(module_name).lambda_handler
+    if not repeatable:
+        concurrency, requests, memory_samples = 1, 1, 0
+
+    rnd = random.Random(seed)
+    events = [factory(rnd, size) for _ in range(requests)]
+    calls_before = aws.counter.snapshot()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        outcomes = [_invoke(handler, event) for event in events]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda event: _invoke(handler, event), events))
+    wall_seconds = time.perf_counter() - started
+
+    calls_after = aws.counter.snapshot()
+    calls = {op: calls_after.get(op, 0) - calls_before.get(op, 0) for op in calls_after}
+    calls = {op: count for op, count in calls.items() if count}
+
+    latencies = sorted(elapsed for elapsed, _ in outcomes)
+    errors = sum(1 for _, status in outcomes if status >= 400)
+    dynamodb_calls = sum(count for op, count in calls.items() if op.startswith('dynamodb.'))
+    s3_calls = sum(count for op, count in calls.items() if op.startswith('s3.'))
+
+    result = {
+        'scenario': name,
+        'tableSize': size,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'latencyMs': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3)
+        },
+        'throughputRps': round(requests / wall_seconds, 2) if wall_seconds else None,
+        'dynamodbCallsPerRequest': round(dynamodb_calls / requests, 3),
+        's3CallsPerRequest': round(s3_calls / requests, 3),
+        'callsByOperation': calls
+    }
+    if memory_samples:
+        result['peakMemoryKiB'] = measure_memory(handler, factory, size, memory_samples, seed + 1)
+    return result
+
+
+def run(sizes, concurrency_levels, requests, scenarios, memory_samples, seed, latency_ms=0):
+    results = []
+    for size in sizes:
+        with FakeAWS(latency_ms) as aws:
+            load_started = time.perf_counter()
+            seed_table(aws, size, seed)
+            print(f"Seeded {size} ads in {time.perf_counter() - load_started:.1f}s", file=sys.stderr)
+
+            # Repeatable scenarios first; table-wide mutations (ttlCleanup) last
+            ordered = sorted(scenarios, key=lambda name: not SCENARIOS[name][2])
+            for name in ordered:
+                levels = concurrency_levels if SCENARIOS[name][2] else [1]
+                for level, concurrency in enumerate(levels):
+                    # Own seed per scenario and level, so the ids one scenario
+                    # soft-deletes are not the ids the next one picks
+                    scenario_seed = seed + 1000 * list(SCENARIOS).index(name) + level
+                    result = run_scenario(aws, name, size, concurrency, requests, memory_samples,
+                                          scenario_seed)
+                    results.append(result)
+                    print(f"  {name:<24} size={size:<8} c={result['concurrency']:<3} "
+                          f"p50={result['latencyMs']['p50']:.2f}ms p99={result['latencyMs']['p99']:.2f}ms "
+                          f"rps={result['throughputRps']} ddb/req={result['dynamodbCallsPerRequest']} "
+                          f"errors={result['errors']}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline):
+    """Print per-metric deltas against a previous results file."""
+    previous = {(r['scenario'], r['tableSize'], r['concurrency']): r for r in baseline.get('results', [])}
+    for result in results:
+        key = (result['scenario'], result['tableSize'], result['concurrency'])
+        old = previous.get(key)
+        if not old:
+            continue
+        deltas = []
+        for metric in ('p50', 'p95', 'p99'):
+            before, after = old['latencyMs'][metric], result['latencyMs'][metric]
+            if before:
+                deltas.append(f"{metric} {((after - before) / before) * 100:+.1f}%")
+        if old.get('throughputRps'):
+            deltas.append(f"rps {((result['throughputRps'] - old['throughputRps']) / old['throughputRps']) * 100:+.1f}%")
+        deltas.append(f"ddb/req {result['dynamodbCallsPerRequest'] - old['dynamodbCallsPerRequest']:+.2f}")
+        print(f"{key[0]:<24} size={key[1]:<8} c={key[2]:<3} " + ', '.join(deltas))
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Business Ad Lambda handlers locally')
+    parser.add_argument('--sizes', type=_int_list, default=DEFAULT_SIZES,
+                        help='Comma-separated table sizes to seed (default 1000,100000,1000000)')
+    parser.add_argument('--concurrency', type=_int_list, default=DEFAULT_CONCURRENCY,
+                        help='Comma-separated concurrency levels (default 1,8,32)')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and level')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--memory-samples', type=int, default=5,
+                        help='Invocations traced with tracemalloc for peak memory (0 to skip)')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='Simulated round-trip time added to every fake AWS call')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='Previous JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = run(args.sizes, args.concurrency, args.requests, scenarios, args.memory_samples,
+                  args.seed, args.latency_ms)
+    report = {
+        'generatedAt': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'requestsPerLevel': args.requests,
+        'simulatedLatencyMs': args.latency_ms,
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            compare(results, json.load(handle))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Quality Score Throughput Benchmark
+
+Scores synthetic ads with the featured quality engine three ways and
+reports ads per second:
+
+    - scalar      score_ad() in a Python loop (the submitAd path)
+    - vectorized  score_columns() on prebuilt NumPy columns (the kernel)
+    - pipeline    columns_from_items() + score_columns() over 1,000-item
+                  pages of ad dicts, i.e. what rescore_ads does per scan page
+
+Both paths must agree on every ad. With --backfill-size, also runs
+rescore_ads end to end against the in-memory fakes.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/scoring_bench.py
+    python aws_lambda_fixes/benchmarks/scoring_bench.py --ads 1000000 --backfill-size 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+import numpy as np  # noqa: E402
+
+import quality_score  # noqa: E402
+
+PAGE_SIZE = 1000
+
+
+def synthetic_columns(count, seed):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(0, 6, count, dtype=np.int32),
+        rng.integers(0, 400, count, dtype=np.int32),
+        rng.random(count) < 0.6,
+        rng.random(count) < 0.5
+    )
+
+
+def items_page(columns, start, stop):
+    image_count, description_length, has_profile_image, has_business_info = columns
+    return [{
+        'id': f"ad-{index:07d}",
+        'imageUrls': ['https://example.invalid/ads/image.jpg'] * int(image_count[index]),
+        'description': 'x' * int(description_length[index]),
+        'userProfileImage': 'https://example.invalid/profile.jpg' if has_profile_image[index] else None,
+        'businessName': 'Bench Co' if has_business_info[index] else None
+    } for index in range(start, stop)]
+
+
+def _rate(count, seconds):
+    return {'seconds': round(seconds, 4), 'adsPerSecond': round(count / seconds) if seconds else None}
+
+
+def bench_scoring(count, seed):
+    columns = synthetic_columns(count, seed)
+    as_lists = [column.tolist() for column in columns]
+
+    started = time.perf_counter()
+    scalar = [quality_score.score_ad(*fields)[1] for fields in zip(*as_lists)]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, featured = quality_score.score_columns(*columns)
+    vector_seconds = time.perf_counter() - started
+
+    if featured.tolist() != scalar:
+        raise AssertionError('Vectorized and scalar scoring disagree')
+
+    # Page pipeline: building the pages is setup, only extraction + scoring is timed
+    pipeline_seconds = 0.0
+    pipeline_featured = 0
+    for start in range(0, count, PAGE_SIZE):
+        page = items_page(columns, start, min(start + PAGE_SIZE, count))
+        started = time.perf_counter()
+        _, page_featured = quality_score.score_items(page)
+        pipeline_seconds += time.perf_counter() - started
+        pipeline_featured += int(page_featured.sum())
+
+    if pipeline_featured != int(featured.sum()):
+        raise AssertionError('Page pipeline and column scoring disagree')
+
+    return {
+        'ads': count,
+        'featured': int(featured.sum()),
+        'scalar': _rate(count, scalar_seconds),
+        'vectorized': _rate(count, vector_seconds),
+        'pipeline': _rate(count, pipeline_seconds),
+        'vectorizedSpeedup': round(scalar_seconds / vector_seconds, 1) if vector_seconds else None
+    }
+
+
+def bench_backfill(size, segments):
+    from fake_aws import FakeAWS
+    from run_benchmarks import seed_table
+
+    import rescore_ads
+
+    with FakeAWS() as aws:
+        seed_table(aws, size)
+        started = time.perf_counter()
+        dry_run = rescore_ads.rescore(dry_run=True, segments=segments)
+        dry_seconds = time.perf_counter() - started
+
+        calls_before = aws.counter.snapshot()
+        started = time.perf_counter()
+        stats = rescore_ads.rescore(segments=segments)
+        seconds = time.perf_counter() - started
+        calls_after = aws.counter.snapshot()
+
+        second_pass = rescore_ads.rescore(dry_run=True, segments=segments)
+
+    return {
+        'tableSize': size,
+        'segments': segments,
+        'dryRun': {**dry_run, **_rate(dry_run['adsScanned'], dry_seconds)},
+        'write': {**stats, **_rate(stats['adsScanned'], seconds)},
+        'updateItemCalls': calls_after.get('dynamodb.UpdateItem', 0) - calls_before.get('dynamodb.UpdateItem', 0),
+        'flagsStillChangingAfterWrite': second_pass['flagsChanged']
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Featured quality score throughput benchmark')
+    parser.add_argument('--ads', type=int, default=1_000_000, help='Synthetic ads to score (default 1,000,000)')
+    parser.add_argument('--backfill-size', type=int, default=0,
+                        help='Also run rescore_ads against a fake table of this size')
+    parser.add_argument('--segments', type=int, default=4, help='Scan segments for the backfill run')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write results JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = {'scoring': bench_scoring(args.ads, args.seed)}
+    if args.backfill_size:
+        results['backfill'] = bench_backfill(args.backfill_size, args.segments)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
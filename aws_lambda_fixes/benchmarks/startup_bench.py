@@ -0,0 +1,177 @@
+"""
+Cold-Start Benchmark for the Business Ad Lambda Handlers
+
+Starts a fresh Python process per sample and measures, for each handler:
+
+    - importMs          Importing the handler module (boto3 included). With
+                        PRIME_CLIENTS=1 this also covers client construction
+                        and credential resolution, i.e. the Lambda init phase.
+    - firstInvokeMs     The first lambda_handler call in that process
+    - secondInvokeMs    A second, warm call for comparison
+    - coldStartMs       importMs + firstInvokeMs (time to first response)
+
+Real boto3 clients are used; a botocore before-send hook answers every HTTP
+request locally, so serialization, signing and parsing are all exercised
+without network access. Both modes are measured: "prime" (init-phase
+setup, the Lambda default) and "lazy" (clients built on first request).
+
+Prime-mode medians are checked against startup_budget.json, which maps a
+metric name to per-handler limits in milliseconds; the script exits with
+status 1 when any handler is over budget.
+
+Usage:
+    python aws_lambda_fixes/benchmarks/startup_bench.py
+    python aws_lambda_fixes/benchmarks/startup_bench.py --samples 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.dirname(HERE)
+BUDGET_FILE = os.path.join(HERE, 'startup_budget.json')
+
+# handler module -> (method, path, query, body) of its first event; None method = scheduled event
+HANDLERS = {
+    'getAds_lambda': ('GET', '/ads', None, None),
+    'submitAd_lambda': ('POST', '/', None, {
+        'title': 'Startup bench', 'description': 'x' * 60,
+        'imageUrls': ['ads/startup.jpg'], 'userName': 'Startup User'
+    }),
+    'deleteBusinessAd_lambda': ('DELETE', '/', None, {'id': 'startup-ad'}),
+    'generatePresignedUrl_lambda': ('GET', '/presigned-url', {'filename': 'a.jpg'}, None),
+    'ttl_cleanup_lambda': (None, None, None, None),
+    'router_lambda': ('GET', '/ads', None, None),
+}
+
+
+def _child(module_name):
+    """Runs inside the fresh interpreter and prints one JSON result line."""
+    started = time.perf_counter()
+
+    import boto3
+    from botocore.awsrequest import AWSResponse
+
+    class _RawBody:
+        def __init__(self, body):
+            self._body = body
+
+        def stream(self, **_):
+            yield self._body
+
+        def read(self, *_):
+            return self._body
+
+    def _answer_locally(request, **_):
+        body = b'{}' if 'dynamodb' in request.url else b''
+        return AWSResponse(request.url, 200, {}, _RawBody(body))
+
+    boto3.setup_default_session()
+    boto3.DEFAULT_SESSION.events.register('before-send', _answer_locally)
+
+    sys.path.insert(0, LAMBDA_DIR)
+    module = __import__(module_name)
+    imported = time.perf_counter()
+
+    sys.path.insert(0, HERE)
+    from run_benchmarks import api_event, scheduled_event
+
+    method, path, query, body = HANDLERS[module_name]
+    event = api_event(method, path, query, body) if method else scheduled_event()
+
+    first_started = time.perf_counter()
+    module.lambda_handler(event, None)
+    first_done = time.perf_counter()
+    module.lambda_handler(event, None)
+    second_done = time.perf_counter()
+
+    print(json.dumps({
+        'importMs': (imported - started) * 1000,
+        'firstInvokeMs': (first_done - first_started) * 1000,
+        'secondInvokeMs': (second_done - first_done) * 1000
+    }))
+
+
+def sample(module_name, prime):
+    env = dict(os.environ)
+    env.update({
+        'PRIME_CLIENTS': '1' if prime else '0',
+        'LOG_LEVEL': 'ERROR',
+        'AWS_DEFAULT_REGION': env.get('AWS_DEFAULT_REGION', 'us-east-1'),
+        'AWS_ACCESS_KEY_ID': 'startup-bench',
+        'AWS_SECRET_ACCESS_KEY': 'startup-bench'
+    })
+    env.pop('AWS_PROFILE', None)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', module_name],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['coldStartMs'] = result['importMs'] + result['firstInvokeMs']
+    return result
+
+
+def measure(samples):
+    results = []
+    for module_name in HANDLERS:
+        for mode in ('prime', 'lazy'):
+            runs = [sample(module_name, mode == 'prime') for _ in range(samples)]
+            summary = {'handler': module_name, 'mode': mode, 'samples': samples}
+            for metric in ('importMs', 'firstInvokeMs', 'secondInvokeMs', 'coldStartMs'):
+                summary[metric] = round(statistics.median(run[metric] for run in runs), 2)
+            results.append(summary)
+            print(f"  {module_name:<28} {mode:<5} import={summary['importMs']:.1f}ms "
+                  f"first={summary['firstInvokeMs']:.1f}ms second={summary['secondInvokeMs']:.2f}ms "
+                  f"cold={summary['coldStartMs']:.1f}ms", file=sys.stderr)
+    return results
+
+
+def check_budget(results, budget):
+    """Return human-readable violations of the prime-mode budgets."""
+    violations = []
+    for result in results:
+        if result['mode'] != 'prime':
+            continue
+        for metric, limits in budget.items():
+            limit = limits.get(result['handler'])
+            if limit is not None and result[metric] > limit:
+                violations.append(f"{result['handler']} {metric}: {result[metric]:.1f}ms > budget {limit}ms")
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure handler import time and time-to-first-response')
+    parser.add_argument('--samples', type=int, default=5, help='Fresh processes per handler and mode')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--budget', default=BUDGET_FILE, help='Budget file (default startup_budget.json)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return 0
+
+    results = measure(args.samples)
+    with open(args.budget) as handle:
+        violations = check_budget(results, json.load(handle))
+
+    report = {'results': results, 'budgetViolations': violations}
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    for violation in violations:
+        print(f"OVER BUDGET {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_cache import ads_cache
+from ad_logger import get_logger
+from ad_sync import sync_day
+
+# Configuration
+COMMENTS_TABLE = os.environ.get('COMMENTS_TABLE', 'BusinessAdComments')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_COMMENT_LENGTH = 1000
+
+logger = get_logger('comments')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, COMMENTS_TABLE))
+
+
+def _response(status_code, payload):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+        },
+        'body': json.dumps({**payload, 'timestamp': datetime.utcnow().isoformat()}, default=str)
+    }
+
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def comment_sort_key(created_at, suffix):
+    """Sort key: ISO timestamp first so a partition query returns comments in time order."""
+    return f"{created_at}#{suffix}"
+
+
+def delete_ad_comments(ad_id):
+    """Delete every comment in an ad's partition; returns how many were removed."""
+    table = aws_clients.get_table(COMMENTS_TABLE)
+    query = {
+        'KeyConditionExpression': 'adId = :ad_id',
+        'ExpressionAttributeValues': {':ad_id': ad_id},
+        'ProjectionExpression': 'adId, commentId'
+    }
+    deleted = 0
+    with table.batch_writer() as writer:
+        while True:
+            response = table.query(**query)
+            for key in response.get('Items', []):
+                writer.delete_item(Key=key)
+                deleted += 1
+            if not response.get('LastEvaluatedKey'):
+                return deleted
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def list_comments(query_params):
+    ad_id = query_params.get('adId')
+    if not ad_id:
+        return _response(400, {'success': False, 'error': 'Missing required parameter: adId'})
+
+    limit = min(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    query = {
+        'KeyConditionExpression': 'adId = :ad_id',
+        'ExpressionAttributeValues': {':ad_id': ad_id},
+        'ScanIndexForward': False,  # Newest first
+        'Limit': limit
+    }
+    if query_params.get('cursor'):
+        try:
+            query['ExclusiveStartKey'] = decode_cursor(query_params['cursor'])
+        except (ValueError, TypeError):
+            return _response(400, {'success': False, 'error': 'Invalid cursor'})
+
+    response = aws_clients.get_table(COMMENTS_TABLE).query(**query)
+    comments = response.get('Items', [])
+    next_cursor = encode_cursor(response.get('LastEvaluatedKey'))
+
+    logger.debug('Listed comments', adId=ad_id, count=len(comments), hasMore=bool(next_cursor))
+
+    return _response(200, {
+        'success': True,
+        'adId': ad_id,
+        'comments': comments,
+        'nextCursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+def add_comment(body):
+    import uuid
+
+    ad_id = body.get('adId')
+    text = (body.get('text') or '').strip()
+    user_name = body.get('userName')
+    if not ad_id or not text or not user_name:
+        return _response(400, {'success': False, 'error': 'Missing required fields: adId, text and userName'})
+    if len(text) > MAX_COMMENT_LENGTH:
+        return _response(400, {'success': False,
+                               'error': f'Comment exceeds {MAX_COMMENT_LENGTH} characters'})
+
+    created_at = datetime.utcnow().isoformat()
+    comment = {
+        'adId': ad_id,
+        'commentId': comment_sort_key(created_at, uuid.uuid4().hex[:8]),
+        'text': text,
+        'userName': user_name,
+        'userId': body.get('userId', user_name.lower().replace(' ', '_').replace('-', '_')),
+        'createdAt': created_at
+    }
+
+    # Count first: the condition rejects comments on missing or deleted ads
+    try:
+        aws_clients.get_table().update_item(
+            Key={'id': ad_id},
+            UpdateExpression='ADD commentCount :one SET updatedAt = :updated_at, syncDay = :sync_day',
+            ConditionExpression='attribute_exists(id) AND #status = :active',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':one': 1, ':updated_at': created_at, ':sync_day': sync_day(created_at),
+                                       ':active': 'active'}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return _response(404, {'success': False, 'error': f'Ad with ID {ad_id} not found', 'adId': ad_id})
+        raise
+
+    try:
+        aws_clients.get_table(COMMENTS_TABLE).put_item(Item=comment)
+    except Exception:
+        aws_clients.get_table().update_item(
+            Key={'id': ad_id},
+            UpdateExpression='ADD commentCount :minus_one',
+            ExpressionAttributeValues={':minus_one': -1}
+        )
+        raise
+
+    ads_cache.invalidate(ad_id)
+    logger.info('Comment added', adId=ad_id, commentId=comment['commentId'])
+    return _response(200, {'success': True, 'comment': comment})
+
+
+def lambda_handler(event, context):
+    """
+    comments Lambda Function
+    GET /comments?adId=...&limit=&cursor= pages through an ad's comments,
+    newest first. POST /comments adds one and bumps the ad's commentCount.
+    Comments live as separate items under the ad's partition in
+    BusinessAdComments instead of a list embedded in the ad item.
+    """
+    method = event.get('httpMethod', 'GET')
+    if method == 'OPTIONS':
+        return _response(200, {'success': True})
+
+    logger.bind(event, context)
+
+    try:
+        if method == 'POST':
+            body = event.get('body') or {}
+            if isinstance(body, str):
+                body = json.loads(body)
+            return add_comment(body)
+
+        return list_comments(event.get('queryStringParameters') or {})
+
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.warning('Invalid comments request', error=str(e))
+        return _response(400, {'success': False, 'error': f'Invalid request: {str(e)}'})
+
+    except Exception as e:
+        logger.error('Error handling comments request', error=str(e))
+        return _response(500, {'success': False, 'error': f'Failed to process comments: {str(e)}'})
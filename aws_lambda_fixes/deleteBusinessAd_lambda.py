@@ -1,9 +1,14 @@
 import json
-import boto3
-import uuid
 from datetime import datetime
-from decimal import Decimal
-import re
+
+import aws_clients
+import feed_snapshot
+from ad_cache import ads_cache
+from ad_logger import get_logger
+from ad_sync import sync_fields
+
+logger = get_logger('deleteBusinessAd')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, feed_snapshot.FEED_TABLE), s3=True)
 
 def lambda_handler(event, context):
     """
@@ -11,11 +16,15 @@ def lambda_handler(event, context):
     Deletes business ads from DynamoDB and optionally from S3
     Supports both soft delete (status change) and hard delete (complete removal)
     """
+    # CORS preflight: answer before touching any AWS client
+    if event.get('httpMethod') == 'OPTIONS':
+        return handle_options()
+
+    logger.bind(event, context)
     
-    # Initialize AWS services
-    dynamodb = boto3.resource('dynamodb')
-    s3_client = boto3.client('s3')
-    table = dynamodb.Table('BusinessAds')
+    # Shared AWS clients (created during the init phase)
+    table = aws_clients.get_table()
+    s3_client = aws_clients.get_s3()
     
     # Configuration
     S3_BUCKET = 'business-ad-images-1'
@@ -31,7 +40,7 @@ def lambda_handler(event, context):
         else:
             body = event
         
-        print(f"📥 Delete request body: {json.dumps(body)}")
+        logger.debug_payload('Delete request', body=lambda: body)
         
         # Validate required parameters
         if 'id' not in body:
@@ -54,7 +63,7 @@ def lambda_handler(event, context):
         hard_delete = body.get('hard', False)  # Default to soft delete
         user_id = body.get('userId', None)  # Optional user validation
         
-        print(f"🗑️ Processing delete request - ID: {ad_id}, Hard: {hard_delete}, User: {user_id}")
+        logger.debug('Processing delete request', adId=ad_id, hard=hard_delete, userId=user_id)
         
         # Check if ad exists
         try:
@@ -77,7 +86,6 @@ def lambda_handler(event, context):
                 }
             
             ad_item = response['Item']
-            print(f"✅ Found ad: {ad_item.get('title', 'Unknown Title')}")
             
             # Optional: Validate user ownership
             if user_id and ad_item.get('userId') != user_id:
@@ -98,7 +106,7 @@ def lambda_handler(event, context):
                 }
             
         except Exception as e:
-            print(f"❌ Error checking ad existence: {str(e)}")
+            logger.error('Error checking ad existence', adId=ad_id, error=str(e))
             return {
                 'statusCode': 500,
                 'headers': {
@@ -119,7 +127,9 @@ def lambda_handler(event, context):
         
         if hard_delete:
             # Hard delete: Remove from DynamoDB and S3
-            print(f"💥 Performing HARD DELETE for ad: {ad_id}")
+            
+            # The archive copy is written in batches from the table's stream
+            # (sync_tombstones_lambda), not one file per request
             
             # Delete images from S3 if they exist
             image_urls = ad_item.get('imageUrls', [])
@@ -137,16 +147,18 @@ def lambda_handler(event, context):
                     # Delete from S3
                     s3_client.delete_object(Bucket=S3_BUCKET, Key=s3_key)
                     images_removed += 1
-                    print(f"🗂️ Deleted image from S3: {s3_key}")
+                    logger.debug('Deleted image from S3', key=s3_key)
                     
                 except Exception as s3_error:
-                    print(f"⚠️ Failed to delete image {image_url}: {str(s3_error)}")
+                    logger.warning('Failed to delete image', adId=ad_id, url=image_url, error=str(s3_error))
                     # Continue with other images
             
             # Delete from DynamoDB
             try:
                 table.delete_item(Key={'id': ad_id})
-                print(f"✅ HARD DELETE completed for ad: {ad_id}")
+                ads_cache.invalidate(ad_id)
+                feed_snapshot.remove_ads([ad_id])
+                logger.info('Ad deleted', adId=ad_id, deleteType='hard', imagesRemoved=images_removed)
                 
                 return {
                     'statusCode': 200,
@@ -167,7 +179,7 @@ def lambda_handler(event, context):
                 }
                 
             except Exception as e:
-                print(f"❌ Error during hard delete: {str(e)}")
+                logger.error('Error during hard delete', adId=ad_id, error=str(e))
                 return {
                     'statusCode': 500,
                     'headers': {
@@ -186,24 +198,27 @@ def lambda_handler(event, context):
         
         else:
             # Soft delete: Change status to 'deleted'
-            print(f"🔄 Performing SOFT DELETE for ad: {ad_id}")
             
             try:
                 # Update the status to 'deleted' and set updatedAt timestamp
+                sync = sync_fields(datetime.utcnow().isoformat())
                 update_response = table.update_item(
                     Key={'id': ad_id},
-                    UpdateExpression='SET #status = :deleted_status, updatedAt = :updated_at',
+                    UpdateExpression='SET #status = :deleted_status, updatedAt = :updated_at, syncDay = :sync_day',
                     ExpressionAttributeNames={
                         '#status': 'status'
                     },
                     ExpressionAttributeValues={
                         ':deleted_status': 'deleted',
-                        ':updated_at': datetime.utcnow().isoformat()
+                        ':updated_at': sync['updatedAt'],
+                        ':sync_day': sync['syncDay']
                     },
                     ReturnValues='UPDATED_NEW'
                 )
                 
-                print(f"✅ SOFT DELETE completed for ad: {ad_id}")
+                ads_cache.invalidate(ad_id)
+                feed_snapshot.remove_ads([ad_id])
+                logger.info('Ad deleted', adId=ad_id, deleteType='soft')
                 
                 return {
                     'statusCode': 200,
@@ -224,7 +239,7 @@ def lambda_handler(event, context):
                 }
                 
             except Exception as e:
-                print(f"❌ Error during soft delete: {str(e)}")
+                logger.error('Error during soft delete', adId=ad_id, error=str(e))
                 return {
                     'statusCode': 500,
                     'headers': {
@@ -242,7 +257,7 @@ def lambda_handler(event, context):
                 }
     
     except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error: {str(e)}")
+        logger.warning('JSON decode error', error=str(e))
         return {
             'statusCode': 400,
             'headers': {
@@ -259,7 +274,7 @@ def lambda_handler(event, context):
         }
     
     except Exception as e:
-        print(f"❌ Unexpected error: {str(e)}")
+        logger.error('Unexpected error', error=str(e))
         return {
             'statusCode': 500,
             'headers': {
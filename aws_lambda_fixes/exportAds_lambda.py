@@ -0,0 +1,394 @@
+"""
+Bulk Ad Export as Newline-Delimited JSON
+
+GET /ads/export streams every active ad into an NDJSON object on S3 (one
+compact JSON object per line) and returns a presigned download URL, so
+partners mirroring the catalogue make one request per file instead of one
+getAds call per 100 ads. The Python runtime has no Lambda response
+streaming, so the stream goes to S3 instead: pages from a paginated Scan are
+encoded as they arrive and uploaded as multipart parts of EXPORT_PART_BYTES,
+with the next part encoded while the previous one uploads. Memory holds at
+most one scan page and two parts, whatever the table size.
+
+Query parameters:
+    fields   comma-separated attributes to include (default: every attribute);
+             `id` is always included
+    cursor   continue an export from the `cursor` of the previous response
+             (the cursor carries the fields; `fields` is ignored with it)
+
+Each invocation writes one file and stops early when the Lambda is within
+EXPORT_TIME_MARGIN_SECONDS of its timeout, returning a `cursor` for the next
+file (null when the export is complete). Through API Gateway, which gives up
+after 29 seconds (a 504 that loses the cursor), a call also stops once
+EXPORT_API_SECONDS - EXPORT_API_MARGIN_SECONDS have passed. The cursor is self-contained
+(export id, file number, fields and the scan position), and re-sending the
+same cursor rewrites the same file, so a failed step can be retried as is.
+Files live under the caller's own prefix, `exports/{owner}/{exportId}/`
+(owner: a hash of the authenticated user id, `internal` for direct
+invocations), and a cursor only resumes for the caller that started the
+export, so no caller can rewrite the file behind another's URL.
+
+Every call scans the table, so API Gateway callers must be authenticated
+(authorizer claims or principalId; 401 otherwise) and are rate limited per
+caller with their own token bucket (rate_limit.RateLimiter), 429 when empty.
+Direct invocations (scheduled jobs, the command line) skip both.
+
+Environment variables:
+    EXPORT_BUCKET               Destination bucket (default business-ad-archive)
+    EXPORT_PREFIX               Key prefix (default exports/)
+    EXPORT_PART_BYTES           Multipart part size, at least 5 MiB (default 8 MiB)
+    EXPORT_URL_SECONDS          Download URL lifetime (default 3600)
+    EXPORT_TIME_MARGIN_SECONDS  Time left when a file is closed early (default 20)
+    EXPORT_API_SECONDS          Longest call through API Gateway (default 25)
+    EXPORT_API_MARGIN_SECONDS   Budget left when an API Gateway call closes its file (default 5)
+    EXPORT_RATE_PER_MINUTE      Export calls per caller per minute (default 6)
+    EXPORT_RATE_BURST           Export calls a caller can make at once (default 3)
+
+Usage:
+    python aws_lambda_fixes/exportAds_lambda.py --fields id,title,userName
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import math
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+import aws_clients
+import rate_limit
+from ad_logger import get_logger
+
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET', 'business-ad-archive')
+EXPORT_PREFIX = os.environ.get('EXPORT_PREFIX', 'exports/')
+EXPORT_PART_BYTES = max(int(os.environ.get('EXPORT_PART_BYTES', 8 * 1024 * 1024)), 5 * 1024 * 1024)
+EXPORT_URL_SECONDS = int(os.environ.get('EXPORT_URL_SECONDS', 3600))
+EXPORT_TIME_MARGIN_SECONDS = float(os.environ.get('EXPORT_TIME_MARGIN_SECONDS', 20))
+EXPORT_API_SECONDS = float(os.environ.get('EXPORT_API_SECONDS', 25))
+EXPORT_API_MARGIN_SECONDS = float(os.environ.get('EXPORT_API_MARGIN_SECONDS', 5))
+EXPORT_RATE_PER_MINUTE = float(os.environ.get('EXPORT_RATE_PER_MINUTE', 6))
+EXPORT_RATE_BURST = float(os.environ.get('EXPORT_RATE_BURST', 3))
+
+MAX_FIELDS = 40
+FIELD_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]{0,63}$')
+EXPORT_ID_PATTERN = re.compile(r'^[0-9A-Za-z-]{1,64}$')
+# Same defaults the API fills in (ad_format.format_ad)
+FIELD_DEFAULTS = {'likes': 0, 'viewCount': 0, 'commentCount': 0, 'featured': False, 'status': 'active'}
+# Never exported: legacy embedded comments and the delta-sync partition
+HIDDEN_FIELDS = ('comments', 'syncDay')
+INTERNAL_OWNER = 'internal'  # Owner of exports started without API Gateway
+
+logger = get_logger('exportAds')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, rate_limit.RATE_LIMIT_TABLE), s3=True)
+
+# Export calls are far heavier than a feed page, so callers get their own buckets
+export_limiter = rate_limit.RateLimiter(per_minute=EXPORT_RATE_PER_MINUTE, burst=EXPORT_RATE_BURST,
+                                        scope='export#')
+
+
+class ExportError(ValueError):
+    """Invalid export request (bad fields or cursor)."""
+
+
+def _response(status_code, payload, headers=None):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,OPTIONS',
+            **(headers or {})
+        },
+        'body': json.dumps({**payload, 'timestamp': datetime.utcnow().isoformat()})
+    }
+
+
+def _json_number(obj):
+    """json.dumps default hook: whole Decimals as ints, the rest as floats."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def parse_fields(value):
+    """Validate ?fields= into a list with `id` first, or None for every attribute."""
+    if not value:
+        return None
+    fields = ['id']
+    for field in (part.strip() for part in value.split(',')):
+        if not field or field in fields:
+            continue
+        if not FIELD_PATTERN.match(field) or field in HIDDEN_FIELDS:
+            raise ExportError(f"Unknown field: {field}")
+        fields.append(field)
+    if len(fields) > MAX_FIELDS:
+        raise ExportError(f"At most {MAX_FIELDS} fields per export")
+    return fields
+
+
+def export_owner(event):
+    """Key prefix for the caller's files: a hash of its user id, `internal` when invoked directly."""
+    if 'requestContext' not in event:
+        return INTERNAL_OWNER
+    return 'u-' + hashlib.sha256(rate_limit.client_key(event).encode()).hexdigest()[:24]
+
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state, default=_json_number).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not EXPORT_ID_PATTERN.match(str(state.get('exportId'))) or not isinstance(state.get('file'), int):
+            raise ValueError('bad exportId or file')
+        start_key = state.get('startKey')
+        if start_key is not None and not (isinstance(start_key, dict) and isinstance(start_key.get('id'), str)):
+            raise ValueError('bad scan position')
+        if state.get('fields') is not None:
+            state['fields'] = parse_fields(','.join(state['fields']))
+    except (ValueError, AttributeError, TypeError, UnicodeError) as e:
+        raise ExportError(f"Invalid cursor: {e}") from e
+    return state
+
+
+class MultipartWriter:
+    """
+    Buffers encoded lines and uploads them as multipart parts of `part_bytes`,
+    one part in flight while the next is filled. Small exports are written
+    with a single PutObject.
+    """
+
+    def __init__(self, bucket, key, content_type, part_bytes=EXPORT_PART_BYTES):
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_bytes = part_bytes
+        self.bytes_written = 0
+        self._s3 = aws_clients.get_s3()
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self._pool = None
+        self._in_flight = None
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_written += len(data)
+        if len(self._buffer) >= self.part_bytes:
+            self._start_part()
+
+    def _start_part(self):
+        if self._upload_id is None:
+            self._upload_id = self._s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type)['UploadId']
+            self._pool = ThreadPoolExecutor(max_workers=1)
+        self._wait()
+        body, self._buffer = bytes(self._buffer), bytearray()
+        number = len(self._parts) + 1
+        self._in_flight = (number, self._pool.submit(
+            self._s3.upload_part, Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=body))
+
+    def _wait(self):
+        if self._in_flight is not None:
+            number, future = self._in_flight
+            self._in_flight = None
+            self._parts.append({'PartNumber': number, 'ETag': future.result()['ETag']})
+
+    def close(self):
+        if self._upload_id is None:
+            self._s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                                ContentType=self.content_type)
+            return
+        if self._buffer:
+            self._start_part()
+        self._wait()
+        self._s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                           MultipartUpload={'Parts': self._parts})
+        self._pool.shutdown()
+
+    def abort(self):
+        if self._upload_id is None:
+            return
+        if self._in_flight is not None:
+            self._in_flight[1].cancel()
+        self._pool.shutdown(wait=True)
+        self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def _scan_params(fields, start_key):
+    params = {
+        'FilterExpression': '#status = :active',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {':active': 'active'}
+    }
+    if fields:
+        # Placeholders for every field, so reserved words (name, status, ...) work
+        params['ProjectionExpression'] = ', '.join(f"#f{index}" for index in range(len(fields)))
+        params['ExpressionAttributeNames'].update({f"#f{index}": field for index, field in enumerate(fields)})
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+    return params
+
+
+def _encoder(fields):
+    """Return item -> NDJSON line bytes for the requested fields."""
+    dumps = json.JSONEncoder(default=_json_number, separators=(',', ':'), ensure_ascii=False).encode
+    defaults = FIELD_DEFAULTS
+    if fields:
+        defaults = {field: FIELD_DEFAULTS[field] for field in fields if field in FIELD_DEFAULTS}
+
+    def encode(item):
+        # Scanned items are fresh dicts, so fill them in place rather than copy
+        for field, value in defaults.items():
+            item.setdefault(field, value)
+        if not fields:
+            for hidden in HIDDEN_FIELDS:
+                item.pop(hidden, None)
+        return (dumps(item) + '\n').encode()
+    return encode
+
+
+def export_file(fields=None, cursor=None, time_left=None, margin=EXPORT_TIME_MARGIN_SECONDS,
+                owner=INTERNAL_OWNER):
+    """
+    Write the next export file for `owner` and return its stats. `time_left`
+    is a callable returning the seconds the invocation has left (None: no
+    limit); the file is closed once fewer than `margin` seconds remain.
+    """
+    state = decode_cursor(cursor) if cursor else {
+        'exportId': f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+        'owner': owner,
+        'file': 1,
+        'fields': fields,
+        'startKey': None
+    }
+    if state.get('owner') != owner:
+        raise ExportError("Invalid cursor: it belongs to another caller's export")
+    fields = state['fields']
+    key = f"{EXPORT_PREFIX}{owner}/{state['exportId']}/part-{state['file']:05d}.ndjson"
+    encode = _encoder(fields)
+    table = aws_clients.get_table()
+    scan_params = _scan_params(fields, state['startKey'])
+
+    rows = 0
+    next_key = None
+    with MultipartWriter(EXPORT_BUCKET, key, 'application/x-ndjson') as writer:
+        while True:
+            response = table.scan(**scan_params)
+            items = response.get('Items', [])
+            writer.write(b''.join(encode(item) for item in items))
+            rows += len(items)
+            next_key = response.get('LastEvaluatedKey')
+            if not next_key:
+                break
+            scan_params['ExclusiveStartKey'] = next_key
+            if time_left is not None and time_left() < margin:
+                break
+
+    next_cursor = None
+    if next_key:
+        next_cursor = encode_cursor({**state, 'file': state['file'] + 1, 'startKey': next_key})
+    url = aws_clients.get_s3().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': EXPORT_BUCKET, 'Key': key, 'ResponseContentType': 'application/x-ndjson'},
+        ExpiresIn=EXPORT_URL_SECONDS
+    )
+    logger.info('Export file written', exportId=state['exportId'], file=state['file'], key=key,
+                rows=rows, bytes=writer.bytes_written, complete=next_cursor is None)
+    return {
+        'exportId': state['exportId'],
+        'file': state['file'],
+        'key': key,
+        'url': url,
+        'expiresIn': EXPORT_URL_SECONDS,
+        'rows': rows,
+        'bytes': writer.bytes_written,
+        'cursor': next_cursor,
+        'complete': next_cursor is None
+    }
+
+
+def lambda_handler(event, context):
+    """
+    exportAds Lambda Function
+    Exports active ads as NDJSON on S3 and returns a presigned download URL.
+    Follow `cursor` until `complete` is true to download every file.
+    """
+    logger.bind(event, context)
+
+    query_params = event.get('queryStringParameters') or {}
+    through_api = 'requestContext' in event
+    time_left = None
+    margin = EXPORT_TIME_MARGIN_SECONDS
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        time_left = lambda: context.get_remaining_time_in_millis() / 1000.0
+    if through_api:
+        # API Gateway times out at 29s whatever the Lambda timeout is
+        deadline = time.monotonic() + EXPORT_API_SECONDS
+        lambda_left = time_left or (lambda: math.inf)
+        time_left = lambda: min(deadline - time.monotonic(), lambda_left())
+        margin = EXPORT_API_MARGIN_SECONDS
+
+    try:
+        if through_api:
+            if not rate_limit.client_key(event).startswith('user#'):
+                return _response(401, {'success': False, 'error': 'Exports require an authenticated caller'})
+            # Strict: a rejected call costs no token, so waiting Retry-After always works
+            decision = export_limiter.check(event, strict=True)
+            if decision.stage == rate_limit.REJECT:
+                return _response(429, {
+                    'success': False,
+                    'error': 'Too many export requests, slow down and retry later'
+                }, headers={'Retry-After': str(decision.retry_after)})
+
+        fields = parse_fields(query_params.get('fields'))
+        result = export_file(fields=fields, cursor=query_params.get('cursor'), time_left=time_left,
+                             margin=margin, owner=export_owner(event))
+        return _response(200, {'success': True, **result})
+    except ExportError as e:
+        return _response(400, {'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.error('Export failed', error=str(e))
+        return _response(500, {'success': False, 'error': f'Export failed: {str(e)}'})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export active ads as NDJSON files on S3')
+    parser.add_argument('--fields', help='Comma-separated attributes to include (default: all)')
+    args = parser.parse_args(argv)
+
+    cursor = None
+    fields = parse_fields(args.fields)
+    while True:
+        result = export_file(fields=fields, cursor=cursor)
+        json.dump(result, sys.stdout)
+        sys.stdout.write('\n')
+        cursor = result['cursor']
+        if not cursor:
+            break
+
+
+if __name__ == '__main__':
+    main()
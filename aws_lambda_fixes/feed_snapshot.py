@@ -0,0 +1,270 @@
+"""
+Materialized Home Feed Snapshot
+
+The default feed (active ads, featured first, newest first) is the same for
+every anonymous visitor, so it is kept precomputed as one compressed item
+instead of being scanned and sorted on every getAds call. The item holds up
+to FEED_SNAPSHOT_SIZE + FEED_SNAPSHOT_SLACK formatted ads already in feed
+order; the slack lets removals be applied without a rescan.
+
+Writers keep it current incrementally: submitAd calls add_ad(), deletes and
+TTL cleanup call remove_ads(). Every update is a version-checked put, so
+concurrent writers retry instead of losing each other's change. Writers never
+rescan the table: when a removal uses up the slack or an update fails, the
+snapshot is only marked stale. The periodic full rebuild (getAds scheduled
+invocation) is the one place that scans; it also refreshes counters such as
+likes and commentCount and clears the stale flag. Every writer bumps
+`version` (marking a missing or stale snapshot stale again is a bump too),
+and the rebuild reads the version before it scans, so a change that lands
+mid-scan makes its save fail; it then rescans, and after
+REBUILD_ATTEMPTS leaves the snapshot as the writers left it rather than
+publishing a scan that misses their change. Readers treat a missing
+snapshot, one marked stale, or one older than FEED_SNAPSHOT_MAX_AGE_SECONDS
+since its last full rebuild as missing and fall back to the live query.
+
+Environment variables:
+    FEED_TABLE                      Snapshot table name (default BusinessAdFeed)
+    FEED_SNAPSHOT_SIZE              Ads served from the snapshot (default 100)
+    FEED_SNAPSHOT_SLACK             Extra ads kept to absorb removals (default 20)
+    FEED_SNAPSHOT_MAX_AGE_SECONDS   Max age since the last full rebuild (default 900)
+"""
+
+import json
+import os
+import random
+import time
+import zlib
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_format import format_ad
+from ad_logger import get_logger
+
+FEED_TABLE = os.environ.get('FEED_TABLE', 'BusinessAdFeed')
+SNAPSHOT_SIZE = int(os.environ.get('FEED_SNAPSHOT_SIZE', 100))
+SNAPSHOT_SLACK = int(os.environ.get('FEED_SNAPSHOT_SLACK', 20))
+MAX_AGE_SECONDS = int(os.environ.get('FEED_SNAPSHOT_MAX_AGE_SECONDS', 900))
+SNAPSHOT_ID = 'home'
+MAX_WRITE_ATTEMPTS = 5
+REBUILD_ATTEMPTS = 3  # Full scans per rebuild before giving up on a busy feed
+UNCHANGED = object()  # Returned by a change that leaves the snapshot as it is
+
+logger = get_logger('feedSnapshot')
+
+
+def feed_rank(ad):
+    """
+    Sort key for the home feed, used with reverse=True: featured first, then
+    newest first. createdAt is always a UTC isoformat() string, so comparing
+    the strings orders them by time without parsing a datetime per ad.
+    """
+    return (bool(ad.get('featured', False)), ad.get('createdAt', ''))
+
+
+def sort_feed(ads):
+    ads.sort(key=feed_rank, reverse=True)
+    return ads
+
+
+def _encode(ads):
+    return zlib.compress(json.dumps(ads, separators=(',', ':')).encode())
+
+
+def _decode(payload):
+    return json.loads(zlib.decompress(bytes(getattr(payload, 'value', payload))))
+
+
+def _load():
+    return aws_clients.get_table(FEED_TABLE).get_item(Key={'id': SNAPSHOT_ID}).get('Item')
+
+
+def _save(ads, complete, version, rebuilt_at):
+    """Write a new snapshot version; False if another writer got there first."""
+    condition = 'attribute_not_exists(id)' if version is None else 'version = :version'
+    params = {
+        'Item': {
+            'id': SNAPSHOT_ID,
+            'payload': _encode(ads),
+            'count': len(ads),
+            'complete': complete,
+            'stale': False,
+            'version': (version or 0) + 1,
+            'rebuiltAt': rebuilt_at,
+            'updatedAt': int(time.time())
+        },
+        'ConditionExpression': condition
+    }
+    if version is not None:
+        params['ExpressionAttributeValues'] = {':version': version}
+    try:
+        aws_clients.get_table(FEED_TABLE).put_item(**params)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def read(limit):
+    """
+    Return (ads, has_more) for the first `limit` feed entries, or None when
+    the snapshot is missing, marked stale, too old or too short to answer.
+    """
+    if limit > SNAPSHOT_SIZE:
+        return None
+    item = _load()
+    if not item or item.get('stale'):
+        return None
+    if time.time() - int(item.get('rebuiltAt', 0)) > MAX_AGE_SECONDS:
+        return None
+
+    ads = _decode(item['payload'])
+    complete = bool(item.get('complete'))
+    if len(ads) < limit and not complete:
+        return None
+    return ads[:limit], len(ads) > limit or not complete
+
+
+def _scan_top(capacity):
+    """The best `capacity` active ads in feed order and the active ad count."""
+    import heapq
+
+    table = aws_clients.get_table()
+    scan_params = {
+        'FilterExpression': '#status = :active',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {':active': 'active'}
+    }
+    top = []
+    total = 0
+
+    while True:
+        response = table.scan(**scan_params)
+        items = response.get('Items', [])
+        total += len(items)
+        # Keep only the best `capacity` ads so memory stays bounded on large tables
+        top = heapq.nlargest(capacity, top + items, key=feed_rank)
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return top, total
+
+
+def rebuild():
+    """
+    Full rebuild from a paginated scan of active ads. Returns the ad count.
+    Raises when writers changed the snapshot during every attempt.
+    """
+    capacity = SNAPSHOT_SIZE + SNAPSHOT_SLACK
+    for attempt in range(REBUILD_ATTEMPTS):
+        # Version first: any write after this point makes the save below fail
+        existing = _load()
+        version = existing.get('version') if existing else None
+        top, total = _scan_top(capacity)
+        ads = [format_ad(item) for item in top]
+        if _save(ads, total <= capacity, version, int(time.time())):
+            logger.info('Feed snapshot rebuilt', activeAds=total, stored=len(ads), attempts=attempt + 1)
+            return len(ads)
+        logger.info('Feed snapshot changed during rebuild, rescanning', attempt=attempt + 1)
+
+    raise RuntimeError('Feed snapshot changed during every rebuild attempt')
+
+
+def _apply(change):
+    """
+    Read-modify-write the snapshot with `change(ads, complete) -> (ads, complete)`,
+    UNCHANGED, or None when the snapshot can only be fixed by a rebuild,
+    retrying on version conflicts. Missing or stale snapshots are marked
+    stale again, which bumps the version so a rebuild already scanning
+    rescans and picks up this change.
+    """
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        item = _load()
+        if not item or item.get('stale'):
+            mark_stale()
+            return
+        result = change(_decode(item['payload']), bool(item.get('complete')))
+        if result is UNCHANGED:
+            return
+        if result is None:
+            if mark_stale(item['version']):
+                return
+            continue  # A newer version landed; apply the change to that one
+        ads, complete = result
+        if _save(ads, complete, item['version'], int(item.get('rebuiltAt', 0))):
+            return
+    mark_stale()
+
+
+def add_ad(item):
+    """Place a newly created active ad in the snapshot."""
+    ad = format_ad(item)
+    capacity = SNAPSHOT_SIZE + SNAPSHOT_SLACK
+
+    def change(ads, complete):
+        if not complete and len(ads) >= capacity and feed_rank(ad) < feed_rank(ads[-1]):
+            return UNCHANGED  # Ranks below everything the snapshot keeps
+        ads = sort_feed([existing for existing in ads if existing['id'] != ad['id']] + [ad])
+        if len(ads) > capacity:
+            del ads[capacity:]
+            complete = False
+        return ads, complete
+
+    _safely(_apply, change, action='add', adId=ad['id'])
+
+
+def remove_ads(ad_ids):
+    """Drop deleted or expired ads from the snapshot."""
+    ad_ids = set(ad_ids)
+    if not ad_ids:
+        return
+
+    def change(ads, complete):
+        kept = [ad for ad in ads if ad['id'] not in ad_ids]
+        if len(kept) == len(ads):
+            return UNCHANGED
+        if len(kept) < SNAPSHOT_SIZE and not complete:
+            return None  # The slack is used up; refill from the table
+        return kept, complete
+
+    _safely(_apply, change, action='remove', adIds=sorted(ad_ids))
+
+
+def mark_stale(version=None):
+    """
+    Send readers to the live query until the next successful rebuild, and
+    bump the version so an in-flight rebuild cannot overwrite the snapshot
+    with a scan taken before this change. Creates a stale placeholder when
+    there is no snapshot yet. With a version, only that version is marked;
+    False if the snapshot has moved on.
+    """
+    params = {
+        'Key': {'id': SNAPSHOT_ID},
+        'UpdateExpression': 'SET stale = :stale ADD version :one',
+        'ExpressionAttributeValues': {':stale': True, ':one': 1}
+    }
+    if version is not None:
+        params['ConditionExpression'] = 'version = :version'
+        params['ExpressionAttributeValues'][':version'] = version
+    try:
+        aws_clients.get_table(FEED_TABLE).update_item(**params)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def _safely(func, *args, action, **fields):
+    # Snapshot upkeep must never fail the write that triggered it
+    try:
+        func(*args)
+    except Exception as e:
+        logger.warning('Feed snapshot update failed', action=action, error=str(e), **fields)
+        try:
+            mark_stale()
+        except Exception as stale_error:
+            logger.error('Could not mark feed snapshot stale', error=str(stale_error))
@@ -1,26 +1,30 @@
 import json
-import boto3
-import uuid
 from datetime import datetime
-from urllib.parse import unquote
+
+import aws_clients
+from ad_logger import get_logger
+
+logger = get_logger('generatePresignedUrl')
+aws_clients.warm(tables=(), s3=True)
 
 def lambda_handler(event, context):
     """
     generatePresignedUrl Lambda Function
     Generates presigned URLs for S3 image uploads
     """
+    logger.bind(event, context)
     
     # Configuration
     S3_BUCKET = 'business-ad-images-1'
     CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
     
-    # Initialize S3 client
-    s3_client = boto3.client('s3')
+    # Shared S3 client (created during the init phase)
+    s3_client = aws_clients.get_s3()
     
     try:
         # Parse query parameters
         query_params = event.get('queryStringParameters') or {}
-        print(f"📥 Query parameters: {json.dumps(query_params)}")
+        logger.debug('Query parameters', query=query_params)
         
         # Get parameters
         filename = query_params.get('filename')
@@ -69,6 +73,7 @@ def lambda_handler(event, context):
             }
         
         # Generate unique filename
+        import uuid
         file_extension = allowed_types[content_type]
         base_name = filename.rsplit('.', 1)[0] if '.' in filename else filename
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
@@ -77,8 +82,6 @@ def lambda_handler(event, context):
         unique_filename = f"{timestamp}_{unique_id}_{base_name}.{file_extension}"
         s3_key = f"ads/{unique_filename}"
         
-        print(f"🔑 Generated S3 key: {s3_key}")
-        
         # Generate presigned URL for PUT operation
         presigned_url = s3_client.generate_presigned_url(
             'put_object',
@@ -93,7 +96,7 @@ def lambda_handler(event, context):
         # Generate CloudFront URL for accessing the uploaded image
         cloudfront_url = f"https://{CLOUDFRONT_DOMAIN}/{s3_key}"
         
-        print(f"✅ Generated presigned URL for: {unique_filename}")
+        logger.info('Generated presigned URL', key=s3_key, contentType=content_type)
         
         return {
             'statusCode': 200,
@@ -117,7 +120,7 @@ def lambda_handler(event, context):
         }
         
     except Exception as e:
-        print(f"❌ Error generating presigned URL: {str(e)}")
+        logger.error('Error generating presigned URL', error=str(e))
         return {
             'statusCode': 500,
             'headers': {
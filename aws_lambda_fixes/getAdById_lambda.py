@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+
+import aws_clients
+from ad_cache import ads_cache
+from ad_format import format_ad
+from ad_logger import get_logger
+
+MAX_IDS = 100  # BatchGetItem limit per request
+
+logger = get_logger('getAdById')
+aws_clients.warm()
+
+
+def _response(status_code, payload):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,OPTIONS'
+        },
+        'body': json.dumps({**payload, 'timestamp': datetime.utcnow().isoformat()})
+    }
+
+
+def requested_ids(event):
+    """Collect ids from /ads/{id}, ?id= or a comma-separated ?ids=, de-duplicated in order."""
+    query_params = event.get('queryStringParameters') or {}
+    path_params = event.get('pathParameters') or {}
+
+    raw = []
+    if path_params.get('id'):
+        raw.append(path_params['id'])
+    if query_params.get('id'):
+        raw.append(query_params['id'])
+    if query_params.get('ids'):
+        raw.extend(query_params['ids'].split(','))
+
+    ids = []
+    seen = set()
+    for ad_id in (value.strip() for value in raw):
+        if ad_id and ad_id not in seen:
+            seen.add(ad_id)
+            ids.append(ad_id)
+    return ids
+
+
+def get_ads_by_id(ad_ids):
+    """
+    Read-through lookup: serve what the container cache holds and fetch the
+    rest with one BatchGetItem. Returns {id: formatted ad} for ads that exist
+    and are not deleted.
+    """
+    found, missing = ads_cache.get_many(ad_ids)
+
+    if missing:
+        items = aws_clients.batch_get(aws_clients.ADS_TABLE, [{'id': ad_id} for ad_id in missing])
+        for item in items:
+            if item.get('status') == 'deleted':
+                continue
+            ad = format_ad(item)
+            ads_cache.put(ad['id'], ad)
+            found[ad['id']] = ad
+
+    return found
+
+
+def lambda_handler(event, context):
+    """
+    getAdById Lambda Function
+    Fetches one ad (GET /ads/{id} or ?id=) or up to 100 ads (?ids=a,b,c) by
+    id with a single BatchGetItem behind a per-container LRU cache, so
+    opening an ad costs one key lookup instead of a feed scan.
+    """
+    if event.get('httpMethod') == 'OPTIONS':
+        return _response(200, {'success': True})
+
+    logger.bind(event, context)
+
+    try:
+        ad_ids = requested_ids(event)
+        if not ad_ids:
+            return _response(400, {'success': False, 'error': 'Missing required parameter: id or ids'})
+        if len(ad_ids) > MAX_IDS:
+            return _response(400, {'success': False, 'error': f'At most {MAX_IDS} ids per request'})
+
+        found = get_ads_by_id(ad_ids)
+        logger.debug('Fetched ads by id', requested=len(ad_ids), found=len(found))
+
+        query_params = event.get('queryStringParameters') or {}
+        if len(ad_ids) == 1 and not query_params.get('ids'):
+            ad = found.get(ad_ids[0])
+            if ad is None:
+                return _response(404, {'success': False, 'error': f'Ad with ID {ad_ids[0]} not found',
+                                       'adId': ad_ids[0]})
+            return _response(200, {'success': True, 'ad': ad})
+
+        return _response(200, {
+            'success': True,
+            'ads': [found[ad_id] for ad_id in ad_ids if ad_id in found],
+            'missing': [ad_id for ad_id in ad_ids if ad_id not in found]
+        })
+
+    except Exception as e:
+        logger.error('Error fetching ads by id', error=str(e))
+        return _response(500, {'success': False, 'error': f'Failed to fetch ads: {str(e)}'})
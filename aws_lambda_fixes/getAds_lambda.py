@@ -1,18 +1,77 @@
 import json
-import boto3
+import os
 from datetime import datetime
-from decimal import Decimal
-from urllib.parse import parse_qs
+
+import ad_sync
+import aws_clients
+import feed_snapshot
+import rate_limit
+from ad_cache import AdCache
+from ad_format import format_ad
+from ad_logger import get_logger
+
+logger = get_logger('getAds')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, feed_snapshot.FEED_TABLE, ad_sync.TOMBSTONE_TABLE,
+                         rate_limit.RATE_LIMIT_TABLE))
+
+# Recent response payloads by query, served to clients in the `cached` stage
+recent_responses = AdCache(
+    max_entries=int(os.environ.get('RATE_LIMIT_CACHE_ENTRIES', 256)),
+    ttl_seconds=float(os.environ.get('RATE_LIMIT_CACHE_SECONDS', 60))
+)
+
+def _response(status_code, payload, headers=None):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,OPTIONS',
+            **(headers or {})
+        },
+        'body': json.dumps({**payload, 'timestamp': datetime.utcnow().isoformat()})
+    }
+
+def _rate_limited(decision):
+    return _response(429, {
+        'success': False,
+        'error': 'Too many requests, slow down and retry later'
+    }, headers={'Retry-After': str(decision.retry_after or 1)})
+
+def record_views(table, ads, user_id_filter):
+    """Increment viewCount for each returned ad (excluding a user viewing own ads)"""
+    for ad in ads:
+        if not user_id_filter or ad.get('userId') != user_id_filter:
+            try:
+                table.update_item(
+                    Key={'id': ad['id']},
+                    UpdateExpression='ADD viewCount :inc',
+                    ExpressionAttributeValues={':inc': 1}
+                )
+                ad['viewCount'] = ad.get('viewCount', 0) + 1
+            except Exception as e:
+                logger.warning('Failed to increment view count', adId=ad['id'], error=str(e))
 
 def lambda_handler(event, context):
     """
-    Enhanced getAds Lambda Function - Version 2.1
-    Retrieves business ads from DynamoDB with advanced filtering capabilities
+    Enhanced getAds Lambda Function - Version 2.2
+    Retrieves business ads from DynamoDB with advanced filtering capabilities.
+    The unfiltered home feed is served from the materialized feed snapshot
+    (one read, already sorted) and falls back to a live scan when it is stale.
+    Scheduled (EventBridge) invocations rebuild the snapshot.
+    `since=<watermark>` returns only ads changed or removed after it (delta sync).
+    Each client is rate limited (rate_limit.py): past its allowance it first
+    stops counting views, then only gets cached results, then 429.
     """
+    logger.bind(event, context)
+    
+    if event.get('source') == 'aws.events':
+        stored = feed_snapshot.rebuild()
+        return {'statusCode': 200, 'body': json.dumps({'success': True, 'snapshot_ads': stored})}
     
-    # Initialize DynamoDB
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('BusinessAds')
+    # Shared DynamoDB table (created during the init phase)
+    table = aws_clients.get_table()
     
     # Configuration
     CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
@@ -20,7 +79,50 @@ def lambda_handler(event, context):
     try:
         # Parse query parameters
         query_params = event.get('queryStringParameters') or {}
-        print(f"📥 Query parameters: {json.dumps(query_params)}")
+        logger.debug('Query parameters', query=query_params)
+        
+        # Per-client rate limit, degrading in stages before rejecting
+        decision = rate_limit.limiter.check(event)
+        if decision.stage == rate_limit.REJECT:
+            return _rate_limited(decision)
+        count_views = decision.stage == rate_limit.ALLOW
+        cache_key = json.dumps(query_params, sort_keys=True)
+        if decision.stage == rate_limit.CACHED:
+            cached = recent_responses.get(cache_key)
+            if cached is not None:
+                logger.info('Returning cached ads', client=decision.client, count=len(cached['ads']))
+                return _response(200, {**cached, 'summary': {**cached['summary'], 'source': 'cache'}})
+        
+        # Delta sync: only what changed after the client's watermark
+        if query_params.get('since'):
+            try:
+                since = ad_sync.parse_watermark(query_params['since'])
+            except ValueError:
+                return _response(400, {
+                    'success': False,
+                    'error': 'since must be an ISO 8601 timestamp (use the watermark from the last response)'
+                })
+            if decision.stage == rate_limit.CACHED:
+                return _rate_limited(decision)
+            
+            sync = ad_sync.changes_since(since)
+            logger.info('Returning changes', since=since, changed=len(sync['ads']),
+                        deleted=len(sync['deletedIds']), resync=sync['resync'])
+            payload = {
+                'success': True,
+                'ads': sync['ads'],
+                'deletedIds': sync['deletedIds'],
+                'watermark': sync['watermark'],
+                'resync': sync['resync'],
+                'summary': {
+                    'total_count': len(sync['ads']),
+                    'deleted_count': len(sync['deletedIds']),
+                    'has_more': sync['hasMore'],
+                    'source': 'sync'
+                }
+            }
+            recent_responses.put(cache_key, payload)
+            return _response(200, payload)
         
         # Get filter parameters
         user_id_filter = query_params.get('userId')
@@ -29,6 +131,30 @@ def lambda_handler(event, context):
         status_filter = query_params.get('status', 'active')  # Default to active ads
         limit = min(int(query_params.get('limit', 50)), 100)  # Max 100, default 50
         
+        # Default home feed: serve the precomputed snapshot when it is fresh
+        snapshot = None
+        if not (user_id_filter or user_name_filter or featured_filter) and status_filter == 'active':
+            snapshot = feed_snapshot.read(limit)
+        
+        if snapshot is not None:
+            processed_ads, has_more = snapshot
+            if count_views:
+                record_views(table, processed_ads, None)
+            summary = {
+                'total_count': len(processed_ads),
+                'filtered_by': {'status': status_filter},
+                'has_more': has_more,
+                'source': 'snapshot'
+            }
+            logger.info('Returning ads', count=len(processed_ads), source='snapshot')
+            payload = {'success': True, 'ads': processed_ads, 'summary': summary}
+            recent_responses.put(cache_key, payload)
+            return _response(200, payload)
+        
+        # A live scan is exactly what the cached stage protects the table from
+        if decision.stage == rate_limit.CACHED:
+            return _rate_limited(decision)
+        
         # Build scan parameters
         scan_params = {
             'Limit': limit
@@ -69,59 +195,26 @@ def lambda_handler(event, context):
         if expression_attribute_values:
             scan_params['ExpressionAttributeValues'] = expression_attribute_values
         
-        print(f"🔍 Scan parameters: {json.dumps(scan_params, default=str)}")
+        logger.debug('Scan parameters', scan=scan_params)
         
         # Perform scan
         response = table.scan(**scan_params)
         items = response.get('Items', [])
         
-        print(f"📊 Found {len(items)} ads")
-        
-        # Convert Decimal to float for JSON serialization
-        def decimal_to_float(obj):
-            if isinstance(obj, Decimal):
-                return float(obj)
-            return obj
-        
         # Process items
-        processed_ads = []
-        for item in items:
-            # Convert Decimals to floats
-            processed_item = json.loads(json.dumps(item, default=decimal_to_float))
-            
-            # Ensure social media fields have defaults
-            processed_item.setdefault('likes', 0)
-            processed_item.setdefault('viewCount', 0)
-            processed_item.setdefault('comments', [])
-            processed_item.setdefault('featured', False)
-            processed_item.setdefault('status', 'active')
-            
-            # Increment view count (exclude user viewing own ads)
-            if not user_id_filter or processed_item.get('userId') != user_id_filter:
-                try:
-                    # Increment view count in database
-                    table.update_item(
-                        Key={'id': processed_item['id']},
-                        UpdateExpression='ADD viewCount :inc',
-                        ExpressionAttributeValues={':inc': 1}
-                    )
-                    processed_item['viewCount'] = processed_item.get('viewCount', 0) + 1
-                except Exception as e:
-                    print(f"⚠️ Failed to increment view count for {processed_item['id']}: {str(e)}")
-            
-            processed_ads.append(processed_item)
+        processed_ads = [format_ad(item) for item in items]
+        if count_views:
+            record_views(table, processed_ads, user_id_filter)
         
         # Sort: featured ads first, then by creation date (newest first)
-        processed_ads.sort(key=lambda x: (
-            not x.get('featured', False),  # Featured first (False sorts before True)
-            -(datetime.fromisoformat(x.get('createdAt', '1970-01-01T00:00:00')).timestamp())
-        ))
+        feed_snapshot.sort_feed(processed_ads)
         
         # Build summary
         summary = {
             'total_count': len(processed_ads),
             'filtered_by': {},
-            'has_more': len(items) == limit  # Indicates if there might be more results
+            'has_more': len(items) == limit,  # Indicates if there might be more results
+            'source': 'live'
         }
         
         # Add filter info to summary
@@ -134,38 +227,16 @@ def lambda_handler(event, context):
         if status_filter:
             summary['filtered_by']['status'] = status_filter
         
-        print(f"✅ Returning {len(processed_ads)} ads with summary: {json.dumps(summary)}")
-        
-        # Return success response
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
-            'body': json.dumps({
-                'success': True,
-                'ads': processed_ads,
-                'summary': summary,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-        }
+        logger.info('Returning ads', count=len(processed_ads), scanned=len(items),
+                    filteredBy=summary['filtered_by'])
+        
+        payload = {'success': True, 'ads': processed_ads, 'summary': summary}
+        recent_responses.put(cache_key, payload)
+        return _response(200, payload)
         
     except Exception as e:
-        print(f"❌ Error fetching ads: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
-            'body': json.dumps({
-                'success': False,
-                'error': f'Failed to fetch ads: {str(e)}',
-                'timestamp': datetime.utcnow().isoformat()
-            })
-        }
+        logger.error('Error fetching ads', error=str(e))
+        return _response(500, {
+            'success': False,
+            'error': f'Failed to fetch ads: {str(e)}'
+        })
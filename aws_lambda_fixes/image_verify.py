@@ -0,0 +1,200 @@
+"""
+Concurrent Image Verification for submitAd
+
+Checks that every image an ad references was actually uploaded, using a
+container-wide bounded thread pool of S3 HEAD requests so a three-image ad
+costs one round trip rather than three. The whole check has a strict time
+budget: images still unanswered when it runs out are reported as
+unverified and the ad is accepted without their metadata, so a slow S3
+call never fails a submission.
+
+For each verified image the ad stores byte size and content type. Width and
+height come from `x-amz-meta-width` / `x-amz-meta-height` when the uploader
+set them, otherwise from a small ranged GET of the file header (PNG, GIF,
+WebP and most JPEGs keep their dimensions in the first few kilobytes).
+
+Without s3:ListBucket, S3 answers a HEAD of a missing key with 403 rather
+than 404. A 403 for a key under UPLOADS_PREFIX, where the role always has
+s3:GetObject, can only mean the object is not there, so it is reported as
+missing (and logged, in case the policy really is wrong).
+
+Environment variables:
+    IMAGES_BUCKET                   Bucket behind the CloudFront domain (default business-ad-images-1)
+    IMAGE_VERIFY_WORKERS            Concurrent S3 requests per container (default 8)
+    IMAGE_VERIFY_BUDGET_SECONDS     Wall-clock budget for the whole check (default 2.0)
+    IMAGE_DIMENSION_PROBE_BYTES     Header bytes fetched to read dimensions, 0 to disable (default 16384)
+"""
+
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_logger import get_logger
+
+IMAGES_BUCKET = os.environ.get('IMAGES_BUCKET', 'business-ad-images-1')
+CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
+VERIFY_WORKERS = int(os.environ.get('IMAGE_VERIFY_WORKERS', 8))
+VERIFY_BUDGET_SECONDS = float(os.environ.get('IMAGE_VERIFY_BUDGET_SECONDS', 2.0))
+DIMENSION_PROBE_BYTES = int(os.environ.get('IMAGE_DIMENSION_PROBE_BYTES', 16384))
+
+UPLOADS_PREFIX = 'ads/'  # Where generatePresignedUrl puts uploads
+
+MISSING_ERROR_CODES = ('404', 'NoSuchKey', 'NotFound')
+FORBIDDEN_ERROR_CODES = ('403', 'AccessDenied', 'Forbidden')
+
+logger = get_logger('imageVerify')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix='image-verify')
+    return _pool
+
+
+def s3_key_for_url(url):
+    """S3 key for a normalized CloudFront image URL, or None for external URLs."""
+    prefix = f"https://{CLOUDFRONT_DOMAIN}/"
+    if url.startswith(prefix):
+        return url[len(prefix):].split('?', 1)[0] or None
+    return None
+
+
+def image_dimensions(data):
+    """Return (width, height) from the start of a PNG, GIF, WebP or JPEG file, or None."""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        return None
+    if data[:2] == b'\xff\xd8':
+        return _jpeg_dimensions(data)
+    return None
+
+
+def _jpeg_dimensions(data):
+    index = 2
+    while index + 9 < len(data):
+        if data[index] != 0xFF:
+            return None
+        marker = data[index + 1]
+        if marker == 0xFF:  # Fill byte
+            index += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            index += 2
+            continue
+        length = struct.unpack('>H', data[index + 2:index + 4])[0]
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[index + 5:index + 9])
+            return width, height
+        index += 2 + length
+    return None
+
+
+def _probe_dimensions(s3, key):
+    response = s3.get_object(Bucket=IMAGES_BUCKET, Key=key, Range=f"bytes=0-{DIMENSION_PROBE_BYTES - 1}")
+    return image_dimensions(response['Body'].read())
+
+
+def _inspect(url):
+    """HEAD one image. Returns its metadata dict, or None when the object does not exist."""
+    key = s3_key_for_url(url)
+    s3 = aws_clients.get_s3()
+    try:
+        head = s3.head_object(Bucket=IMAGES_BUCKET, Key=key)
+    except ClientError as e:
+        code = e.response['Error']['Code']
+        if code in MISSING_ERROR_CODES:
+            return None
+        if code in FORBIDDEN_ERROR_CODES and key.startswith(UPLOADS_PREFIX):
+            logger.warning('HEAD of upload denied, treating it as missing (grant s3:ListBucket for 404s)',
+                           key=key)
+            return None
+        raise
+
+    image = {
+        'url': url,
+        'bytes': head.get('ContentLength', 0),
+        'contentType': head.get('ContentType', 'binary/octet-stream')
+    }
+
+    metadata = head.get('Metadata') or {}
+    dimensions = None
+    if metadata.get('width') and metadata.get('height'):
+        try:
+            dimensions = int(metadata['width']), int(metadata['height'])
+        except ValueError:
+            dimensions = None
+    if dimensions is None and DIMENSION_PROBE_BYTES > 0 and image['contentType'].startswith('image/'):
+        try:
+            dimensions = _probe_dimensions(s3, key)
+        except Exception as e:
+            logger.debug('Dimension probe failed', key=key, error=str(e))
+    if dimensions:
+        image['width'], image['height'] = dimensions
+
+    return image
+
+
+def verify_images(urls):
+    """
+    Check every URL concurrently within the time budget.
+
+    Returns (images, missing, unverified): metadata for verified images in
+    URL order, URLs whose objects do not exist, and URLs that could not be
+    checked (external hosts, S3 errors, or the budget ran out).
+    """
+    deadline = time.monotonic() + VERIFY_BUDGET_SECONDS
+    pool = _get_pool()
+
+    futures = {}
+    unverified = []
+    for url in urls:
+        if s3_key_for_url(url):
+            futures[url] = pool.submit(_inspect, url)
+        else:
+            unverified.append(url)
+
+    wait(futures.values(), timeout=max(deadline - time.monotonic(), 0))
+
+    images = []
+    missing = []
+    for url, future in futures.items():
+        if not future.done():
+            future.cancel()
+            unverified.append(url)
+            continue
+        try:
+            image = future.result()
+        except Exception as e:
+            logger.warning('Image verification failed', url=url, error=str(e))
+            unverified.append(url)
+            continue
+        if image is None:
+            missing.append(url)
+        else:
+            images.append(image)
+
+    return images, missing, unverified
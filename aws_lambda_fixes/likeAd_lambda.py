@@ -0,0 +1,292 @@
+import json
+import os
+import random
+import time
+import zlib
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_cache import ads_cache
+from ad_logger import get_logger
+
+# Configuration
+LIKES_TABLE = os.environ.get('LIKES_TABLE', 'BusinessAdLikes')
+LIKE_SHARDS = int(os.environ.get('LIKE_SHARDS', 10))  # Counter shards per ad
+MERGE_INTERVAL_SECONDS = int(os.environ.get('LIKE_MERGE_INTERVAL_SECONDS', 30))
+DIRTY_SHARDS = int(os.environ.get('LIKE_DIRTY_SHARDS', 10))  # Dirty marker items per minute
+LIKES_AD_INDEX = os.environ.get('LIKES_AD_INDEX', 'adId-index')  # Like records and shards by ad
+SWEEP_WINDOW_MINUTES = 10  # How far back the scheduled sweep looks for dirty markers
+
+logger = get_logger('likeAd')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, LIKES_TABLE))
+
+# Per-container throttles: when this container last merged an ad's total, and
+# which minute bucket it has already marked the ad dirty in.
+_last_merged = {}
+_marked_dirty = {}
+
+
+def like_key(ad_id, user_id):
+    return f"{ad_id}#user#{user_id}"
+
+
+def shard_key(ad_id, shard):
+    return f"{ad_id}#shard#{shard}"
+
+
+def dirty_key(minute, shard):
+    return f"dirty#{minute}#{shard}"
+
+
+def dirty_shard(ad_id):
+    """Stable marker shard for an ad, so one minute's ads spread over DIRTY_SHARDS items."""
+    return zlib.crc32(ad_id.encode()) % DIRTY_SHARDS
+
+
+def _response(status_code, payload, methods='POST,DELETE,OPTIONS'):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': methods
+        },
+        'body': json.dumps({**payload, 'timestamp': datetime.utcnow().isoformat()}, default=str)
+    }
+
+
+def _restore_like_record(likes_table, ad_id, user_id, liked):
+    """Put a user's like record back to how it was before `liked` was applied."""
+    key = {'id': like_key(ad_id, user_id)}
+    if liked:
+        likes_table.delete_item(Key=key)
+    else:
+        likes_table.put_item(Item={**key, 'adId': ad_id, 'userId': user_id,
+                                   'likedAt': datetime.utcnow().isoformat()})
+
+
+def set_like_state(ad_id, user_id, liked):
+    """
+    Record one user's like state idempotently and move one counter shard.
+    Returns the key of the shard moved, or None when the state did not change.
+
+    The like record is written first with a condition, so repeated likes (or
+    unlikes) never touch a shard. The increment goes to a random shard so a
+    viral ad spreads its writes over LIKE_SHARDS items instead of one.
+    """
+    likes_table = aws_clients.get_table(LIKES_TABLE)
+    key = {'id': like_key(ad_id, user_id)}
+
+    try:
+        if liked:
+            likes_table.put_item(
+                Item={**key, 'adId': ad_id, 'userId': user_id, 'likedAt': datetime.utcnow().isoformat()},
+                ConditionExpression='attribute_not_exists(id)'
+            )
+        else:
+            likes_table.delete_item(Key=key, ConditionExpression='attribute_exists(id)')
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+    shard = shard_key(ad_id, random.randrange(LIKE_SHARDS))
+    try:
+        likes_table.update_item(
+            Key={'id': shard},
+            UpdateExpression='SET adId = :ad_id ADD #count :delta',
+            ExpressionAttributeNames={'#count': 'count'},
+            ExpressionAttributeValues={':ad_id': ad_id, ':delta': 1 if liked else -1}
+        )
+    except Exception:
+        # Undo the state change so a retry is not swallowed as a duplicate
+        _restore_like_record(likes_table, ad_id, user_id, liked)
+        raise
+
+    return shard
+
+
+def undo_like_state(ad_id, user_id, liked, shard):
+    """Reverse a change made by set_like_state: the shard increment, then the like record."""
+    likes_table = aws_clients.get_table(LIKES_TABLE)
+    likes_table.update_item(
+        Key={'id': shard},
+        UpdateExpression='ADD #count :delta',
+        ExpressionAttributeNames={'#count': 'count'},
+        ExpressionAttributeValues={':delta': -1 if liked else 1}
+    )
+    _restore_like_record(likes_table, ad_id, user_id, liked)
+
+
+def merge_likes(ad_id):
+    """
+    Sum an ad's counter shards with one BatchGetItem and store the total on
+    the ad item as `likes`, which is what getAds reads. Returns the total,
+    or None when the ad no longer exists or a newer merge already landed.
+    """
+    merged_at = datetime.utcnow().isoformat()
+    shards = aws_clients.batch_get(
+        LIKES_TABLE,
+        [{'id': shard_key(ad_id, shard)} for shard in range(LIKE_SHARDS)],
+        projection='#count',
+        names={'#count': 'count'}
+    )
+    total = sum(int(shard.get('count', 0)) for shard in shards)
+
+    try:
+        aws_clients.get_table().update_item(
+            Key={'id': ad_id},
+            UpdateExpression='SET likes = :total, likesMergedAt = :merged_at',
+            ConditionExpression='attribute_exists(id) AND '
+                                '(attribute_not_exists(likesMergedAt) OR likesMergedAt < :merged_at)',
+            ExpressionAttributeValues={':total': max(total, 0), ':merged_at': merged_at}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+
+    _last_merged[ad_id] = time.monotonic()
+    ads_cache.invalidate(ad_id)
+    return max(total, 0)
+
+
+def mark_dirty(ad_id):
+    """
+    Note that an ad's shards changed without a merge, so the scheduled sweep
+    folds in trailing likes. Written at most once per ad, minute and container,
+    to one of DIRTY_SHARDS marker items so no single key takes every like.
+    """
+    minute = int(time.time() // 60)
+    if _marked_dirty.get(ad_id) == minute:
+        return
+    aws_clients.get_table(LIKES_TABLE).update_item(
+        Key={'id': dirty_key(minute, dirty_shard(ad_id))},
+        UpdateExpression='ADD adIds :ad_ids SET #ttl = :ttl',
+        ExpressionAttributeNames={'#ttl': 'ttl'},
+        ExpressionAttributeValues={':ad_ids': {ad_id}, ':ttl': int(time.time()) + 86400}
+    )
+    _marked_dirty[ad_id] = minute
+
+
+def delete_ad_likes(ad_id):
+    """Delete an ad's like records and counter shards; returns how many were removed."""
+    likes_table = aws_clients.get_table(LIKES_TABLE)
+    query = {
+        'IndexName': LIKES_AD_INDEX,
+        'KeyConditionExpression': 'adId = :ad_id',
+        'ExpressionAttributeValues': {':ad_id': ad_id},
+        'ProjectionExpression': 'id'
+    }
+    deleted = 0
+    with likes_table.batch_writer() as writer:
+        while True:
+            response = likes_table.query(**query)
+            for item in response.get('Items', []):
+                writer.delete_item(Key={'id': item['id']})
+                deleted += 1
+            if not response.get('LastEvaluatedKey'):
+                return deleted
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def sweep_dirty():
+    """Merge every ad marked dirty in the last few complete minutes."""
+    likes_table = aws_clients.get_table(LIKES_TABLE)
+    current_minute = int(time.time() // 60)
+    merged = 0
+
+    for minute in range(current_minute - SWEEP_WINDOW_MINUTES, current_minute):
+        markers = aws_clients.batch_get(LIKES_TABLE, [{'id': dirty_key(minute, shard)}
+                                                      for shard in range(DIRTY_SHARDS)])
+        for marker in markers:
+            for ad_id in marker.get('adIds', set()):
+                if merge_likes(ad_id) is not None:
+                    merged += 1
+            likes_table.delete_item(Key={'id': marker['id']})
+
+    return merged
+
+
+def lambda_handler(event, context):
+    """
+    likeAd Lambda Function
+    POST /likes records a like, DELETE /likes removes it. Like state is kept
+    per user so repeats are no-ops, and counts go to one of LIKE_SHARDS
+    counter shards per ad. The merged total is written back to the ad's
+    `likes` attribute at most every LIKE_MERGE_INTERVAL_SECONDS per container;
+    a scheduled EventBridge invocation sweeps up ads with unmerged changes.
+    """
+    if event.get('httpMethod') == 'OPTIONS':
+        return _response(200, {'success': True})
+
+    logger.bind(event, context)
+
+    if event.get('source') == 'aws.events':
+        merged = sweep_dirty()
+        logger.info('Like sweep completed', adsMerged=merged)
+        return {'statusCode': 200, 'body': json.dumps({'success': True, 'ads_merged': merged})}
+
+    try:
+        body = event.get('body') or {}
+        if isinstance(body, str):
+            body = json.loads(body)
+
+        ad_id = body.get('adId')
+        user_id = body.get('userId')
+        if not ad_id or not user_id:
+            return _response(400, {'success': False, 'error': 'Missing required fields: adId and userId'})
+
+        liked = event.get('httpMethod', 'POST') != 'DELETE'
+
+        ad = aws_clients.get_table().get_item(
+            Key={'id': ad_id},
+            ProjectionExpression='id, #status',
+            ExpressionAttributeNames={'#status': 'status'}
+        ).get('Item')
+        if not ad or ad.get('status', 'active') != 'active':
+            return _response(404, {'success': False, 'error': f'Ad with ID {ad_id} not found', 'adId': ad_id})
+
+        shard = set_like_state(ad_id, user_id, liked)
+        changed = shard is not None
+
+        likes = None
+        if changed:
+            # The shard has moved, so the ad's total must either be merged
+            # now or marked dirty for the sweep. A failed merge falls back to
+            # the marker; if that fails too the change is undone and the
+            # client retries, instead of the shard drifting from `likes`.
+            merged = False
+            last_merged = _last_merged.get(ad_id)
+            if last_merged is None or time.monotonic() - last_merged >= MERGE_INTERVAL_SECONDS:
+                try:
+                    likes = merge_likes(ad_id)
+                    merged = True
+                except Exception as e:
+                    logger.warning('Like recorded but total not merged', adId=ad_id, error=str(e))
+            if not merged:
+                try:
+                    mark_dirty(ad_id)
+                except Exception as e:
+                    logger.error('Dirty marker failed, undoing like', adId=ad_id, error=str(e))
+                    undo_like_state(ad_id, user_id, liked, shard)
+                    return _response(500, {'success': False, 'error': f'Failed to update like: {str(e)}',
+                                           'adId': ad_id})
+
+        logger.debug('Like state recorded', adId=ad_id, liked=liked, changed=changed)
+
+        payload = {'success': True, 'adId': ad_id, 'userId': user_id, 'liked': liked, 'changed': changed}
+        if likes is not None:
+            payload['likes'] = likes
+        return _response(200, payload)
+
+    except json.JSONDecodeError as e:
+        logger.warning('JSON decode error', error=str(e))
+        return _response(400, {'success': False, 'error': f'Invalid JSON in request body: {str(e)}'})
+
+    except Exception as e:
+        logger.error('Error updating like', error=str(e))
+        return _response(500, {'success': False, 'error': f'Failed to update like: {str(e)}'})
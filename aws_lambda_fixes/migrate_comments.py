@@ -0,0 +1,116 @@
+"""
+Comments Migration - Embedded Lists to BusinessAdComments Items
+
+Moves the `comments` list stored inside each BusinessAds item into separate
+items in the BusinessAdComments table (partition adId, sort commentId), then
+removes the list from the ad and adds the copied count to `commentCount`.
+
+Comment items are written with batch_writer (25 items per BatchWriteItem,
+unprocessed items retried by boto3). Each legacy comment gets a
+deterministic commentId, so re-running after a partial failure overwrites
+instead of duplicating. The ad update is conditional on the list still
+having the size that was copied, so an ad modified mid-run is left for the
+next run.
+
+Usage:
+    python aws_lambda_fixes/migrate_comments.py --dry-run
+    python aws_lambda_fixes/migrate_comments.py
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+from ad_logger import get_logger
+from comments_lambda import COMMENTS_TABLE, comment_sort_key
+
+logger = get_logger('migrateComments')
+
+
+def legacy_comment_items(ad):
+    """Convert an ad's embedded comments into BusinessAdComments items."""
+    items = []
+    fallback_time = ad.get('createdAt') or datetime.utcnow().isoformat()
+    for index, legacy in enumerate(ad.get('comments') or []):
+        if not isinstance(legacy, dict):
+            legacy = {'text': str(legacy)}
+        created_at = str(legacy.get('createdAt') or legacy.get('timestamp') or fallback_time)
+        item = {key: value for key, value in legacy.items() if value not in (None, '')}
+        item.update({
+            'adId': ad['id'],
+            'commentId': comment_sort_key(created_at, f"legacy{index:04d}"),
+            'createdAt': created_at,
+            'text': str(legacy.get('text') or legacy.get('comment') or ''),
+            'userName': legacy.get('userName') or 'Unknown'
+        })
+        items.append(item)
+    return items
+
+
+def migrate(dry_run=False):
+    ads_table = aws_clients.get_table()
+    comments_table = aws_clients.get_table(COMMENTS_TABLE)
+
+    scan_params = {
+        'FilterExpression': 'attribute_exists(comments)',
+        'ProjectionExpression': 'id, comments, createdAt'
+    }
+    stats = {'adsScanned': 0, 'adsMigrated': 0, 'commentsCopied': 0, 'adsSkipped': 0}
+
+    while True:
+        response = ads_table.scan(**scan_params)
+        page = [(ad, legacy_comment_items(ad)) for ad in response.get('Items', [])]
+        stats['adsScanned'] += len(page)
+        stats['commentsCopied'] += sum(len(comments) for _, comments in page)
+
+        if dry_run:
+            stats['adsMigrated'] += len(page)
+        else:
+            # Copy the whole page's comments first; leaving the block flushes
+            # every batch, so no ad drops its list before its comments exist.
+            with comments_table.batch_writer(overwrite_by_pkeys=['adId', 'commentId']) as writer:
+                for _, comments in page:
+                    for comment in comments:
+                        writer.put_item(Item=comment)
+
+            for ad, comments in page:
+                try:
+                    ads_table.update_item(
+                        Key={'id': ad['id']},
+                        # Keep any comments already added through POST /comments
+                        UpdateExpression='REMOVE comments '
+                                         'SET commentCount = if_not_exists(commentCount, :zero) + :count',
+                        ConditionExpression='size(comments) = :count',
+                        ExpressionAttributeValues={':count': len(comments), ':zero': 0}
+                    )
+                    stats['adsMigrated'] += 1
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    stats['adsSkipped'] += 1
+                    logger.warning('Ad changed during migration, skipped', adId=ad['id'])
+
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    logger.info('Comments migration finished', dryRun=dry_run, **stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Move embedded ad comments into BusinessAdComments')
+    parser.add_argument('--dry-run', action='store_true', help='Count what would be migrated without writing')
+    args = parser.parse_args(argv)
+
+    stats = migrate(dry_run=args.dry_run)
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
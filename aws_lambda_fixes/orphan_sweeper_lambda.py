@@ -0,0 +1,241 @@
+"""
+Orphaned Upload Sweeper - Reconcile S3 `ads/` With BusinessAds
+
+Uploads made through generatePresignedUrl that never end up on an ad
+(abandoned forms, retried uploads) and the images of ads soft-deleted long
+ago otherwise stay in S3 forever. This job:
+
+1. Scans BusinessAds (projecting only image fields) and adds every key an
+   ad still references to a Bloom filter. Soft-deleted ads keep their
+   images referenced until they have been deleted for the grace period.
+2. Streams the S3 listing under `ads/` page by page.
+3. Deletes objects older than the grace period that the filter has never
+   seen, 1,000 keys per DeleteObjects call.
+
+Memory is the filter's fixed size (about 1.8 MB per million keys at the
+default 0.1% false-positive rate) plus one listing page, however large the
+bucket is. A false positive only means an orphan survives until a later
+run; a referenced image is never deleted.
+
+Triggered by EventBridge (e.g. daily); `{"dryRun": true}` in the event (or
+ORPHAN_SWEEP_DRY_RUN=1) reports what would be deleted without deleting.
+
+Environment variables:
+    ORPHAN_GRACE_HOURS             Minimum object / soft-delete age before sweeping (default 48)
+    ORPHAN_SWEEP_EXPECTED_KEYS     Bloom filter sizing (default 1000000)
+    ORPHAN_SWEEP_FALSE_POSITIVE    Target false-positive rate (default 0.001)
+    ORPHAN_SWEEP_DRY_RUN           1 to only report (default 0)
+
+Usage:
+    python aws_lambda_fixes/orphan_sweeper_lambda.py --dry-run
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import aws_clients
+from ad_logger import get_logger
+
+S3_BUCKET = 'business-ad-images-1'
+SWEEP_PREFIX = 'ads/'
+GRACE_HOURS = float(os.environ.get('ORPHAN_GRACE_HOURS', 48))
+EXPECTED_KEYS = int(os.environ.get('ORPHAN_SWEEP_EXPECTED_KEYS', 1000000))
+FALSE_POSITIVE_RATE = float(os.environ.get('ORPHAN_SWEEP_FALSE_POSITIVE', 0.001))
+DELETE_BATCH_SIZE = 1000  # DeleteObjects limit
+SAMPLE_SIZE = 20  # Orphan keys listed in the report
+
+logger = get_logger('orphanSweeper')
+aws_clients.warm(s3=True)
+
+
+class BloomFilter:
+    """Fixed-size set membership with no false negatives."""
+
+    def __init__(self, expected_items, false_positive_rate):
+        expected_items = max(expected_items, 1)
+        self.size_bits = max(int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size_bits / expected_items * math.log(2))), 1)
+        self.bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size_bits
+        return [(first + i * second) % size for i in range(self.hash_count)]
+
+    def add(self, value):
+        bits = self.bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        bits = self.bits
+        for position in self._positions(value):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def estimated_false_positive_rate(self):
+        return (1 - math.exp(-self.hash_count * self.count / self.size_bits)) ** self.hash_count
+
+
+def image_key(url):
+    """S3 key for a CloudFront, S3 or relative image URL."""
+    if not url:
+        return None
+    if not url.startswith('http'):
+        return url.lstrip('/')
+    # Everything after the host, without a query string
+    path = url.partition('://')[2].partition('/')[2].split('?', 1)[0]
+    if path.startswith(f"{S3_BUCKET}/"):  # Path-style S3 URL
+        path = path[len(S3_BUCKET) + 1:]
+    return path or None
+
+
+def referenced_keys(grace_cutoff_iso):
+    """Bloom filter of every image key an ad still references."""
+    table = aws_clients.get_table()
+    referenced = BloomFilter(EXPECTED_KEYS, FALSE_POSITIVE_RATE)
+    scan_params = {
+        'ProjectionExpression': 'imageUrls, userProfileImage, #status, updatedAt',
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+    ads_scanned = 0
+
+    while True:
+        response = table.scan(**scan_params)
+        for ad in response.get('Items', []):
+            ads_scanned += 1
+            # Images of ads deleted longer ago than the grace period are fair game
+            if ad.get('status') == 'deleted' and ad.get('updatedAt', '') < grace_cutoff_iso:
+                continue
+            image_urls = ad.get('imageUrls') or []
+            if isinstance(image_urls, str):
+                image_urls = [image_urls]
+            for url in list(image_urls) + [ad.get('userProfileImage')]:
+                key = image_key(url)
+                if key:
+                    referenced.add(key)
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return referenced, ads_scanned
+
+
+def _delete_batch(s3_client, keys, stats):
+    response = s3_client.delete_objects(
+        Bucket=S3_BUCKET,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+    )
+    for error in response.get('Errors', []):
+        stats['errors'].append(f"{error.get('Key')}: {error.get('Code')}")
+    stats['objectsDeleted'] += len(keys) - len(response.get('Errors', []))
+
+
+def sweep(dry_run=False, grace_hours=GRACE_HOURS):
+    s3_client = aws_clients.get_s3()
+    now = datetime.now(timezone.utc)
+    grace_cutoff = now - timedelta(hours=grace_hours)
+
+    # Build the whole reference set first: a partial scan must never lead to deletes
+    referenced, ads_scanned = referenced_keys(grace_cutoff.replace(tzinfo=None).isoformat())
+
+    stats = {
+        'dryRun': dry_run,
+        'graceHours': grace_hours,
+        'adsScanned': ads_scanned,
+        'referencedKeys': referenced.count,
+        'filterBytes': len(referenced.bits),
+        'estimatedFalsePositiveRate': round(referenced.estimated_false_positive_rate(), 6),
+        'objectsListed': 0,
+        'orphansFound': 0,
+        'orphanBytes': 0,
+        'tooRecent': 0,
+        'objectsDeleted': 0,
+        'sampleOrphans': [],
+        'errors': []
+    }
+
+    pending = []
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=S3_BUCKET, Prefix=SWEEP_PREFIX):
+        for obj in page.get('Contents', []):
+            stats['objectsListed'] += 1
+            key = obj['Key']
+            if key in referenced:
+                continue
+            last_modified = obj['LastModified']
+            if last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            if last_modified > grace_cutoff:
+                stats['tooRecent'] += 1
+                continue
+
+            stats['orphansFound'] += 1
+            stats['orphanBytes'] += obj.get('Size', 0)
+            if len(stats['sampleOrphans']) < SAMPLE_SIZE:
+                stats['sampleOrphans'].append(key)
+            if not dry_run:
+                pending.append(key)
+                if len(pending) == DELETE_BATCH_SIZE:
+                    _delete_batch(s3_client, pending, stats)
+                    pending = []
+
+    if pending:
+        _delete_batch(s3_client, pending, stats)
+
+    logger.info('Orphan sweep completed', **{key: value for key, value in stats.items()
+                                             if key not in ('sampleOrphans', 'errors')},
+                errorCount=len(stats['errors']))
+    return stats
+
+
+def lambda_handler(event, context):
+    """
+    orphanSweeper Lambda Function
+    Deletes S3 uploads under ads/ that no ad references once they are older
+    than ORPHAN_GRACE_HOURS. Pass {"dryRun": true} to only report.
+    """
+    logger.bind(event, context)
+
+    dry_run = bool((event or {}).get('dryRun')) or os.environ.get('ORPHAN_SWEEP_DRY_RUN') == '1'
+    try:
+        stats = sweep(dry_run=dry_run)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'success': True, **stats, 'timestamp': datetime.utcnow().isoformat()})
+        }
+    except Exception as e:
+        logger.error('Orphan sweep failed', error=str(e))
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'success': False,
+                'error': f'Orphan sweep failed: {str(e)}',
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Delete S3 uploads that no ad references')
+    parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting')
+    parser.add_argument('--grace-hours', type=float, default=GRACE_HOURS)
+    args = parser.parse_args(argv)
+
+    stats = sweep(dry_run=args.dry_run, grace_hours=args.grace_hours)
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Featured Quality Score Engine
+
+The 7-point score that decides whether an ad is `featured`, kept in one
+place so submitAd and the rescore backfill always agree. Each rule is a
+tier table of (minimum value, points): the highest tier the value reaches
+wins. Changing a weight or threshold here and running rescore_ads.py
+brings existing ads in line.
+
+    score_ad(...)       One ad, plain Python (submitAd; no NumPy needed)
+    score_columns(...)  Whole batches as NumPy arrays (backfill, benchmarks)
+    columns_from_items  Turns a page of DynamoDB items into those arrays
+
+NumPy is only imported by the batch functions, so the submit path does not
+pay for it at cold start; the backfill needs `pip install numpy`.
+"""
+
+from bisect import bisect_right
+
+# (minimum value, points), ascending by minimum
+IMAGE_TIERS = ((1, 1), (2, 2), (3, 3))                # 0-3 points
+DESCRIPTION_TIERS = ((50, 1), (100, 2))               # 0-2 points, by characters
+PROFILE_IMAGE_POINTS = 1
+BUSINESS_INFO_POINTS = 1
+BUSINESS_INFO_FIELDS = ('businessName', 'contactInfo', 'location')
+FEATURED_MIN_SCORE = 5
+MAX_SCORE = IMAGE_TIERS[-1][1] + DESCRIPTION_TIERS[-1][1] + PROFILE_IMAGE_POINTS + BUSINESS_INFO_POINTS
+
+
+def _tier_points(tiers, value):
+    index = bisect_right([minimum for minimum, _ in tiers], value)
+    return tiers[index - 1][1] if index else 0
+
+
+def score_ad(image_count, description_length, has_profile_image, has_business_info):
+    """Return (quality score, featured) for a single ad."""
+    score = (_tier_points(IMAGE_TIERS, image_count)
+             + _tier_points(DESCRIPTION_TIERS, description_length)
+             + (PROFILE_IMAGE_POINTS if has_profile_image else 0)
+             + (BUSINESS_INFO_POINTS if has_business_info else 0))
+    return score, score >= FEATURED_MIN_SCORE
+
+
+def score_item(item):
+    """Score a submit body or a stored ad item."""
+    image_urls = item.get('imageUrls') or []
+    if isinstance(image_urls, str):
+        image_urls = [image_urls]
+    return score_ad(
+        len(image_urls),
+        len(item.get('description') or ''),
+        bool(item.get('userProfileImage')),
+        any(item.get(field) for field in BUSINESS_INFO_FIELDS)
+    )
+
+
+def _np():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError('Batch scoring needs NumPy: pip install numpy') from e
+    return numpy
+
+
+def _tier_points_array(np, tiers, values):
+    minimums = np.array([minimum for minimum, _ in tiers])
+    points = np.array([0] + [points for _, points in tiers], dtype=np.int8)
+    return points[np.searchsorted(minimums, values, side='right')]
+
+
+def score_columns(image_count, description_length, has_profile_image, has_business_info):
+    """
+    Vectorized score_ad over equal-length arrays (one element per ad).
+    Returns (scores as int8 array, featured as bool array).
+    """
+    np = _np()
+    scores = (_tier_points_array(np, IMAGE_TIERS, np.asarray(image_count))
+              + _tier_points_array(np, DESCRIPTION_TIERS, np.asarray(description_length))
+              + np.asarray(has_profile_image, dtype=bool) * np.int8(PROFILE_IMAGE_POINTS)
+              + np.asarray(has_business_info, dtype=bool) * np.int8(BUSINESS_INFO_POINTS))
+    return scores, scores >= FEATURED_MIN_SCORE
+
+
+def columns_from_items(items):
+    """Columnar view of a list of ad items, in the argument order of score_columns."""
+    np = _np()
+    image_count = []
+    description_length = []
+    has_profile_image = []
+    has_business_info = []
+    # One pass over the page; the per-field work stays in plain Python
+    for item in items:
+        get = item.get
+        image_count.append(len(get('imageUrls') or ()))
+        description_length.append(len(get('description') or ''))
+        has_profile_image.append(bool(get('userProfileImage')))
+        has_business_info.append(any(map(get, BUSINESS_INFO_FIELDS)))
+    return (np.array(image_count, dtype=np.int32), np.array(description_length, dtype=np.int32),
+            np.array(has_profile_image, dtype=bool), np.array(has_business_info, dtype=bool))
+
+
+def score_items(items):
+    """Vectorized score_item over a page of ads."""
+    return score_columns(*columns_from_items(items))
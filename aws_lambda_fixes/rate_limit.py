@@ -0,0 +1,245 @@
+"""
+Per-Client Rate Limiting for the Public Feed
+
+An anonymous getAds call costs a scan plus up to 100 view-count writes, so
+one scraper looping on the feed can use up table capacity meant for
+everyone else. check() rate-limits each client with a token bucket and
+tells the handler how far to degrade:
+
+    allow      full response
+    skipViews  full response, but no view-count writes
+    cached     only what can be served without a scan (recent response or
+               the feed snapshot), otherwise reject
+    reject     429 with Retry-After
+
+Clients are keyed by the authorizer's user id when API Gateway has one,
+otherwise by source IP. Each client spends one token per request; the bucket
+holds RATE_LIMIT_BURST tokens and refills at RATE_LIMIT_PER_MINUTE. Once it
+is empty the client goes into debt, and every RATE_LIMIT_STAGE_REQUESTS
+requests of debt moves it one stage further. Rejected requests cost nothing,
+so a client that slows down to the refill rate recovers on its own.
+
+Buckets live in the container, so most decisions cost no I/O. A scraper
+spread across many containers is caught by a shared per-minute counter in
+RATE_LIMIT_TABLE: every RATE_LIMIT_SYNC_SECONDS a container adds its
+unsynced requests for a client (one UpdateItem) and learns the client's
+total across all containers, which is staged the same way against the
+per-minute allowance. Counter errors fail open.
+
+Handlers with a different cost can keep their own buckets with
+RateLimiter(per_minute=..., burst=..., scope=...); the scope keeps their
+shared counters apart from the feed's, and check(event, strict=True) skips
+the degradation stages for them: past the allowance a request is rejected
+without spending a token.
+
+Decisions are counted per container and written every
+RATE_LIMIT_METRICS_SECONDS as a CloudWatch Embedded Metric Format record
+(RateLimitAllow, RateLimitSkipViews, RateLimitCached, RateLimitReject,
+RateLimitSyncErrors), so they show up as metrics without PutMetricData calls.
+
+Environment variables:
+    RATE_LIMIT_ENABLED          Set to false to allow everything (default true)
+    RATE_LIMIT_TABLE            Shared counter table (default BusinessAdRateLimits)
+    RATE_LIMIT_PER_MINUTE       Sustained requests per client per minute (default 60)
+    RATE_LIMIT_BURST            Bucket size (default 30)
+    RATE_LIMIT_STAGE_REQUESTS   Requests of debt per degradation stage (default 10)
+    RATE_LIMIT_SYNC_SECONDS     Shared counter sync interval per client (default 5)
+    RATE_LIMIT_MAX_CLIENTS      Buckets kept per container (default 10000)
+    RATE_LIMIT_METRICS_SECONDS  Metric flush interval (default 60)
+    RATE_LIMIT_NAMESPACE        CloudWatch namespace (default BusinessAds)
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+import aws_clients
+from ad_logger import get_logger
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE', 'BusinessAdRateLimits')
+PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 60))
+BURST = float(os.environ.get('RATE_LIMIT_BURST', 30))
+STAGE_REQUESTS = float(os.environ.get('RATE_LIMIT_STAGE_REQUESTS', 10))
+SYNC_SECONDS = float(os.environ.get('RATE_LIMIT_SYNC_SECONDS', 5))
+MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+METRICS_SECONDS = float(os.environ.get('RATE_LIMIT_METRICS_SECONDS', 60))
+NAMESPACE = os.environ.get('RATE_LIMIT_NAMESPACE', 'BusinessAds')
+
+ALLOW = 'allow'
+SKIP_VIEWS = 'skipViews'
+CACHED = 'cached'
+REJECT = 'reject'
+STAGES = (ALLOW, SKIP_VIEWS, CACHED, REJECT)
+
+_METRIC_NAMES = {
+    ALLOW: 'RateLimitAllow',
+    SKIP_VIEWS: 'RateLimitSkipViews',
+    CACHED: 'RateLimitCached',
+    REJECT: 'RateLimitReject',
+    'syncErrors': 'RateLimitSyncErrors'
+}
+
+Decision = namedtuple('Decision', 'stage client retry_after')
+
+logger = get_logger('rateLimit')
+
+
+def client_key(event):
+    """`user#{id}` for authorized callers, otherwise `ip#{source ip}`."""
+    request_context = (event or {}).get('requestContext') or {}
+    authorizer = request_context.get('authorizer') or {}
+    user_id = (authorizer.get('claims') or {}).get('sub') or authorizer.get('principalId')
+    if user_id:
+        return f"user#{user_id}"
+    return f"ip#{(request_context.get('identity') or {}).get('sourceIp') or 'unknown'}"
+
+
+def stage_for(excess):
+    """Stage for a client `excess` requests past its allowance."""
+    if excess <= 0:
+        return ALLOW
+    return STAGES[min(len(STAGES) - 1, math.ceil(excess / STAGE_REQUESTS))]
+
+
+class _Client:
+    __slots__ = ('tokens', 'refilled', 'unsynced', 'synced', 'window', 'shared_stage', 'stage')
+
+    def __init__(self, now, burst):
+        self.tokens = burst
+        self.refilled = now
+        self.unsynced = 0
+        self.synced = now
+        self.window = None
+        self.shared_stage = ALLOW
+        self.stage = ALLOW
+
+
+class RateLimiter:
+    """Container-wide token buckets with a periodically synced shared counter."""
+
+    def __init__(self, per_minute=None, burst=None, scope=''):
+        self.per_minute = PER_MINUTE if per_minute is None else per_minute
+        self.burst = BURST if burst is None else burst
+        self.scope = scope  # Prefix for shared counter keys
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self._pending = Counter()
+        self._flushed = time.monotonic()
+
+    def check(self, event, strict=False):
+        """
+        Stage this request for its client. With strict=True there is no
+        degradation: anything past the allowance is rejected, costs nothing,
+        and Retry-After is when the next token (or shared window) is due.
+        """
+        client = client_key(event)
+        if not RATE_LIMIT_ENABLED:
+            return Decision(ALLOW, client, None)
+
+        now = time.monotonic()
+        rate = self.per_minute / 60.0
+        with self._lock:
+            state = self._clients.get(client)
+            if state is None:
+                state = self._clients[client] = _Client(now, self.burst)
+                while len(self._clients) > MAX_CLIENTS:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+                state.tokens = min(self.burst, state.tokens + (now - state.refilled) * rate)
+                state.refilled = now
+                if state.window is not None and state.window != int(time.time() // 60):
+                    state.window, state.shared_stage = None, ALLOW
+
+            local_stage = stage_for(1 - state.tokens)
+            stage = max(local_stage, state.shared_stage, key=STAGES.index)
+            retry_after = None
+            if strict and stage != ALLOW:
+                stage = REJECT
+                wait = (1 - state.tokens) / rate if state.tokens < 1 else 0
+                if state.shared_stage != ALLOW:
+                    wait = max(wait, 60 - time.time() % 60)
+                retry_after = max(1, math.ceil(wait))
+            elif stage == REJECT:
+                # Seconds until the bucket is back inside the cached stage
+                retry_after = max(1, math.ceil((1 - state.tokens - 2 * STAGE_REQUESTS) / rate))
+            else:
+                state.tokens -= 1
+                state.unsynced += 1
+            sync_due = state.unsynced and now - state.synced >= SYNC_SECONDS
+            if sync_due:
+                unsynced, state.unsynced, state.synced = state.unsynced, 0, now
+            escalated, state.stage = state.stage == ALLOW and stage != ALLOW, stage
+
+        if sync_due:
+            self._sync(client, state, unsynced)
+        if escalated:
+            logger.warning('Client rate limited', client=client, stage=stage, retryAfter=retry_after)
+        self._count(stage)
+        return Decision(stage, client, retry_after)
+
+    def _sync(self, client, state, unsynced):
+        """Add this container's requests to the shared per-minute counter."""
+        window = int(time.time() // 60)
+        try:
+            response = aws_clients.get_table(RATE_LIMIT_TABLE).update_item(
+                Key={'id': f"{self.scope}{client}#{window}"},
+                UpdateExpression='ADD requests :count SET #ttl = :ttl',
+                ExpressionAttributeNames={'#ttl': 'ttl'},
+                ExpressionAttributeValues={':count': unsynced, ':ttl': (window + 2) * 60},
+                ReturnValues='UPDATED_NEW'
+            )
+            total = int(response['Attributes']['requests'])
+        except Exception as e:
+            self._count('syncErrors')
+            logger.warning('Rate limit counter sync failed', client=client, error=str(e))
+            return
+        with self._lock:
+            state.window = window
+            state.shared_stage = stage_for(total - self.per_minute - self.burst)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+            self._pending[name] += 1
+            due = time.monotonic() - self._flushed >= METRICS_SECONDS
+        if due:
+            self.flush_metrics()
+
+    def flush_metrics(self, stream=None):
+        """Write pending decision counts as one Embedded Metric Format record."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['Function']],
+                    'Metrics': [{'Name': metric, 'Unit': 'Count'} for metric in _METRIC_NAMES.values()]
+                }]
+            },
+            'Function': os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'getAds')
+        }
+        for name, metric in _METRIC_NAMES.items():
+            record[metric] = pending.get(name, 0)
+        (stream or sys.stdout).write(json.dumps(record) + '\n')
+
+    def reset(self):
+        with self._lock:
+            self._clients.clear()
+            self.stats.clear()
+            self._pending.clear()
+
+
+# Shared by every handler imported into the same container
+limiter = RateLimiter()
@@ -0,0 +1,121 @@
+"""
+Featured Flag Backfill - Re-score Every Ad
+
+Streams BusinessAds page by page (projecting only the fields the score
+reads), scores each page at once with quality_score.score_items and writes
+`featured` back only for ads whose flag changed. Run it after changing a
+weight or threshold in quality_score.py. Deleted ads are skipped.
+
+Updates are conditional on the flag still holding the value that was read,
+so an ad changed mid-run is left for the next run. When anything changed,
+the home feed snapshot is rebuilt so featured-first ordering follows.
+Pass --segments N to split the scan into N parallel segments.
+
+Usage:
+    python aws_lambda_fixes/rescore_ads.py --dry-run
+    python aws_lambda_fixes/rescore_ads.py --segments 4
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+import feed_snapshot
+from ad_logger import get_logger
+from ad_sync import sync_fields
+from quality_score import BUSINESS_INFO_FIELDS, score_items
+
+logger = get_logger('rescoreAds')
+
+# Every attribute goes through a placeholder: `location` is a DynamoDB reserved word
+PROJECTION_FIELDS = ('id', 'featured', 'imageUrls', 'description', 'userProfileImage') + BUSINESS_INFO_FIELDS
+PROJECTION = ', '.join(f"#f{index}" for index in range(len(PROJECTION_FIELDS)))
+PROJECTION_NAMES = {f"#f{index}": field for index, field in enumerate(PROJECTION_FIELDS)}
+
+
+def rescore_segment(segment=None, total_segments=None, dry_run=False):
+    table = aws_clients.get_table()
+    scan_params = {
+        'ProjectionExpression': PROJECTION,
+        'FilterExpression': '#status <> :deleted',
+        'ExpressionAttributeNames': {'#status': 'status', **PROJECTION_NAMES},
+        'ExpressionAttributeValues': {':deleted': 'deleted'}
+    }
+    if total_segments:
+        scan_params.update(Segment=segment, TotalSegments=total_segments)
+    stats = {'adsScanned': 0, 'flagsChanged': 0, 'nowFeatured': 0, 'adsSkipped': 0}
+
+    while True:
+        response = table.scan(**scan_params)
+        items = response.get('Items', [])
+        stats['adsScanned'] += len(items)
+
+        if items:
+            _, featured = score_items(items)
+            for item, is_featured in zip(items, featured.tolist()):
+                if bool(item.get('featured', False)) == is_featured:
+                    continue
+                if not dry_run:
+                    sync = sync_fields(datetime.utcnow().isoformat())
+                    try:
+                        table.update_item(
+                            Key={'id': item['id']},
+                            # updatedAt/syncDay so delta-syncing clients pick up the new flag
+                            UpdateExpression='SET featured = :featured, updatedAt = :updated_at, syncDay = :sync_day',
+                            ConditionExpression='attribute_exists(id) AND '
+                                                '(featured = :previous OR attribute_not_exists(featured))',
+                            ExpressionAttributeValues={':featured': is_featured,
+                                                       ':previous': bool(item.get('featured', False)),
+                                                       ':updated_at': sync['updatedAt'],
+                                                       ':sync_day': sync['syncDay']}
+                        )
+                    except ClientError as e:
+                        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                            raise
+                        stats['adsSkipped'] += 1
+                        logger.warning('Ad changed during rescore, skipped', adId=item['id'])
+                        continue
+                stats['flagsChanged'] += 1
+                stats['nowFeatured'] += int(is_featured)
+
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return stats
+
+
+def rescore(dry_run=False, segments=1):
+    if segments > 1:
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            results = list(pool.map(lambda segment: rescore_segment(segment, segments, dry_run),
+                                    range(segments)))
+    else:
+        results = [rescore_segment(dry_run=dry_run)]
+
+    stats = {key: sum(result[key] for result in results) for key in results[0]}
+    if stats['flagsChanged'] and not dry_run:
+        feed_snapshot.rebuild()
+
+    logger.info('Rescore finished', dryRun=dry_run, segments=segments, **stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-score every ad and update changed featured flags')
+    parser.add_argument('--dry-run', action='store_true', help='Count flags that would change without writing')
+    parser.add_argument('--segments', type=int, default=1, help='Parallel scan segments (default 1)')
+    args = parser.parse_args(argv)
+
+    stats = rescore(dry_run=args.dry_run, segments=max(args.segments, 1))
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+
+import aws_clients
+from ad_logger import get_logger
+
+import comments_lambda
+import deleteBusinessAd_lambda
+import exportAds_lambda
+import generatePresignedUrl_lambda
+import getAdById_lambda
+import getAds_lambda
+import likeAd_lambda
+import submitAd_lambda
+
+logger = get_logger('adApiRouter')
+aws_clients.warm(s3=True)
+
+# (method, resource path) -> handler. The per-function modules keep their
+# own lambda_handler entry points, so each can still be deployed alone.
+ROUTES = {
+    ('GET', '/ads'): getAds_lambda.lambda_handler,
+    ('GET', '/ads/by-id'): getAdById_lambda.lambda_handler,
+    ('GET', '/ads/export'): exportAds_lambda.lambda_handler,
+    ('POST', '/'): submitAd_lambda.lambda_handler,
+    ('DELETE', '/'): deleteBusinessAd_lambda.lambda_handler,
+    ('GET', '/presigned-url'): generatePresignedUrl_lambda.lambda_handler,
+    ('POST', '/likes'): likeAd_lambda.lambda_handler,
+    ('DELETE', '/likes'): likeAd_lambda.lambda_handler,
+    ('GET', '/comments'): comments_lambda.lambda_handler,
+    ('POST', '/comments'): comments_lambda.lambda_handler,
+}
+
+
+def _methods_for(path):
+    return sorted(method for method, route_path in ROUTES if route_path == path)
+
+
+def resolve_route(event):
+    """
+    Extract (method, path) from a REST API (v1) or HTTP API (v2) proxy event.
+    The resource template is preferred over the raw path so stage prefixes
+    and path parameters do not affect matching.
+    """
+    request_context = event.get('requestContext') or {}
+    http = request_context.get('http') or {}
+
+    method = (event.get('httpMethod') or http.get('method') or '').upper()
+    path = event.get('resource') or event.get('rawPath') or event.get('path') or '/'
+
+    stage = request_context.get('stage')
+    if stage and stage != '$default' and path.startswith(f"/{stage}/"):
+        path = path[len(stage) + 1:]
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+
+    return method, path
+
+
+def normalize_event(event, method, path):
+    """
+    Return the event in REST API (v1) shape for the routed handlers, which
+    read `httpMethod`, `path`, `queryStringParameters` and
+    `requestContext.identity.sourceIp`. HTTP API (v2) events carry these
+    under `requestContext.http` and `rawPath` instead, so they are copied
+    across; v1 events pass through unchanged.
+    """
+    if event.get('httpMethod'):
+        return event
+    request_context = dict(event.get('requestContext') or {})
+    http = request_context.get('http') or {}
+    identity = dict(request_context.get('identity') or {})
+    identity.setdefault('sourceIp', http.get('sourceIp'))
+    request_context['identity'] = identity
+    request_context.setdefault('httpMethod', method)
+    authorizer = request_context.get('authorizer') or {}
+    jwt_claims = (authorizer.get('jwt') or {}).get('claims')
+    if jwt_claims and 'claims' not in authorizer:
+        request_context['authorizer'] = {**authorizer, 'claims': jwt_claims}
+    return {
+        **event,
+        'httpMethod': method,
+        'path': path,
+        'resource': path,
+        'queryStringParameters': event.get('queryStringParameters') or None,
+        'requestContext': request_context
+    }
+
+
+def lambda_handler(event, context):
+    """
+    Ad API Router Lambda Function
+    Single entry point for every ad API endpoint so all routes share one pool
+    of warm containers, AWS clients and per-container caches. Dispatches by
+    method and path to the existing handlers and answers CORS preflights
+    directly, without touching any AWS client.
+    """
+    method, path = resolve_route(event)
+    allowed = _methods_for(path)
+
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200 if allowed else 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+                'Access-Control-Allow-Methods': ','.join(allowed + ['OPTIONS'])
+            },
+            'body': ''
+        }
+
+    logger.bind(event, context)
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        logger.debug('Dispatching request', method=method, path=path)
+        return handler(normalize_event(event, method, path), context)
+
+    logger.warning('No route for request', method=method, path=path)
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+        'Access-Control-Allow-Methods': ','.join(allowed + ['OPTIONS'])
+    }
+    if allowed:
+        headers['Allow'] = ','.join(allowed + ['OPTIONS'])
+    return {
+        'statusCode': 405 if allowed else 404,
+        'headers': headers,
+        'body': json.dumps({
+            'success': False,
+            'error': f'Method {method} not allowed on {path}' if allowed else f'No route for {method} {path}',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    }
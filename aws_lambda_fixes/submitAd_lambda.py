@@ -1,18 +1,25 @@
 import json
-import boto3
-import uuid
 from datetime import datetime, timedelta
-from decimal import Decimal
+
+import aws_clients
+import feed_snapshot
+from ad_logger import get_logger
+from ad_sync import sync_day
+from image_verify import verify_images
+from quality_score import score_item
+
+logger = get_logger('submitAd')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, feed_snapshot.FEED_TABLE), s3=True)
 
 def lambda_handler(event, context):
     """
     Enhanced submitAd Lambda Function with TTL Support - Version 2.2
     Creates business ads in DynamoDB with 30-day automatic expiration
     """
+    logger.bind(event, context)
     
-    # Initialize DynamoDB
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('BusinessAds')
+    # Shared DynamoDB table (created during the init phase)
+    table = aws_clients.get_table()
     
     # Configuration
     CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
@@ -28,7 +35,7 @@ def lambda_handler(event, context):
         else:
             body = event
         
-        print(f"📥 Submit request: {json.dumps(body, default=str)}")
+        logger.debug_payload('Submit request', body=lambda: body)
         
         # Validate required fields
         required_fields = ['title', 'description', 'imageUrls', 'userName']
@@ -49,7 +56,8 @@ def lambda_handler(event, context):
                     })
                 }
         
-        # Generate unique ad ID
+        # Generate unique ad ID (uuid is only needed on the create path)
+        import uuid
         ad_id = str(uuid.uuid4())
         
         # Auto-generate userId from userName if not provided
@@ -79,35 +87,34 @@ def lambda_handler(event, context):
             
             normalized_urls.append(normalized_url)
         
-        # Calculate quality score for featured determination (7-point system)
-        quality_score = 0
+        # Confirm the uploads exist (concurrent S3 HEADs within a time budget)
+        images, missing_images, unverified_images = verify_images(normalized_urls)
+        if missing_images:
+            logger.warning('Rejected ad with missing images', missing=missing_images)
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+                    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'Images not found: upload them before submitting the ad',
+                    'missingImages': missing_images,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+            }
+        if unverified_images:
+            logger.warning('Some images could not be verified', unverified=unverified_images)
         
-        # Image quality (0-3 points)
+        # Calculate quality score for featured determination (7-point system)
         image_count = len(normalized_urls)
-        if image_count >= 3:
-            quality_score += 3
-        elif image_count == 2:
-            quality_score += 2
-        elif image_count == 1:
-            quality_score += 1
-        
-        # Description quality (0-2 points)
         description = body['description']
-        if len(description) >= 100:
-            quality_score += 2
-        elif len(description) >= 50:
-            quality_score += 1
+        quality_score, is_featured = score_item({**body, 'imageUrls': normalized_urls})
         
-        # User profile completeness (0-2 points)
-        if body.get('userProfileImage'):
-            quality_score += 1
-        if body.get('businessName') or body.get('contactInfo') or body.get('location'):
-            quality_score += 1
-        
-        # Determine if featured (score >= 5 out of 7)
-        is_featured = quality_score >= 5
-        
-        print(f"📊 Quality score: {quality_score}/7, Featured: {is_featured}")
+        logger.debug('Quality score', qualityScore=quality_score, featured=is_featured)
         
         # Create timestamps
         current_time = datetime.utcnow()
@@ -118,7 +125,6 @@ def lambda_handler(event, context):
         expiration_timestamp = int(expiration_date.timestamp())  # Unix timestamp for DynamoDB TTL
         expiration_iso = expiration_date.isoformat()
         
-        print(f"⏰ Ad will expire on: {expiration_iso} (TTL: {expiration_timestamp})")
         
         # Build the ad item with TTL support
         ad_item = {
@@ -130,6 +136,7 @@ def lambda_handler(event, context):
             'userId': user_id,
             'createdAt': current_time_iso,
             'updatedAt': current_time_iso,
+            'syncDay': sync_day(current_time_iso),  # Delta-sync index partition
             'expiresAt': expiration_iso,  # Human-readable expiration
             'ttl': expiration_timestamp,  # DynamoDB TTL attribute (Unix timestamp)
             'status': 'active',
@@ -137,22 +144,29 @@ def lambda_handler(event, context):
             'imageCount': image_count,
             'likes': 0,
             'viewCount': 0,
-            'comments': []
+            'commentCount': 0  # Comments live in BusinessAdComments
         }
         
+        # Per-image size, content type and dimensions so clients can reserve layout space
+        if images:
+            ad_item['images'] = images
+        
         # Add optional fields if provided
         optional_fields = ['userProfileImage', 'businessName', 'contactInfo', 'location', 'category']
         for field in optional_fields:
             if body.get(field):
                 ad_item[field] = body[field]
         
-        print(f"💾 Saving ad item with TTL: {json.dumps(ad_item, default=str)}")
+        logger.debug_payload('Saving ad item', item=lambda: ad_item)
         
         # Save to DynamoDB
         table.put_item(Item=ad_item)
         
-        print(f"✅ Ad created successfully: {ad_id}")
-        print(f"⏰ Automatic deletion scheduled for: {expiration_iso}")
+        # Place the new ad in the materialized home feed
+        feed_snapshot.add_ad(ad_item)
+        
+        logger.info('Ad created', adId=ad_id, featured=is_featured,
+                    imageCount=image_count, expiresAt=expiration_iso)
         
         # Return success response with TTL information
         return {
@@ -171,6 +185,8 @@ def lambda_handler(event, context):
                 'userName': user_name,
                 'userId': user_id,
                 'imageCount': image_count,
+                'images': images,
+                'unverifiedImages': len(unverified_images),
                 'createdAt': current_time_iso,
                 'expiresAt': expiration_iso,
                 'ttlDays': TTL_DAYS
@@ -178,7 +194,7 @@ def lambda_handler(event, context):
         }
         
     except Exception as e:
-        print(f"❌ Error creating ad: {str(e)}")
+        logger.error('Error creating ad', error=str(e))
         return {
             'statusCode': 500,
             'headers': {
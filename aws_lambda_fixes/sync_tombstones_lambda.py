@@ -0,0 +1,121 @@
+"""
+Removals from the BusinessAds Stream: Tombstones, Archive and Cleanup
+
+Triggered by the BusinessAds DynamoDB stream. Every REMOVE record is handled
+here, whoever made it: hard deletes, TTL cleanup and native DynamoDB TTL
+expiry alike. Native TTL deletes have no handler of their own; their stream
+records carry `userIdentity` {type: Service, principalId:
+dynamodb.amazonaws.com}. For each batch this function
+
+1. archives the removed items' old images (ad_archive), one file per
+   dataset per batch: `expired` for TTL removals, `deleted` for the rest.
+   With a large BatchSize and batching window on the event source mapping
+   that is a few big files an hour instead of one tiny file per delete.
+2. writes a delta-sync tombstone per removed id (ad_sync.record_tombstones).
+3. deletes each removed ad's comments (BusinessAdComments) and like
+   records and counter shards (BusinessAdLikes), which nothing reads once
+   the ad is gone.
+
+Reasons recorded:
+    ttl-expired   native TTL delete, or an item whose `ttl` had passed (TTL cleanup)
+    hard-delete   any other removal
+
+The stream must use the NEW_AND_OLD_IMAGES (or OLD_IMAGE) view type: the old
+image is what gets archived, and it tells TTL cleanup deletes apart from
+hard deletes. A failed write raises, so Lambda retries the batch; a retried
+removal may be archived or tombstoned twice, which readers handle by
+deduplicating on id, and deleting comments and likes again is a no-op.
+"""
+
+import json
+import time
+from collections import defaultdict
+
+from boto3.dynamodb.types import TypeDeserializer
+
+import ad_archive
+import aws_clients
+from ad_logger import get_logger
+from ad_sync import TOMBSTONE_TABLE, record_tombstones
+from comments_lambda import COMMENTS_TABLE, delete_ad_comments
+from likeAd_lambda import LIKES_TABLE, delete_ad_likes
+
+TTL_PRINCIPAL = 'dynamodb.amazonaws.com'
+ARCHIVE_DATASETS = {'ttl-expired': 'expired', 'hard-delete': 'deleted'}
+
+logger = get_logger('syncTombstones')
+aws_clients.warm(tables=(TOMBSTONE_TABLE, COMMENTS_TABLE, LIKES_TABLE), s3=True)
+
+_deserializer = TypeDeserializer()
+
+
+def is_ttl_delete(record):
+    identity = record.get('userIdentity') or {}
+    return identity.get('type') == 'Service' and identity.get('principalId') == TTL_PRINCIPAL
+
+
+def removal_reason(record):
+    if is_ttl_delete(record):
+        return 'ttl-expired'
+    ttl = ((record['dynamodb'].get('OldImage') or {}).get('ttl') or {}).get('N')
+    removed_at = record['dynamodb'].get('ApproximateCreationDateTime', time.time())
+    if ttl is not None and float(ttl) <= float(removed_at):
+        return 'ttl-expired'
+    return 'hard-delete'
+
+
+def old_item(record):
+    """The removed item as a plain dict, or None when the stream carries keys only."""
+    image = record['dynamodb'].get('OldImage')
+    if not image:
+        return None
+    return {name: _deserializer.deserialize(value) for name, value in image.items()}
+
+
+def lambda_handler(event, context):
+    """
+    syncTombstones Lambda Function
+    Archives and tombstones every REMOVE record in a BusinessAds stream
+    batch and deletes the removed ads' comments and likes; INSERT and
+    MODIFY records are already in the sync index and the live archive export.
+    """
+    logger.bind(event, context)
+
+    removed = defaultdict(list)
+    archived = defaultdict(list)
+    keys_only = 0
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'REMOVE':
+            continue
+        reason = removal_reason(record)
+        removed[reason].append(record['dynamodb']['Keys']['id']['S'])
+        item = old_item(record)
+        if item is None:
+            keys_only += 1
+        else:
+            archived[reason].append(item)
+
+    # Archive first: a failure retries the batch before any tombstone exists
+    archive_files = []
+    for reason, items in archived.items():
+        archive_files += ad_archive.archive_items(ARCHIVE_DATASETS[reason], items, reason)
+    if keys_only:
+        logger.warning('Stream records without OldImage were not archived', count=keys_only)
+
+    for reason, ad_ids in removed.items():
+        record_tombstones(ad_ids, reason)
+
+    comments_deleted = 0
+    likes_deleted = 0
+    for ad_ids in removed.values():
+        for ad_id in ad_ids:
+            comments_deleted += delete_ad_comments(ad_id)
+            likes_deleted += delete_ad_likes(ad_id)
+
+    counts = {reason: len(ad_ids) for reason, ad_ids in removed.items()}
+    logger.info('Removals recorded', records=len(event.get('Records', [])), archiveFiles=len(archive_files),
+                commentsDeleted=comments_deleted, likesDeleted=likes_deleted, **counts)
+    return {'statusCode': 200, 'body': json.dumps({'success': True, 'tombstones': counts,
+                                                   'archive_files': archive_files,
+                                                   'comments_deleted': comments_deleted,
+                                                   'likes_deleted': likes_deleted})}
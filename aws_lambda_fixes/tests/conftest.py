@@ -0,0 +1,30 @@
+"""
+Shared fixtures: handlers run against the in-memory DynamoDB/S3 fakes from
+benchmarks/fake_aws.py, seeded the same way as the benchmarks.
+"""
+
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'benchmarks'))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from fake_aws import FakeAWS  # noqa: E402
+from run_benchmarks import seed_table  # noqa: E402
+
+
+@pytest.fixture
+def aws():
+    with FakeAWS() as fake:
+        seed_table(fake, 200, seed=7)
+        yield fake
+
+
+@pytest.fixture
+def active_ad_id(aws):
+    table = aws.dynamodb.Table('BusinessAds')
+    return next(item['id'] for item in table._items.values() if item.get('status') == 'active')
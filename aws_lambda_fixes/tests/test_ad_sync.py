@@ -0,0 +1,102 @@
+"""Delta sync: deletions page with the changes; the stream tombstones removals and cleans up after them."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def sync(aws, monkeypatch):
+    import ad_sync
+
+    monkeypatch.setattr(ad_sync, 'SYNC_LAG_SECONDS', 0)
+    return ad_sync
+
+
+def remove_record(ad_id, user_identity=None, ttl=None):
+    record = {
+        'eventName': 'REMOVE',
+        'dynamodb': {'Keys': {'id': {'S': ad_id}}, 'ApproximateCreationDateTime': datetime.utcnow().timestamp()}
+    }
+    if ttl is not None:
+        record['dynamodb']['OldImage'] = {'id': {'S': ad_id}, 'ttl': {'N': str(ttl)}}
+    if user_identity:
+        record['userIdentity'] = user_identity
+    return record
+
+
+def tombstones(aws):
+    return {item['adId']: item['reason'] for item in aws.dynamodb.Table('BusinessAdTombstones')._items.values()}
+
+
+def test_stream_writes_tombstones_for_every_removal(aws):
+    import sync_tombstones_lambda
+
+    expired = int(datetime.utcnow().timestamp()) - 60
+    event = {'Records': [
+        remove_record('ad-native-ttl', {'type': 'Service', 'principalId': 'dynamodb.amazonaws.com'}),
+        remove_record('ad-cleanup', ttl=expired),
+        remove_record('ad-hard', ttl=expired + 86400 * 30),
+        {'eventName': 'MODIFY', 'dynamodb': {'Keys': {'id': {'S': 'ad-modified'}}}}
+    ]}
+    sync_tombstones_lambda.lambda_handler(event, None)
+    assert tombstones(aws) == {'ad-native-ttl': 'ttl-expired', 'ad-cleanup': 'ttl-expired',
+                               'ad-hard': 'hard-delete'}
+
+
+def test_deletions_count_toward_max_changes_and_page(aws, sync):
+    since = (datetime.utcnow() - timedelta(seconds=1)).isoformat()
+    removed = [f"ad-gone-{n:03d}" for n in range(25)]
+    sync.record_tombstones(removed, 'ttl-expired')
+
+    seen, pages = [], 0
+    while True:
+        page = sync.changes_since(since, max_changes=10)
+        pages += 1
+        assert len(page['ads']) + len(page['deletedIds']) <= 10
+        seen.extend(page['deletedIds'])
+        if not page['hasMore']:
+            break
+        since = page['watermark']
+    assert pages == 3 and set(seen) == set(removed)
+
+
+def test_changes_and_deletions_merge_in_time_order(aws, sync, active_ad_id):
+    since = (datetime.utcnow() - timedelta(seconds=1)).isoformat()
+    sync.record_tombstones(['ad-gone-early'], 'hard-delete')
+    ads = aws.dynamodb.Table('BusinessAds')
+    ads._items[(active_ad_id,)].update(sync.sync_fields(datetime.utcnow().isoformat()))
+    sync.record_tombstones(['ad-gone-late'], 'hard-delete')
+
+    first = sync.changes_since(since, max_changes=2)
+    assert first['hasMore'] and first['deletedIds'] == ['ad-gone-early']
+    assert [ad['id'] for ad in first['ads']] == [active_ad_id]
+    second = sync.changes_since(first['watermark'], max_changes=2)
+    assert 'ad-gone-late' in second['deletedIds'] and not second['hasMore']
+
+
+def test_stream_removes_comments_and_likes_of_removed_ads(aws, active_ad_id):
+    import comments_lambda
+    import likeAd_lambda
+    import sync_tombstones_lambda
+
+    ads = aws.dynamodb.Table('BusinessAds').enable_stream()
+    other_id = next(key[0] for key in ads._items if key[0] != active_ad_id)
+    for ad_id in (active_ad_id, other_id):
+        for user in ('user-1', 'user-2'):
+            assert likeAd_lambda.set_like_state(ad_id, user, True)
+            comments_lambda.aws_clients.get_table(comments_lambda.COMMENTS_TABLE).put_item(Item={
+                'adId': ad_id, 'commentId': comments_lambda.comment_sort_key('2026-01-01T00:00:00', user),
+                'text': 'Nice', 'userId': user})
+    likeAd_lambda.mark_dirty(active_ad_id)
+
+    ads.delete_item(Key={'id': active_ad_id})
+    body = json.loads(sync_tombstones_lambda.lambda_handler(ads.drain_stream(), None)['body'])
+    assert body['comments_deleted'] == 2 and body['likes_deleted'] >= 3  # two records and their shards
+
+    comments = aws.dynamodb.Table('BusinessAdComments')._items.values()
+    assert {item['adId'] for item in comments} == {other_id}
+    likes = aws.dynamodb.Table('BusinessAdLikes')._items.values()
+    assert not [item for item in likes if item.get('adId') == active_ad_id]
+    assert [item for item in likes if item.get('adId') == other_id]
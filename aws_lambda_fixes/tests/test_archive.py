@@ -0,0 +1,142 @@
+"""Archive fallback layout and export pacing."""
+
+import pytest
+
+
+def archive_keys(aws):
+    import ad_archive
+
+    return sorted(key for bucket, key in aws.s3.objects if bucket == ad_archive.ARCHIVE_BUCKET)
+
+
+def test_jsonl_fallback_goes_to_separate_dataset(aws, monkeypatch):
+    import ad_archive
+
+    monkeypatch.setattr(ad_archive, '_pyarrow', lambda: None)
+    ad_archive.archive_items('expired', [{'id': 'ad-1', 'title': 'Gone'}], 'ttl')
+    keys = archive_keys(aws)
+    assert len(keys) == 1
+    assert keys[0].startswith('archive/expired-jsonl/dt=') and keys[0].endswith('.jsonl.gz')
+
+
+def test_parquet_stays_in_dataset(aws):
+    pytest.importorskip('pyarrow')
+    import ad_archive
+
+    ad_archive.archive_items('expired', [{'id': 'ad-1', 'title': 'Gone'}], 'ttl')
+    assert archive_keys(aws)[0].startswith('archive/expired/dt=')
+
+
+def test_export_paced_by_read_units(aws, monkeypatch):
+    import archive_export_lambda
+
+    clock, pauses = [0.0], []
+
+    def sleep(seconds):
+        pauses.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(archive_export_lambda, 'READ_UNITS_PER_SECOND', 50.0)
+    monkeypatch.setattr(archive_export_lambda, 'SCAN_PAGE_SIZE', 50)
+    monkeypatch.setattr(archive_export_lambda.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(archive_export_lambda.time, 'sleep', sleep)
+    stats = archive_export_lambda.export_live(full=True)
+    # 200 ads at 0.5 units each, 25 units per page: about half a second per page after the first
+    assert stats['readUnits'] == 100.0
+    assert pauses == [0.5, 0.5, 0.5]
+
+
+def test_stream_archives_removals_in_one_file_per_dataset(aws, monkeypatch):
+    import ad_archive
+    import sync_tombstones_lambda
+
+    monkeypatch.setattr(ad_archive, '_pyarrow', lambda: None)
+    ads = aws.dynamodb.Table('BusinessAds').enable_stream()
+    ad_ids = sorted(key[0] for key in ads._items)
+    for ad_id in ad_ids[:3]:
+        ads.delete_item(Key={'id': ad_id})
+    for ad_id in ad_ids[3:5]:
+        ads._items[(ad_id,)]['ttl'] = 1
+    assert ads.expire_ttl(now=2) >= 2
+
+    sync_tombstones_lambda.lambda_handler(ads.drain_stream(), None)
+    keys = archive_keys(aws)
+    assert len([key for key in keys if key.startswith('archive/deleted-jsonl/')]) == 1
+    assert len([key for key in keys if key.startswith('archive/expired-jsonl/')]) == 1
+    assert len(aws.dynamodb.Table('BusinessAdTombstones')._items) == len(ad_ids) - len(ads._items)
+
+
+class Context:
+    """Lambda context whose remaining time runs out after `pages` pages."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get_remaining_time_in_millis(self):
+        self.pages -= 1
+        return 900000 if self.pages > 0 else 0
+
+
+def exported_ids(aws):
+    import gzip
+    import json
+
+    ids = []
+    for (bucket, key), obj in sorted(aws.s3.objects.items()):
+        if key.startswith('archive/live-jsonl/'):
+            ids += [json.loads(line)['id'] for line in gzip.decompress(obj['Body']).splitlines()]
+    return ids
+
+
+def test_stopped_full_export_resumes_from_last_file(aws, monkeypatch):
+    import ad_archive
+    import archive_export_lambda
+
+    monkeypatch.setattr(ad_archive, '_pyarrow', lambda: None)
+    monkeypatch.setattr(ad_archive, 'ARCHIVE_BATCH_ROWS', 50)
+    monkeypatch.setattr(archive_export_lambda, 'READ_UNITS_PER_SECOND', 0)
+    monkeypatch.setattr(archive_export_lambda, 'SCAN_PAGE_SIZE', 50)
+
+    first = archive_export_lambda.export_live(full=True, context=Context(pages=2))
+    assert not first['complete'] and first['adsExported'] == 100
+    assert archive_export_lambda.load_state()['fullExport']['lastKey']
+
+    second = archive_export_lambda.export_live()  # the scheduled run finishes the full export
+    assert second['full'] and second['complete'] and second['adsExported'] == 100
+    ids = exported_ids(aws)
+    assert len(ids) == len(set(ids)) == 200
+    assert 'fullExport' not in archive_export_lambda.load_state()
+
+
+def test_incremental_export_queries_changed_days(aws, monkeypatch):
+    from datetime import datetime, timedelta
+
+    import ad_archive
+    import archive_export_lambda
+    from ad_sync import sync_fields
+
+    monkeypatch.setattr(ad_archive, '_pyarrow', lambda: None)
+    monkeypatch.setattr(archive_export_lambda, 'READ_UNITS_PER_SECOND', 0)
+    now = datetime.utcnow()
+    archive_export_lambda.save_state({'watermark': (now - timedelta(minutes=2)).isoformat()})
+    ads = aws.dynamodb.Table('BusinessAds')
+    touched = sorted(key[0] for key in ads._items)[:3]
+    for ad_id in touched:
+        ads._items[(ad_id,)].update(sync_fields((now - timedelta(minutes=1)).isoformat()))
+
+    scans = aws.counter.snapshot().get('dynamodb.Scan', 0)
+    stats = archive_export_lambda.export_live()
+    assert stats['complete'] and sorted(exported_ids(aws)) == touched
+    assert aws.counter.snapshot().get('dynamodb.Scan', 0) == scans
+    assert archive_export_lambda.load_state()['watermark'] > (now - timedelta(seconds=30)).isoformat()
+
+
+def test_writer_flushes_at_byte_threshold(aws, monkeypatch):
+    import ad_archive
+
+    monkeypatch.setattr(ad_archive, '_pyarrow', lambda: None)
+    with ad_archive.ArchiveWriter('live', batch_rows=1000, batch_bytes=2000) as writer:
+        for n in range(10):
+            writer.add({'id': f"ad-{n}", 'description': 'x' * 500}, 'test')
+            assert writer.buffered_bytes < 2000
+    assert writer.rows_written == 10 and len(writer.keys) == 4
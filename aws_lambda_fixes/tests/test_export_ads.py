@@ -0,0 +1,111 @@
+"""exportAds through API Gateway: authentication, per-caller limit and the 29s gateway timeout."""
+
+import json
+
+import pytest
+
+from run_benchmarks import api_event
+
+
+class Context:
+    """Lambda context with the full 900s timeout ahead of it."""
+
+    def get_remaining_time_in_millis(self):
+        return 900000
+
+
+def export_event(user_id='partner-1', query=None):
+    event = api_event('GET', '/ads/export', query)
+    if user_id:
+        event['requestContext']['authorizer'] = {'claims': {'sub': user_id}}
+    return event
+
+
+@pytest.fixture
+def export(aws):
+    import exportAds_lambda
+
+    return exportAds_lambda
+
+
+def call(export, event):
+    response = export.lambda_handler(event, Context())
+    return response['statusCode'], json.loads(response['body']), response['headers']
+
+
+def test_anonymous_caller_rejected(export):
+    status, body, _ = call(export, export_event(user_id=None))
+    assert status == 401 and not body['success']
+
+
+def test_authenticated_caller_exports(export):
+    status, body, _ = call(export, export_event())
+    assert status == 200 and body['complete'] and body['rows'] > 0
+
+
+def test_caller_rate_limited(export):
+    burst = int(export.EXPORT_RATE_BURST)
+    statuses = [call(export, export_event())[0] for _ in range(burst + 1)]
+    assert statuses[:burst] == [200] * burst
+    status, _, headers = call(export, export_event())
+    assert status == 429 and int(headers['Retry-After']) >= 1
+    # Another partner has its own bucket
+    assert call(export, export_event(user_id='partner-2'))[0] == 200
+
+
+def test_api_call_stops_inside_gateway_timeout(export, monkeypatch):
+    # With the whole budget spent on the first page, the call closes its file
+    # and hands back a cursor instead of running into the 900s Lambda timeout
+    import fake_aws
+
+    monkeypatch.setattr(fake_aws, 'SCAN_PAGE_SIZE', 50)
+    monkeypatch.setattr(export, 'EXPORT_API_SECONDS', 0)
+    status, body, _ = call(export, export_event())
+    assert status == 200 and not body['complete'] and body['cursor'] and body['rows'] <= 50
+
+
+def test_direct_invocation_uses_lambda_timeout(export, monkeypatch):
+    import fake_aws
+
+    monkeypatch.setattr(fake_aws, 'SCAN_PAGE_SIZE', 50)
+    monkeypatch.setattr(export, 'EXPORT_API_SECONDS', 0)
+    response = export.lambda_handler({'queryStringParameters': None}, Context())
+    assert response['statusCode'] == 200 and json.loads(response['body'])['complete']
+
+
+def test_caller_following_retry_after_gets_through(export, monkeypatch):
+    import rate_limit
+
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: clock[0])
+    burst = int(export.EXPORT_RATE_BURST)
+    for _ in range(burst):
+        assert call(export, export_event())[0] == 200
+
+    for _ in range(5):
+        status, _, headers = call(export, export_event())
+        assert status == 429
+        clock[0] += int(headers['Retry-After'])
+        assert call(export, export_event())[0] == 200
+
+
+def test_cursor_only_resumes_for_its_owner(export, aws, monkeypatch):
+    import fake_aws
+
+    monkeypatch.setattr(fake_aws, 'SCAN_PAGE_SIZE', 50)
+    monkeypatch.setattr(export, 'EXPORT_API_SECONDS', 0)
+    _, first, _ = call(export, export_event(user_id='partner-1'))
+    assert first['cursor']
+
+    status, body, _ = call(export, export_event(user_id='partner-2', query={'cursor': first['cursor']}))
+    assert status == 400 and 'another caller' in body['error']
+
+    status, body, _ = call(export, export_event(user_id='partner-1', query={'cursor': first['cursor']}))
+    assert status == 200 and body['file'] == 2
+    assert body['key'].split('/')[1] == first['key'].split('/')[1] != 'internal'
+
+
+def test_callers_write_under_their_own_prefix(export):
+    first = call(export, export_event(user_id='partner-1'))[1]['key']
+    second = call(export, export_event(user_id='partner-2'))[1]['key']
+    assert first.split('/')[1] != second.split('/')[1]
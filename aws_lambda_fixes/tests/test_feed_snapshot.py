@@ -0,0 +1,111 @@
+"""Write paths keep the feed snapshot current without ever rescanning the table."""
+
+import pytest
+
+
+@pytest.fixture
+def feed(aws):
+    import feed_snapshot
+
+    return feed_snapshot
+
+
+def scans(aws):
+    return aws.counter.snapshot().get('dynamodb.Scan', 0)
+
+
+def snapshot_item(aws, feed):
+    return aws.dynamodb.Table(feed.FEED_TABLE)._items.get((feed.SNAPSHOT_ID,))
+
+
+def test_removal_within_slack_updates_snapshot(aws, feed):
+    ads, _ = feed.read(feed.SNAPSHOT_SIZE)
+    before = scans(aws)
+    feed.remove_ads([ads[0]['id']])
+    assert scans(aws) == before
+    assert ads[0]['id'] not in [ad['id'] for ad in feed.read(feed.SNAPSHOT_SIZE)[0]]
+
+
+def test_exhausted_slack_marks_stale_without_scanning(aws, feed, monkeypatch):
+    monkeypatch.setattr(feed, 'SNAPSHOT_SLACK', 0)
+    feed.rebuild()
+    ads, _ = feed.read(feed.SNAPSHOT_SIZE)
+    before = scans(aws)
+    feed.remove_ads([ads[0]['id']])
+    assert scans(aws) == before
+    assert snapshot_item(aws, feed)['stale'] is True
+    assert feed.read(10) is None
+
+    feed.rebuild()
+    assert feed.read(10) is not None
+
+
+def test_stale_or_missing_snapshot_left_for_scheduled_rebuild(aws, feed, active_ad_id):
+    feed.mark_stale()
+    before = scans(aws)
+    feed.remove_ads([active_ad_id])
+    assert scans(aws) == before and snapshot_item(aws, feed)['stale'] is True
+
+    del aws.dynamodb.Table(feed.FEED_TABLE)._items[(feed.SNAPSHOT_ID,)]
+    feed.remove_ads([active_ad_id])
+    assert scans(aws) == before
+    # A stale placeholder, so a rebuild that started before the change conflicts
+    assert snapshot_item(aws, feed)['stale'] is True and feed.read(10) is None
+
+
+def _write_during_first_scan(feed, monkeypatch, write):
+    scan_top, calls = feed._scan_top, []
+
+    def scan_then_write(capacity):
+        result = scan_top(capacity)
+        if not calls:
+            write()
+        calls.append(capacity)
+        return result
+
+    monkeypatch.setattr(feed, '_scan_top', scan_then_write)
+    return calls
+
+
+def test_rebuild_rescans_when_an_ad_is_removed_mid_scan(aws, feed, monkeypatch):
+    ads = aws.dynamodb.Table('BusinessAds')
+    removed_id = feed.read(1)[0][0]['id']
+
+    def soft_delete():
+        ads._items[(removed_id,)]['status'] = 'deleted'
+        feed.remove_ads([removed_id])
+
+    calls = _write_during_first_scan(feed, monkeypatch, soft_delete)
+    feed.rebuild()
+    assert len(calls) == 2
+    assert removed_id not in [ad['id'] for ad in feed.read(feed.SNAPSHOT_SIZE)[0]]
+
+
+def test_rebuild_rescans_when_snapshot_missing_and_ad_added_mid_scan(aws, feed, monkeypatch, active_ad_id):
+    del aws.dynamodb.Table(feed.FEED_TABLE)._items[(feed.SNAPSHOT_ID,)]
+    ads = aws.dynamodb.Table('BusinessAds')
+    item = dict(ads._items[(active_ad_id,)], id='ad-added-mid-scan', featured=True,
+                createdAt='2999-01-01T00:00:00')
+
+    def submit():
+        ads._items[('ad-added-mid-scan',)] = item
+        feed.add_ad(item)
+
+    calls = _write_during_first_scan(feed, monkeypatch, submit)
+    feed.rebuild()
+    assert len(calls) == 2
+    assert feed.read(1)[0][0]['id'] == 'ad-added-mid-scan'
+
+
+def test_rebuild_gives_up_without_overwriting_a_busy_snapshot(aws, feed, monkeypatch):
+    scan_top = feed._scan_top
+
+    def always_raced(capacity):
+        result = scan_top(capacity)
+        feed.mark_stale()  # A failed writer update on every attempt
+        return result
+
+    monkeypatch.setattr(feed, '_scan_top', always_raced)
+    with pytest.raises(RuntimeError):
+        feed.rebuild()
+    assert snapshot_item(aws, feed)['stale'] is True
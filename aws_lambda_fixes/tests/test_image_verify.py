@@ -0,0 +1,48 @@
+"""image_verify: a 403 on HEAD (no s3:ListBucket) still means a missing upload."""
+
+import json
+import random
+
+import pytest
+from botocore.exceptions import ClientError
+
+from run_benchmarks import _submit_body, api_event
+
+
+@pytest.fixture
+def no_list_bucket(aws, monkeypatch):
+    """S3 as seen by a role without s3:ListBucket: missing keys answer 403."""
+    head_object = aws.s3.head_object
+
+    def head_without_list(Bucket, Key, **params):
+        if (Bucket, Key) not in aws.s3.objects:
+            raise ClientError({'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject')
+        return head_object(Bucket=Bucket, Key=Key, **params)
+
+    monkeypatch.setattr(aws.s3, 'head_object', head_without_list)
+
+
+def test_forbidden_upload_is_rejected_as_missing(aws, no_list_bucket):
+    import submitAd_lambda
+
+    body = {**_submit_body(random.Random(1)), 'imageUrls': ['ads/never-uploaded.jpg']}
+    response = submitAd_lambda.lambda_handler(api_event('POST', '/', body=body), None)
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['missingImages'] == [
+        'https://d11c102y3uxwr7.cloudfront.net/ads/never-uploaded.jpg']
+
+
+def test_forbidden_outside_uploads_prefix_is_unverified(aws, no_list_bucket):
+    import image_verify
+
+    url = f"https://{image_verify.CLOUDFRONT_DOMAIN}/private/logo.png"
+    images, missing, unverified = image_verify.verify_images([url])
+    assert (images, missing, unverified) == ([], [], [url])
+
+
+def test_uploaded_image_still_verified(aws, no_list_bucket):
+    import image_verify
+
+    url = f"https://{image_verify.CLOUDFRONT_DOMAIN}/ads/bench-upload-0.png"
+    images, missing, unverified = image_verify.verify_images([url])
+    assert [image['url'] for image in images] == [url] and not missing and not unverified
@@ -0,0 +1,79 @@
+"""likeAd: sharded dirty markers, and merge or marker failures that never leave a shard unmerged."""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def likes(aws):
+    import likeAd_lambda
+
+    likeAd_lambda._last_merged.clear()
+    likeAd_lambda._marked_dirty.clear()
+    yield likeAd_lambda
+    likeAd_lambda._last_merged.clear()
+    likeAd_lambda._marked_dirty.clear()
+
+
+def like(likes, ad_id, user_id):
+    event = {'httpMethod': 'POST', 'body': json.dumps({'adId': ad_id, 'userId': user_id})}
+    response = likes.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def shard_total(aws, ad_id):
+    return sum(item.get('count', 0) for item in aws.dynamodb.Table('BusinessAdLikes')._items.values()
+               if item['id'].startswith(f"{ad_id}#shard#"))
+
+
+def test_marker_failure_undoes_like(aws, likes, active_ad_id, monkeypatch):
+    likes._last_merged[active_ad_id] = float('inf')  # inside the merge interval
+
+    def fail(ad_id):
+        raise RuntimeError('ProvisionedThroughputExceededException')
+
+    monkeypatch.setattr(likes, 'mark_dirty', fail)
+    status, body = like(likes, active_ad_id, 'user-1')
+    assert status == 500 and body['success'] is False
+    assert (likes.like_key(active_ad_id, 'user-1'),) not in aws.dynamodb.Table('BusinessAdLikes')._items
+    assert shard_total(aws, active_ad_id) == 0
+
+    monkeypatch.undo()
+    status, body = like(likes, active_ad_id, 'user-1')  # the retry counts once
+    assert status == 200 and body['changed'] is True
+    assert shard_total(aws, active_ad_id) == 1
+
+
+def test_merge_failure_falls_back_to_marker(aws, likes, active_ad_id, monkeypatch):
+    def fail(ad_id):
+        raise RuntimeError('ProvisionedThroughputExceededException')
+
+    monkeypatch.setattr(likes, 'merge_likes', fail)
+    status, body = like(likes, active_ad_id, 'user-1')
+    assert status == 200 and body['changed'] is True
+    markers = [key for key in aws.dynamodb.Table('BusinessAdLikes')._items if key[0].startswith('dirty#')]
+    assert len(markers) == 1
+
+
+def test_sweep_merges_ads_across_marker_shards(aws, likes, monkeypatch):
+    ads = aws.dynamodb.Table('BusinessAds')
+    ad_ids = [item['id'] for item in ads._items.values() if item.get('status') == 'active']
+    shards = {}
+    for ad_id in ad_ids:
+        shards.setdefault(likes.dirty_shard(ad_id), ad_id)
+    dirty = list(shards.values())[:3]
+    assert len(dirty) == 3
+
+    for ad_id in dirty:
+        likes._last_merged[ad_id] = float('inf')
+        assert like(likes, ad_id, 'user-1')[0] == 200
+    markers = [key for key in aws.dynamodb.Table('BusinessAdLikes')._items if key[0].startswith('dirty#')]
+    assert len(markers) == 3
+
+    now = likes.time.time()
+    monkeypatch.setattr(likes.time, 'time', lambda: now + 60)
+    assert likes.sweep_dirty() == 3
+    for ad_id in dirty:
+        assert ads._items[(ad_id,)]['likes'] == 1
+    assert not [key for key in aws.dynamodb.Table('BusinessAdLikes')._items if key[0].startswith('dirty#')]
@@ -0,0 +1,28 @@
+"""rescore_ads scans with a projection DynamoDB accepts."""
+
+import re
+
+# The reserved words among ad attribute names (DynamoDB rejects them unescaped)
+RESERVED = {'location', 'status', 'name', 'count', 'comment', 'views', 'ttl'}
+
+
+def test_projection_escapes_reserved_words(aws, monkeypatch):
+    import rescore_ads
+
+    table = aws.dynamodb.Table('BusinessAds')
+    scan = table.scan
+    seen = []
+
+    def checked_scan(**params):
+        tokens = re.findall(r"[#:]?\w+", params['ProjectionExpression'])
+        assert not RESERVED & {token.lower() for token in tokens}
+        seen.append(params)
+        return scan(**params)
+
+    monkeypatch.setattr(table, 'scan', checked_scan)
+    stats = rescore_ads.rescore_segment(dry_run=True)
+    assert seen and stats['adsScanned'] == len(table._items) - sum(
+        1 for item in table._items.values() if item.get('status') == 'deleted')
+    first = seen[0]
+    projected = {first['ExpressionAttributeNames'][token] for token in first['ProjectionExpression'].split(', ')}
+    assert 'location' in projected
@@ -0,0 +1,83 @@
+"""Every routed method dispatched through router_lambda with HTTP API (v2) events."""
+
+import json
+
+import pytest
+
+
+def v2_event(method, path, query=None, body=None):
+    return {
+        'version': '2.0',
+        'routeKey': f"{method} {path}",
+        'rawPath': path,
+        'rawQueryString': '&'.join(f"{key}={value}" for key, value in (query or {}).items()),
+        'headers': {'content-type': 'application/json'},
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'requestId': 'test-request',
+            'stage': '$default',
+            'http': {'method': method, 'path': path, 'sourceIp': '198.51.100.7'}
+        }
+    }
+
+
+def call(method, path, query=None, body=None):
+    import router_lambda
+
+    response = router_lambda.lambda_handler(v2_event(method, path, query, body), None)
+    return response['statusCode'], json.loads(response['body'] or '{}')
+
+
+def test_get_ads(aws):
+    status, body = call('GET', '/ads')
+    assert status == 200 and body['ads']
+
+
+def test_get_ad_by_id(aws, active_ad_id):
+    status, body = call('GET', '/ads/by-id', {'id': active_ad_id})
+    assert status == 200 and body['ad']['id'] == active_ad_id
+
+
+def test_submit_ad(aws):
+    status, body = call('POST', '/', body={
+        'title': 'Router test', 'description': 'Submitted through a v2 event',
+        'imageUrls': ['ads/bench-upload-1.png'], 'userName': 'Router Tester'})
+    assert status == 200 and body['success']
+
+
+def test_delete_ad(aws, active_ad_id):
+    status, body = call('DELETE', '/', body={'id': active_ad_id})
+    assert status == 200 and body['success']
+    assert aws.dynamodb.Table('BusinessAds')._items[(active_ad_id,)]['status'] == 'deleted'
+
+
+def test_presigned_url(aws):
+    status, body = call('GET', '/presigned-url', {'filename': 'photo.jpg', 'contentType': 'image/jpeg'})
+    assert status == 200 and body['success']
+
+
+def test_like_then_unlike(aws, active_ad_id):
+    like = {'adId': active_ad_id, 'userId': 'user_router'}
+    status, body = call('POST', '/likes', body=like)
+    assert status == 200 and body['liked'] is True and body['changed'] is True
+
+    status, body = call('DELETE', '/likes', body=like)
+    assert status == 200 and body['liked'] is False and body['changed'] is True
+
+
+def test_add_then_list_comments(aws, active_ad_id):
+    status, body = call('POST', '/comments', body={'adId': active_ad_id, 'text': 'Hello', 'userName': 'Router'})
+    assert status == 200 and body['comment']['text'] == 'Hello'
+
+    status, body = call('GET', '/comments', {'adId': active_ad_id})
+    assert status == 200 and [comment['text'] for comment in body['comments']] == ['Hello']
+
+
+@pytest.mark.parametrize('path', ['/ads', '/likes', '/comments'])
+def test_options_preflight(aws, path):
+    import router_lambda
+
+    response = router_lambda.lambda_handler(v2_event('OPTIONS', path), None)
+    assert response['statusCode'] == 200
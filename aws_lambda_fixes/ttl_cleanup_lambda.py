@@ -1,8 +1,12 @@
 import json
-import boto3
 from datetime import datetime, timedelta
-from decimal import Decimal
-import re
+
+import aws_clients
+import feed_snapshot
+from ad_logger import get_logger
+
+logger = get_logger('ttlCleanup')
+aws_clients.warm(tables=(aws_clients.ADS_TABLE, feed_snapshot.FEED_TABLE), s3=True)
 
 def lambda_handler(event, context):
     """
@@ -16,26 +20,23 @@ def lambda_handler(event, context):
     
     Expected to run daily at 2:00 AM UTC
     """
+    logger.bind(event, context)
     
-    # Initialize AWS services
-    dynamodb = boto3.resource('dynamodb')
-    s3_client = boto3.client('s3')
-    table = dynamodb.Table('BusinessAds')
+    # Shared AWS clients (created during the init phase)
+    table = aws_clients.get_table()
+    s3_client = aws_clients.get_s3()
     
     # Configuration
     S3_BUCKET = 'business-ad-images-1'
     CLOUDFRONT_DOMAIN = 'd11c102y3uxwr7.cloudfront.net'
     TTL_DAYS = 30  # Time to live in days
     
-    print(f"🕒 TTL Cleanup started at {datetime.utcnow().isoformat()}")
-    print(f"📅 Cleaning up ads older than {TTL_DAYS} days")
-    
     try:
         # Calculate cutoff date (30 days ago)
         cutoff_date = datetime.utcnow() - timedelta(days=TTL_DAYS)
         cutoff_iso = cutoff_date.isoformat()
         
-        print(f"⏰ Cutoff date: {cutoff_iso}")
+        logger.info('TTL cleanup started', cutoffDate=cutoff_iso, ttlDays=TTL_DAYS)
         
         # Scan DynamoDB for expired ads
         # Note: This scans all items - for large tables, consider using GSI with TTL
@@ -65,10 +66,7 @@ def lambda_handler(event, context):
             if not last_evaluated_key:
                 break
         
-        print(f"🔍 Found {len(expired_ads)} expired ads to clean up")
-        
         if not expired_ads:
-            print("✅ No expired ads found - cleanup complete")
             return {
                 'statusCode': 200,
                 'body': json.dumps({
@@ -85,14 +83,12 @@ def lambda_handler(event, context):
         ads_deleted = 0
         images_removed = 0
         errors = []
+        deleted_ids = []
         
         # Process each expired ad
         for ad in expired_ads:
             ad_id = ad.get('id', 'unknown')
-            ad_title = ad.get('title', 'Unknown Title')
-            created_at = ad.get('createdAt', 'Unknown Date')
-            
-            print(f"🗑️ Processing expired ad: {ad_id} - '{ad_title}' (created: {created_at})")
+            logger.debug('Processing expired ad', adId=ad_id, createdAt=ad.get('createdAt'))
             
             try:
                 # Extract and delete S3 images
@@ -100,8 +96,6 @@ def lambda_handler(event, context):
                 ad_images_removed = 0
                 
                 if image_urls:
-                    print(f"🖼️ Removing {len(image_urls)} images from S3...")
-                    
                     for image_url in image_urls:
                         try:
                             # Extract S3 key from CloudFront URL
@@ -111,33 +105,34 @@ def lambda_handler(event, context):
                                 # Delete from S3
                                 s3_client.delete_object(Bucket=S3_BUCKET, Key=s3_key)
                                 ad_images_removed += 1
-                                print(f"✅ Deleted S3 object: {s3_key}")
+                                logger.debug('Deleted S3 object', key=s3_key)
                             else:
-                                print(f"⚠️ Could not extract S3 key from URL: {image_url}")
+                                logger.warning('Could not extract S3 key from URL', url=image_url)
                                 
                         except Exception as s3_error:
                             error_msg = f"Failed to delete image {image_url}: {str(s3_error)}"
-                            print(f"❌ {error_msg}")
+                            logger.warning('Failed to delete image', adId=ad_id, url=image_url,
+                                           error=str(s3_error))
                             errors.append(error_msg)
                 
                 # Delete from DynamoDB
                 table.delete_item(Key={'id': ad_id})
+                deleted_ids.append(ad_id)
                 ads_deleted += 1
                 images_removed += ad_images_removed
                 
-                print(f"✅ Successfully deleted ad {ad_id} with {ad_images_removed} images")
-                
             except Exception as e:
                 error_msg = f"Failed to delete ad {ad_id}: {str(e)}"
-                print(f"❌ {error_msg}")
+                logger.error('Failed to delete ad', adId=ad_id, error=str(e))
                 errors.append(error_msg)
                 continue
         
+        # Drop expired ads from the materialized home feed in one update
+        feed_snapshot.remove_ads(deleted_ids)
+        
         # Cleanup summary
-        print(f"🎉 TTL Cleanup completed:")
-        print(f"   📊 Ads deleted: {ads_deleted}")
-        print(f"   🖼️ Images removed: {images_removed}")
-        print(f"   ❌ Errors: {len(errors)}")
+        logger.info('TTL cleanup completed', expiredFound=len(expired_ads), adsDeleted=ads_deleted,
+                    imagesRemoved=images_removed, errorCount=len(errors))
         
         # Prepare response
         response_body = {
@@ -162,7 +157,7 @@ def lambda_handler(event, context):
         
     except Exception as e:
         error_msg = f"TTL cleanup failed: {str(e)}"
-        print(f"💥 {error_msg}")
+        logger.error('TTL cleanup failed', error=str(e))
         
         return {
             'statusCode': 500,
@@ -178,6 +173,8 @@ def extract_s3_key_from_url(url, cloudfront_domain):
     Extract S3 key from CloudFront URL
     Example: https://d11c102y3uxwr7.cloudfront.net/ads/image.jpg -> ads/image.jpg
     """
+    import re
+
     try:
         if cloudfront_domain in url:
             # Extract the path after the domain
@@ -186,17 +183,15 @@ def extract_s3_key_from_url(url, cloudfront_domain):
             
             if match:
                 s3_key = match.group(1)
-                print(f"🔑 Extracted S3 key: {s3_key} from URL: {url}")
                 return s3_key
             else:
-                print(f"⚠️ Could not extract S3 key from URL: {url}")
                 return None
         else:
-            print(f"⚠️ URL does not contain CloudFront domain: {url}")
+            logger.debug('URL does not contain CloudFront domain', url=url)
             return None
             
     except Exception as e:
-        print(f"❌ Error extracting S3 key from URL {url}: {str(e)}")
+        logger.warning('Error extracting S3 key from URL', url=url, error=str(e))
         return None
 
 # Test function for manual execution